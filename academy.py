@@ -5,13 +5,87 @@ Routes for course browsing, enrollment, and learning
 
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
 from flask_login import login_required, current_user
+from markupsafe import Markup
 from models import db, Course, Lesson, Enrollment, LessonProgress, Quiz, QuizQuestion, QuizAttempt
 from datetime import datetime
+import os
+import time
+import threading
 import uuid
 
 academy_bp = Blueprint('academy', __name__, url_prefix='/academy')
 
 
+# ==================== CATALOG CACHE ====================
+
+# Rendered catalog fragments, shared by every visitor
+CATALOG_CACHE_TTL_SECONDS = 5 * 60  # Bounds staleness of student counts and ratings
+CATALOG_CACHE_MAX_ENTRIES = 256
+CATALOG_VERSION_FILE = "data/academy_catalog.version"
+
+_catalog_cache = {}  # key -> (built_at, value)
+_catalog_version = None
+_catalog_lock = threading.Lock()
+
+
+def _catalog_file_version():
+    """Identity of the catalog version file, or None if it doesn't exist yet."""
+    try:
+        stat = os.stat(CATALOG_VERSION_FILE)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def cached_catalog(key, build):
+    """
+    Return a cached catalog value, building it on a miss.
+    
+    Entries expire after CATALOG_CACHE_TTL_SECONDS. invalidate_catalog()
+    rewrites the version file, which every worker checks here, so an
+    admin change in one worker clears the cache in all of them.
+    
+    Args:
+        key (tuple): Cache key
+        build: Callable returning the value to cache
+        
+    Returns:
+        The cached or freshly built value
+    """
+    global _catalog_version
+    version = _catalog_file_version()
+    now = time.time()
+    with _catalog_lock:
+        if version != _catalog_version:
+            _catalog_cache.clear()
+            _catalog_version = version
+        entry = _catalog_cache.get(key)
+        if entry and now - entry[0] < CATALOG_CACHE_TTL_SECONDS:
+            return entry[1]
+    
+    value = build()
+    with _catalog_lock:
+        # Don't store a value built before an invalidation in this worker
+        if _catalog_version == version:
+            if key not in _catalog_cache and len(_catalog_cache) >= CATALOG_CACHE_MAX_ENTRIES:
+                _catalog_cache.pop(next(iter(_catalog_cache)))
+            _catalog_cache[key] = (now, value)
+    return value
+
+
+def invalidate_catalog():
+    """Drop the cached catalog in every worker (call after course or lesson changes)."""
+    global _catalog_version
+    os.makedirs(os.path.dirname(CATALOG_VERSION_FILE) or '.', exist_ok=True)
+    tmp_path = f"{CATALOG_VERSION_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(tmp_path, CATALOG_VERSION_FILE)
+    with _catalog_lock:
+        _catalog_cache.clear()
+        _catalog_version = _catalog_file_version()
+
+
 # ==================== PUBLIC ROUTES ====================
 
 @academy_bp.route('/')
@@ -22,6 +96,21 @@ def courses():
     level = request.args.get('level', 'all')
     sort = request.args.get('sort', 'popular')
     
+    course_count, grid_html = cached_catalog(('grid', category, level, sort),
+                                             lambda: _render_course_grid(category, level, sort))
+    featured_html = cached_catalog(('featured',), _render_featured_courses)
+    
+    return render_template('academy/courses.html',
+                         course_count=course_count,
+                         grid_html=grid_html,
+                         featured_html=featured_html,
+                         current_category=category,
+                         current_level=level,
+                         current_sort=sort)
+
+
+def _render_course_grid(category, level, sort):
+    """Query and render the course grid; returns (course count, HTML)."""
     # Base query - only published courses
     query = Course.query.filter_by(is_published=True)
     
@@ -43,15 +132,15 @@ def courses():
     elif sort == 'price_high':
         query = query.order_by(Course.price.desc())
     
-    courses = query.all()
+    # One grouped query for every card's lesson count
+    courses = Course.load_lesson_counts(query.all())
+    return len(courses), Markup(render_template('academy/_course_grid.html', courses=courses))
+
+
+def _render_featured_courses():
+    """Query and render the featured courses section."""
     featured_courses = Course.query.filter_by(is_published=True, is_featured=True).limit(3).all()
-    
-    return render_template('academy/courses.html',
-                         courses=courses,
-                         featured_courses=featured_courses,
-                         current_category=category,
-                         current_level=level,
-                         current_sort=sort)
+    return Markup(render_template('academy/_featured_courses.html', featured_courses=featured_courses))
 
 
 @academy_bp.route('/course/<slug>')
@@ -344,6 +433,7 @@ def create_course():
         
         db.session.add(course)
         db.session.commit()
+        invalidate_catalog()
         
         flash('Course created successfully!', 'success')
         return redirect(url_for('academy.edit_course', course_id=course.id))
@@ -378,6 +468,7 @@ def edit_course(course_id):
             course.set_requirements([r.strip() for r in data['requirements'].split('\n') if r.strip()])
         
         db.session.commit()
+        invalidate_catalog()
         flash('Course updated successfully!', 'success')
     
     return render_template('academy/admin/course_form.html', course=course)
@@ -394,6 +485,7 @@ def publish_course(course_id):
         course.published_at = datetime.utcnow()
     
     db.session.commit()
+    invalidate_catalog()
     
     status = 'published' if course.is_published else 'unpublished'
     flash(f'Course {status} successfully!', 'success')
@@ -430,6 +522,7 @@ def manage_lessons(course_id):
         db.session.add(lesson)
         course.calculate_duration()
         db.session.commit()
+        invalidate_catalog()
         
         flash('Lesson added successfully!', 'success')
     
@@ -458,6 +551,7 @@ def edit_lesson(lesson_id):
         
         lesson.course.calculate_duration()
         db.session.commit()
+        invalidate_catalog()
         
         flash('Lesson updated successfully!', 'success')
         return redirect(url_for('academy.manage_lessons', course_id=lesson.course_id))
@@ -479,6 +573,7 @@ def delete_lesson(lesson_id):
     course = Course.query.get(course_id)
     course.calculate_duration()
     db.session.commit()
+    invalidate_catalog()
     
     flash('Lesson deleted successfully!', 'success')
     return redirect(url_for('academy.manage_lessons', course_id=course_id))
@@ -720,7 +815,7 @@ def delete_question(question_id):
 @academy_bp.route('/api/courses')
 def api_courses():
     """API endpoint for courses."""
-    courses = Course.query.filter_by(is_published=True).all()
+    courses = Course.load_lesson_counts(Course.query.filter_by(is_published=True).all())
     
     return jsonify({
         'success': True,
@@ -5,38 +5,1085 @@ Falls back to rule-based system if API key not configured.
 """
 
 import os
+import re
 import json
+import math
+import time
+import queue
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+import uuid
+import importlib.util
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Try to import OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# Check for OpenAI without importing it; the package is large and is only
+# imported when the first chat message needs the client
+OPENAI_AVAILABLE = importlib.util.find_spec('openai') is not None
+if not OPENAI_AVAILABLE:
     print("OpenAI package not installed. Using rule-based AI advisor.")
 
+# OpenAI call policy. OPENAI_BASE_URL can point the client at a local
+# OpenAI-compatible server for testing.
+OPENAI_MODEL = os.environ.get('CHENGEAI_MODEL', 'gpt-3.5-turbo')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')
+OPENAI_TIMEOUT_SECONDS = float(os.environ.get('CHENGEAI_TIMEOUT', 8))  # Per attempt
+OPENAI_DEADLINE_SECONDS = float(os.environ.get('CHENGEAI_DEADLINE', 15))  # All attempts
+OPENAI_MAX_RETRIES = int(os.environ.get('CHENGEAI_MAX_RETRIES', 2))
+RETRY_BASE_DELAY_SECONDS = 0.5
+RETRY_MAX_DELAY_SECONDS = 4
+
+# Circuit breaker: after this many consecutive failed calls, skip OpenAI and
+# answer from the rule engine until the cool-down has passed
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('CHENGEAI_BREAKER_THRESHOLD', 5))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get('CHENGEAI_BREAKER_COOLDOWN', 30))
+
+# AI request execution (see AIExecutor). At most AI_MAX_CONCURRENCY model
+# calls run at once and AI_MAX_QUEUE more may wait; requests beyond that,
+# or that wait longer than the budget, get a rule-based answer instead.
+# Every admitted request holds a web thread while it waits, so admission is
+# capped AI_THREAD_HEADROOM below the gunicorn thread count (WEB_THREADS,
+# also read by the Procfile) to keep threads free for the rest of the app
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+AI_THREAD_HEADROOM = 2
+AI_MAX_CONCURRENCY = int(os.environ.get('CHENGEAI_MAX_CONCURRENCY', 4))
+AI_MAX_QUEUE = int(os.environ.get('CHENGEAI_MAX_QUEUE',
+                                  max(0, WEB_THREADS - AI_THREAD_HEADROOM - AI_MAX_CONCURRENCY)))
+AI_REQUEST_BUDGET_SECONDS = float(os.environ.get('CHENGEAI_REQUEST_BUDGET', 25))
+
+# Prompt size limits, in estimated tokens (see estimate_tokens). Each message
+# is capped, only the most recent HISTORY_KEEP_TURNS exchanges are kept
+# verbatim and older ones are folded into a short rolling summary
+MAX_PROMPT_TOKENS = int(os.environ.get('CHENGEAI_MAX_PROMPT_TOKENS', 1500))
+MAX_MESSAGE_TOKENS = int(os.environ.get('CHENGEAI_MAX_MESSAGE_TOKENS', 400))
+HISTORY_KEEP_TURNS = 6
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_POINT_TOKENS = 30
+
+# Server-side conversation sessions (see ConversationStore). SQLite lets all
+# workers on the host share sessions
+SESSION_BACKEND = os.environ.get('CHENGEAI_SESSION_BACKEND', 'sqlite')  # memory, sqlite or none
+SESSION_PATH = os.environ.get('CHENGEAI_SESSION_PATH', 'data/ai_sessions.sqlite3')
+SESSION_TTL_SECONDS = int(os.environ.get('CHENGEAI_SESSION_TTL', 24 * 60 * 60))
+
+# Number of users whose financial context is kept in memory
+CONTEXT_CACHE_MAX_ENTRIES = int(os.environ.get('CHENGEAI_CONTEXT_CACHE_ENTRIES', 1000))
+
+# Words per chunk when streaming answers that are already complete
+# (rule-based and cached responses)
+STREAM_CHUNK_WORDS = 4
+
+# Appended when a streamed answer breaks off part way
+INTERRUPTED_NOTE = "\n\n*(Response interrupted. Please ask again for the full answer.)*"
+
+# Upper bounds (ms) of the AI call latency histogram buckets (see AIMetrics)
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Structured logs: one JSON object per AI call or fallback
+logger = logging.getLogger('chengeai')
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_log_handler)
+    logger.setLevel(os.environ.get('CHENGEAI_LOG_LEVEL', 'INFO').upper())
+    logger.propagate = False
+
+# Response cache configuration (see ResponseCache)
+CACHE_BACKEND = os.environ.get('CHENGEAI_CACHE_BACKEND', 'memory')  # memory, sqlite or none
+CACHE_PATH = os.environ.get('CHENGEAI_CACHE_PATH', 'data/ai_cache.sqlite3')
+CACHE_TTL_SECONDS = int(os.environ.get('CHENGEAI_CACHE_TTL', 6 * 60 * 60))
+CACHE_MAX_ENTRIES = int(os.environ.get('CHENGEAI_CACHE_MAX_ENTRIES', 2000))
+
+# Rule-based advisor intents in priority order (earlier wins ties), with the
+# keywords that signal them. Keywords match at the start of a word, so
+# "invest" also matches "investing"; a trailing \b makes one match whole
+# words only ("hi" should not match "high").
+INTENT_KEYWORDS = [
+    ('saving', ['save', 'saving', 'savings']),
+    ('budget', ['budget', 'budgeting', 'spending plan']),
+    ('debt', ['debt', 'loan', 'credit card', r'owe\b', 'owing', 'pay off']),
+    ('investment', ['invest', 'investment', 'stock', 'portfolio', 'grow']),
+    ('emergency_fund', ['emergency', 'fund', 'rainy day', 'unexpected']),
+    ('retirement', ['retirement', 'retire', '401k', r'ira\b', 'pension', 'future']),
+    ('income', ['income', 'earn', 'salary', 'side hustle', 'more money']),
+    ('spending', ['spend', 'spending', 'expense', 'cut', 'reduce']),
+    ('greeting', ['hello', r'hi\b', r'hey\b', 'help', 'what can you']),
+    ('thanks', ['thank', 'thanks', 'appreciate']),
+]
+
+# Intents that only make sense on their own; dropped when the message also
+# asks about a financial topic ("hi, how do I save?")
+SOCIAL_INTENTS = frozenset(['greeting', 'thanks'])
+
+# Most topics answered in one rule-based reply
+MAX_INTENTS_PER_ANSWER = 2
+
+# Filler words ignored when comparing questions, so that "How do I budget?"
+# and "how to budget" share a cache entry
+STOP_WORDS = frozenset([
+    'a', 'an', 'the', 'i', 'me', 'my', 'we', 'our', 'you', 'your', 'is', 'are',
+    'am', 'be', 'do', 'does', 'did', 'to', 'of', 'for', 'in', 'on', 'at', 'and',
+    'or', 'so', 'it', 'this', 'that', 'can', 'could', 'should', 'would', 'will',
+    'please', 'some', 'any', 'about', 'with', 'just', 'really', 'get', 'tell'
+])
+
+
+def normalize_message(message):
+    """
+    Reduce a message to a canonical form for cache lookups.
+    
+    Lowercases, strips punctuation and drops filler words, so trivially
+    different phrasings compare equal. Word order is kept: "earn 500 and
+    spend 1000" is a different question from "earn 1000 and spend 500".
+    """
+    words = re.findall(r"[a-z0-9$%]+", message.lower())
+    return ' '.join(w for w in words if w not in STOP_WORDS)
+
+
+def _amount_bucket(amount):
+    """Bucket an amount on a log scale (about four buckets per power of ten)."""
+    if not amount:
+        return 0
+    bucket = int(round(math.log10(abs(amount)) * 4)) + 1
+    return bucket if amount > 0 else -bucket
+
+
+def user_data_fingerprint(user_data):
+    """
+    Summarise the parts of user_data that shape an answer.
+    
+    Amounts are bucketed so small changes in the user's numbers still hit
+    the same cache entry; only the names of the top categories are kept.
+    """
+    return {
+        'income': _amount_bucket(user_data.get('total_income', 0)),
+        'expenses': _amount_bucket(user_data.get('total_expenses', 0)),
+        'balance': _amount_bucket(user_data.get('balance', 0)),
+        'top_categories': [c['category'].lower() for c in user_data.get('top_categories', [])[:3]]
+    }
+
+
+class MemoryCacheBackend:
+    """In-process cache with per-entry expiry and LRU eviction."""
+    
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl):
+        """Store a value, evicting the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheBackend:
+    """Cache stored in a SQLite file, shared by all workers on the host."""
+    
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ai_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, last_used REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ai_cache_last_used ON ai_cache (last_used)')
+    
+    @contextmanager
+    def _connect(self):
+        """Open a connection for one transaction, closing it afterwards."""
+        # A connection per call keeps the backend safe to share across threads
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:  # Commits, or rolls back on error
+                yield conn
+        finally:
+            conn.close()
+    
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT value FROM ai_cache WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE ai_cache SET last_used = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+    
+    def set(self, key, value, ttl):
+        """Store a value, dropping expired entries and the least recently used."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO ai_cache (key, value, expires_at, last_used) '
+                'VALUES (?, ?, ?, ?)', (key, json.dumps(value), now + ttl, now)
+            )
+            conn.execute('DELETE FROM ai_cache WHERE expires_at <= ?', (now,))
+            conn.execute(
+                'DELETE FROM ai_cache WHERE key IN (SELECT key FROM ai_cache '
+                'ORDER BY last_used DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+            )
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM ai_cache')
+
+
+def create_cache_backend(name=CACHE_BACKEND, path=CACHE_PATH):
+    """
+    Create a cache backend by name.
+    
+    Args:
+        name (str): 'memory', 'sqlite' or 'none'
+        path (str): Database file for the SQLite backend
+        
+    Returns:
+        Backend instance, or None when caching is disabled
+    """
+    if name == 'memory':
+        return MemoryCacheBackend()
+    if name == 'sqlite':
+        return SQLiteCacheBackend(path)
+    if name == 'none':
+        return None
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class ResponseCache:
+    """
+    Cache of advisor responses keyed by question and financial profile.
+    
+    Keys combine the normalized message with a bucketed fingerprint of the
+    user's data, plus an optional scope. Answers quote the user's figures,
+    so callers should scope entries per user unless sharing is intended.
+    """
+    
+    def __init__(self, backend, ttl=CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+    
+    def make_key(self, message, user_data, scope=None):
+        """Build the cache key for a message."""
+        payload = json.dumps({
+            'scope': scope,
+            'message': normalize_message(message),
+            'profile': user_data_fingerprint(user_data)
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, message, user_data, scope=None):
+        """Return a cached response text, or None."""
+        if self.backend is None:
+            return None
+        value = self.backend.get(self.make_key(message, user_data, scope))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    def set(self, message, user_data, response, scope=None):
+        """Cache a response text."""
+        if self.backend is not None:
+            self.backend.set(self.make_key(message, user_data, scope), response, self.ttl)
+
+
+def estimate_tokens(text):
+    """Estimate the token count of text (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to roughly max_tokens, at a word boundary, marking the cut."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(0, max_tokens * 4 - 2)]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip() + ' …'
+
+
+def _first_sentence(text):
+    """Return the first sentence (or line) of text."""
+    text = text.strip()
+    match = re.search(r'[.!?](\s|$)|\n', text)
+    return text[:match.start() + 1].strip() if match else text
+
+
+class Conversation:
+    """
+    A chat session: recent turns verbatim plus a summary of older ones.
+    
+    Turns are {'user': ..., 'ai': ...} dicts. Adding a turn beyond
+    HISTORY_KEEP_TURNS folds the oldest one into the rolling summary (the
+    first sentence of the question and of the answer), and the summary
+    drops its oldest points past SUMMARY_MAX_TOKENS.
+    """
+    
+    def __init__(self, conversation_id=None, turns=None, summary_points=None):
+        self.id = conversation_id or uuid.uuid4().hex
+        self.turns = []
+        self.summary_points = list(summary_points or [])
+        for turn in turns or []:
+            if isinstance(turn, dict):
+                self.add_turn(str(turn.get('user', '')), str(turn.get('ai', '')))
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a conversation saved with to_dict()."""
+        conversation = cls(data.get('id'), summary_points=data.get('summary_points'))
+        conversation.turns = data.get('turns', [])
+        return conversation
+    
+    def to_dict(self):
+        """Return a JSON-serializable copy of the conversation."""
+        return {'id': self.id, 'turns': self.turns, 'summary_points': self.summary_points}
+    
+    def is_empty(self):
+        """Return whether the conversation has no earlier messages."""
+        return not self.turns and not self.summary_points
+    
+    @property
+    def summary(self):
+        """The rolling summary of folded turns as prompt text."""
+        if not self.summary_points:
+            return ''
+        return "Summary of earlier conversation:\n" + "\n".join(
+            f"- {point}" for point in self.summary_points
+        )
+    
+    def add_turn(self, user, ai):
+        """Append an exchange, capping its size and compacting older turns."""
+        self.turns.append({
+            'user': truncate_to_tokens(user, MAX_MESSAGE_TOKENS),
+            'ai': truncate_to_tokens(ai, MAX_MESSAGE_TOKENS)
+        })
+        while len(self.turns) > HISTORY_KEEP_TURNS:
+            self._fold(self.turns.pop(0))
+    
+    def _fold(self, turn):
+        """Move a turn into the rolling summary."""
+        question = truncate_to_tokens(_first_sentence(turn['user']), SUMMARY_POINT_TOKENS)
+        answer = truncate_to_tokens(_first_sentence(turn['ai']), SUMMARY_POINT_TOKENS)
+        self.summary_points.append(f"User asked: {question} Advisor: {answer}")
+        while (len(self.summary_points) > 1 and
+               estimate_tokens(self.summary) > SUMMARY_MAX_TOKENS):
+            self.summary_points.pop(0)
+
+
+def as_conversation(history):
+    """
+    Coerce conversation history to a Conversation.
+    
+    Accepts a Conversation, a list of {'user', 'ai'} turns as sent by older
+    clients, or None.
+    """
+    if isinstance(history, Conversation):
+        return history
+    return Conversation(turns=history or [])
+
+
+class ConversationStore:
+    """Server-side conversation sessions, partitioned by scope (user id)."""
+    
+    def __init__(self, backend, ttl=SESSION_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+    
+    def _key(self, scope, conversation_id):
+        return f"conversation:{scope}:{conversation_id}"
+    
+    def load(self, scope, conversation_id):
+        """
+        Load a conversation.
+        
+        Returns:
+            Conversation: The stored session, or a new empty one if the id
+            is missing, unknown or expired
+        """
+        if self.backend is not None and conversation_id:
+            data = self.backend.get(self._key(scope, conversation_id))
+            if data is not None:
+                return Conversation.from_dict(data)
+        return Conversation()
+    
+    def save(self, scope, conversation):
+        """Store a conversation, refreshing its expiry."""
+        if self.backend is not None:
+            self.backend.set(self._key(scope, conversation.id), conversation.to_dict(), self.ttl)
+
+
+class IntentClassifier:
+    """
+    Keyword intent matcher compiled into a single regular expression.
+    
+    All keywords are combined into one alternation (longest first) that is
+    compiled once, so classifying a message is a single scan of the text.
+    Each intent is scored by its number of keyword hits.
+    """
+    
+    def __init__(self, intent_keywords=INTENT_KEYWORDS):
+        self.intents = [intent for intent, _ in intent_keywords]
+        self._priority = {intent: i for i, intent in enumerate(self.intents)}
+        self._keyword_intents = {}
+        patterns = []
+        for intent, keywords in intent_keywords:
+            for keyword in keywords:
+                whole_word = keyword.endswith(r'\b')
+                text = keyword[:-2] if whole_word else keyword
+                self._keyword_intents[text] = intent
+                patterns.append(re.escape(text) + (r'\b' if whole_word else ''))
+        patterns.sort(key=len, reverse=True)
+        self.pattern = re.compile(r'\b(?:' + '|'.join(patterns) + ')', re.IGNORECASE)
+    
+    def classify(self, message):
+        """
+        Score the intents in a message.
+        
+        Args:
+            message: User's message
+        
+        Returns:
+            list: (intent, score) pairs, best first; ties keep priority order
+        """
+        scores = {}
+        for match in self.pattern.finditer(message):
+            intent = self._keyword_intents[match.group().lower()]
+            scores[intent] = scores.get(intent, 0) + 1
+        return sorted(scores.items(), key=lambda item: (-item[1], self._priority[item[0]]))
+    
+    def select(self, message, limit=MAX_INTENTS_PER_ANSWER):
+        """
+        Pick the intents to answer for a message.
+        
+        Social intents are only answered when nothing else matched.
+        
+        Returns:
+            list: Up to limit intent names, empty when nothing matched
+        """
+        ranked = [intent for intent, _ in self.classify(message)]
+        topical = [intent for intent in ranked if intent not in SOCIAL_INTENTS]
+        return (topical or ranked)[:limit]
+
+
+intent_classifier = IntentClassifier()
+
+
+def chunk_text(text, words_per_chunk=STREAM_CHUNK_WORDS):
+    """
+    Split text into chunks of a few words for streaming.
+    
+    Whitespace (including line breaks) stays attached to the following
+    word, so joining the chunks gives back the original text.
+    """
+    tokens = re.findall(r'\s*\S+|\s+$', text)
+    for i in range(0, len(tokens), words_per_chunk):
+        yield ''.join(tokens[i:i + words_per_chunk])
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing dependency for a cool-down period.
+    
+    The breaker is closed while calls succeed. After failure_threshold
+    consecutive failures it opens and allow() returns False until
+    cooldown seconds have passed. It then half-opens and lets a single
+    trial call through: success closes it, failure opens it again. A trial
+    that ends without either (e.g. a stream closed early) is released with
+    release_trial(); one never resolved is given up after cooldown seconds.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+    
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._trial_in_flight = False
+        self._trial_started = 0
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """Return whether a call may be attempted now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if (self._trial_in_flight and
+                        time.monotonic() - self._trial_started < self.cooldown):
+                    return False
+                self._trial_in_flight = True
+                self._trial_started = time.monotonic()
+            return True
+    
+    def release_trial(self):
+        """Give up a call that ended without an outcome, letting another trial through."""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_success(self):
+        """Record a successful call, closing the breaker."""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Record a failed call, opening the breaker if the limit is reached."""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def _is_retryable(error):
+    """Return whether an OpenAI error is worth retrying (timeouts, 429, 5xx)."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, (openai.APITimeoutError, openai.APIConnectionError,
+                              openai.RateLimitError, openai.InternalServerError))
+
+
+def _fallback_reason(error):
+    """Classify why an OpenAI call failed, for metrics and logs."""
+    if isinstance(error, TimeoutError):
+        return 'timeout'
+    if isinstance(error, ConnectionError):
+        return 'connection'
+    try:
+        import openai
+    except ImportError:
+        return 'error'
+    for error_type, reason in ((openai.APITimeoutError, 'timeout'),
+                               (openai.APIConnectionError, 'connection'),
+                               (openai.RateLimitError, 'rate_limit'),
+                               (openai.InternalServerError, 'server_error'),
+                               (openai.AuthenticationError, 'auth'),
+                               (openai.APIStatusError, 'api_error')):
+        if isinstance(error, error_type):
+            return reason
+    return 'error'
+
+
+class AIMetrics:
+    """
+    In-process counters for advisor calls.
+    
+    Records every chat call's source, latency (as a histogram) and token
+    usage, why answers fell back from OpenAI to the rule engine, and
+    OpenAI retries and errors. Each of these is also logged as a JSON line
+    on the 'chengeai' logger.
+    """
+    
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Clear all counters."""
+        with self._lock:
+            self.calls = {}  # source -> count
+            self.latency_counts = [0] * (len(self.buckets) + 1)  # Last is overflow
+            self.latency_total_ms = 0
+            self.latency_by_source = {}  # source -> [count, total_ms]
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.fallbacks = {}  # reason -> count
+            self.retries = {}  # reason -> count
+            self.errors = {}  # stage -> count
+    
+    def record_call(self, source, latency_ms, usage=None, fallback_reason=None, stream=False):
+        """
+        Record a finished chat call.
+        
+        Args:
+            source: Where the answer came from ('openai', 'cache', 'rule-based', ...)
+            latency_ms: Wall time of the call
+            usage: {'prompt_tokens': ..., 'completion_tokens': ...} (optional)
+            fallback_reason: Why OpenAI was not used, if it should have been
+            stream: Whether the answer was streamed
+        """
+        usage = usage or {}
+        with self._lock:
+            self.calls[source] = self.calls.get(source, 0) + 1
+            bucket = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if latency_ms <= bound:
+                    bucket = i
+                    break
+            self.latency_counts[bucket] += 1
+            self.latency_total_ms += latency_ms
+            by_source = self.latency_by_source.setdefault(source, [0, 0])
+            by_source[0] += 1
+            by_source[1] += latency_ms
+            self.prompt_tokens += usage.get('prompt_tokens', 0)
+            self.completion_tokens += usage.get('completion_tokens', 0)
+            if fallback_reason:
+                self.fallbacks[fallback_reason] = self.fallbacks.get(fallback_reason, 0) + 1
+        
+        logger.info(json.dumps({
+            'event': 'ai_call',
+            'source': source,
+            'latency_ms': round(latency_ms, 1),
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'fallback_reason': fallback_reason,
+            'stream': stream
+        }))
+    
+    def record_fallback(self, reason, **fields):
+        """Record a fallback that happened outside a chat call (e.g. a full queue)."""
+        with self._lock:
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+        logger.warning(json.dumps(dict({'event': 'ai_fallback', 'reason': reason}, **fields)))
+    
+    def record_retry(self, error, attempt, delay):
+        """Record a failed OpenAI attempt that will be retried after delay seconds."""
+        reason = _fallback_reason(error)
+        with self._lock:
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+        logger.warning(json.dumps({
+            'event': 'ai_retry',
+            'reason': reason,
+            'attempt': attempt,
+            'delay_s': round(delay, 2),
+            'error': str(error)
+        }))
+    
+    def record_error(self, stage, error):
+        """
+        Record an error in the advisor.
+        
+        Args:
+            stage: Where it happened ('openai', 'openai_stream', 'chat', 'chat_stream')
+            error: The exception
+        """
+        with self._lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+        logger.error(json.dumps({
+            'event': 'ai_error',
+            'stage': stage,
+            'reason': _fallback_reason(error),
+            'error': str(error)
+        }))
+    
+    def percentile(self, fraction):
+        """
+        Estimate a latency percentile from the histogram.
+        
+        Returns:
+            float: Upper bound (ms) of the bucket holding the percentile, or
+            None if no calls were recorded (inf if it is in the overflow)
+        """
+        with self._lock:
+            total = sum(self.latency_counts)
+            if not total:
+                return None
+            target = fraction * total
+            seen = 0
+            for i, count in enumerate(self.latency_counts):
+                seen += count
+                if seen >= target:
+                    return self.buckets[i] if i < len(self.buckets) else float('inf')
+    
+    def snapshot(self, cache=None):
+        """
+        Return all metrics as a JSON-serializable dict.
+        
+        Args:
+            cache: ResponseCache whose hit rate to include (optional)
+        """
+        percentiles = {f'p{int(q * 100)}_ms': self.percentile(q) for q in (0.5, 0.95, 0.99)}
+        for key, value in percentiles.items():
+            if value == float('inf'):
+                percentiles[key] = f'>{self.buckets[-1]}'
+        
+        with self._lock:
+            total_calls = sum(self.calls.values())
+            histogram = [{'le_ms': bound, 'count': count}
+                         for bound, count in zip(self.buckets, self.latency_counts)]
+            histogram.append({'le_ms': 'inf', 'count': self.latency_counts[-1]})
+            metrics = {
+                'calls': total_calls,
+                'calls_by_source': dict(self.calls),
+                'latency': dict(percentiles, **{
+                    'mean_ms': round(self.latency_total_ms / total_calls, 1) if total_calls else None,
+                    'mean_ms_by_source': {
+                        source: round(total_ms / count, 1)
+                        for source, (count, total_ms) in self.latency_by_source.items()
+                    },
+                    'histogram': histogram
+                }),
+                'tokens': {
+                    'prompt': self.prompt_tokens,
+                    'completion': self.completion_tokens
+                },
+                'fallbacks': dict(self.fallbacks),
+                'fallback_total': sum(self.fallbacks.values()),
+                'retries': dict(self.retries),
+                'errors': dict(self.errors)
+            }
+        
+        if cache is not None:
+            lookups = cache.hits + cache.misses
+            metrics['cache'] = {
+                'hits': cache.hits,
+                'misses': cache.misses,
+                'hit_rate': round(cache.hits / lookups, 3) if lookups else None
+            }
+        return metrics
+
+
+class AIBusyError(Exception):
+    """Raised when the AI executor queue is full."""
+
+
+class AIExecutor:
+    """
+    Bounded thread pool for AI requests.
+    
+    Model calls run on a small dedicated pool instead of directly in the
+    web request, so the number of requests tied up waiting on the model is
+    capped. Callers wait at most a timeout budget (queue wait included),
+    and submissions beyond the queue limit are rejected immediately.
+    
+    Running plus queued tasks never exceed web_threads - AI_THREAD_HEADROOM,
+    whatever max_workers and max_queue are set to, so a saturated executor
+    still leaves web threads for pages that don't touch the model.
+    """
+    
+    _END = object()
+    
+    def __init__(self, max_workers=AI_MAX_CONCURRENCY, max_queue=AI_MAX_QUEUE,
+                 budget=AI_REQUEST_BUDGET_SECONDS, web_threads=WEB_THREADS):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_admitted = max(1, min(max_workers + max_queue,
+                                       web_threads - AI_THREAD_HEADROOM))
+        self.budget = budget
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chengeai')
+        self._lock = threading.Lock()
+        self.pending = 0  # Submitted tasks not yet finished (running + queued)
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+    
+    @property
+    def queue_depth(self):
+        """Number of tasks waiting for a free worker."""
+        return max(0, self.pending - self.max_workers)
+    
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule fn on the pool.
+        
+        Returns:
+            Future: The scheduled call
+        
+        Raises:
+            AIBusyError: If max_admitted tasks are already running or waiting
+        """
+        with self._lock:
+            if self.pending >= self.max_admitted:
+                self.rejected += 1
+                raise AIBusyError(f"AI queue full ({self.queue_depth} waiting)")
+            self.pending += 1
+        
+        future = self._pool.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._task_done)
+        return future
+    
+    def _task_done(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+    
+    def run(self, fn, *args, **kwargs):
+        """
+        Run fn on the pool and wait for its result within the budget.
+        
+        Raises:
+            AIBusyError: If the queue is full
+            TimeoutError: If the result is not ready within the budget
+        """
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.budget)
+        except TimeoutError:
+            future.cancel()  # Drops it if it never started
+            with self._lock:
+                self.timed_out += 1
+            raise TimeoutError("AI response budget exceeded") from None
+    
+    def stream(self, events):
+        """
+        Consume a generator on the pool, yielding its items as they arrive.
+        
+        The whole stream must finish within the budget. If the caller stops
+        early (budget spent, error, or the client went away and this
+        generator is closed), the pump stops at the next item and closes
+        events, which closes the upstream stream and frees the worker.
+        
+        Raises:
+            AIBusyError: If the queue is full
+            TimeoutError: If the budget runs out before the stream ends
+        """
+        items = queue.Queue()
+        cancelled = threading.Event()
+        
+        def pump():
+            try:
+                for item in events:
+                    if cancelled.is_set():
+                        break
+                    items.put(item)
+            except Exception as e:
+                items.put(e)
+            finally:
+                close = getattr(events, 'close', None)
+                if close is not None:
+                    close()
+                items.put(self._END)
+        
+        future = self.submit(pump)
+        deadline = time.monotonic() + self.budget
+        try:
+            while True:
+                try:
+                    item = items.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    with self._lock:
+                        self.timed_out += 1
+                    raise TimeoutError("AI response budget exceeded")
+                if item is self._END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+            future.cancel()  # Drops it if it never started
+    
+    def stats(self):
+        """Return a snapshot of pool usage."""
+        with self._lock:
+            return {
+                'max_concurrency': self.max_workers,
+                'max_queue': self.max_queue,
+                'max_admitted': self.max_admitted,
+                'budget_seconds': self.budget,
+                'in_flight': min(self.pending, self.max_workers),
+                'queue_depth': self.queue_depth,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out
+            }
+
+
+class FinancialContext:
+    """
+    A user's financial summary and the system prompt rendered from it.
+    
+    Built once per version of the user's data and reused for every turn
+    of a conversation, so a chat turn only has to append the new message.
+    """
+    
+    def __init__(self, user_data, system_prompt, version=None):
+        self.user_data = user_data
+        self.system_prompt = system_prompt
+        self.version = version
+
+
+class FinancialContextCache:
+    """Per-user FinancialContext cache, invalidated by data version."""
+    
+    def __init__(self, max_entries=CONTEXT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, scope, version, build):
+        """
+        Return the cached context for scope, rebuilding it if stale.
+        
+        Args:
+            scope: Cache partition, e.g. the user id
+            version: Current version of the user's data
+            build: Callable returning a fresh FinancialContext
+        
+        Returns:
+            FinancialContext: Context matching version
+        """
+        with self._lock:
+            context = self._entries.get(scope)
+            if context is not None and context.version == version:
+                self._entries.move_to_end(scope)
+                self.hits += 1
+                return context
+            self.misses += 1
+        
+        context = build()
+        context.version = version
+        with self._lock:
+            self._entries[scope] = context
+            self._entries.move_to_end(scope)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return context
+    
+    def invalidate(self, scope):
+        """Drop the cached context for scope."""
+        with self._lock:
+            self._entries.pop(scope, None)
+
 
 class ChengeAI:
     """AI-powered financial advisor for Chengeta."""
     
-    def __init__(self):
+    def __init__(self, cache=None):
         self.api_key = os.environ.get('OPENAI_API_KEY')
         self.client = None
         self.use_openai = False
+        self.cache = cache or ResponseCache(create_cache_backend())
+        
+        # Call policy for OpenAI requests
+        self.base_url = OPENAI_BASE_URL
+        self.timeout = OPENAI_TIMEOUT_SECONDS
+        self.deadline = OPENAI_DEADLINE_SECONDS
+        self.max_retries = OPENAI_MAX_RETRIES
+        self.breaker = CircuitBreaker()
+        self.max_prompt_tokens = MAX_PROMPT_TOKENS
+        self.metrics = AIMetrics()
         
         if OPENAI_AVAILABLE and self.api_key:
+            self.use_openai = True
+            print("OpenAI integration enabled.")
+    
+    def _get_client(self):
+        """Create the OpenAI client on first use."""
+        if self.client is None:
+            from openai import OpenAI
+            # Retries are handled by _create_completion, not the SDK
+            self.client = OpenAI(api_key=self.api_key, base_url=self.base_url,
+                                 timeout=self.timeout, max_retries=0)
+        return self.client
+    
+    def _create_completion(self, messages, stream=False):
+        """
+        Call the chat completions API with timeouts and jittered retries.
+        
+        Each attempt is limited to self.timeout seconds and all attempts
+        together to self.deadline seconds. Timeouts, connection errors,
+        rate limits and server errors are retried up to self.max_retries
+        times with exponential backoff and full jitter. With stream=True
+        only opening the stream is retried; the returned iterator yields
+        chunks as the model produces them.
+        
+        Raises:
+            Exception: The last error once retries or the deadline run out
+        """
+        deadline = time.monotonic() + self.deadline
+        
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("OpenAI deadline exceeded")
+            
             try:
-                self.client = OpenAI(api_key=self.api_key)
-                self.use_openai = True
-                print("OpenAI integration enabled.")
+                return self._get_client().chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=messages,
+                    max_tokens=500,
+                    temperature=0.7,
+                    presence_penalty=0.1,
+                    frequency_penalty=0.1,
+                    timeout=min(self.timeout, remaining),
+                    stream=stream,
+                    **({'stream_options': {'include_usage': True}} if stream else {})
+                )
             except Exception as e:
-                print(f"Failed to initialize OpenAI: {e}")
-                self.use_openai = False
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                delay = random.uniform(
+                    0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+                )
+                if time.monotonic() + delay >= deadline:
+                    raise
+                self.metrics.record_retry(e, attempt + 1, delay)
+                time.sleep(delay)
+    
+    def build_context(self, user_data, version=None):
+        """
+        Build a FinancialContext, rendering the system prompt once.
+        
+        Args:
+            user_data: Dictionary with user's financial data; an existing
+                FinancialContext is returned unchanged
+            version: Version of the data user_data was built from (optional)
+        
+        Returns:
+            FinancialContext: Context for chat() and chat_stream()
+        """
+        if isinstance(user_data, FinancialContext):
+            return user_data
+        return FinancialContext(user_data, self.get_system_prompt(user_data), version)
     
     def get_system_prompt(self, user_data):
         """Generate system prompt with user's financial context."""
@@ -77,105 +1124,298 @@ Guidelines:
             lines.append(f"- {cat['category']}: ${cat['amount']:,.2f}")
         return "\n".join(lines) if lines else "No expense data yet"
 
-    def chat(self, message, user_data, conversation_history=None):
+    def chat(self, message, user_data, conversation_history=None, cache_scope=None):
         """
         Process a chat message and return AI response.
         
+        OpenAI answers to messages without history are cached (see
+        ResponseCache); follow-up messages depend on the conversation and
+        always go to the model.
+        
         Args:
             message: User's message
-            user_data: Dictionary with user's financial data
-            conversation_history: List of previous messages (optional)
+            user_data: Dictionary with user's financial data, or a FinancialContext
+            conversation_history: Conversation or list of previous messages (optional)
+            cache_scope: Partition for cached answers, e.g. the user id (optional)
         
         Returns:
             dict: Response with 'success' and 'response' keys
         """
+        start = time.monotonic()
+        result = self._chat(message, user_data, conversation_history, cache_scope)
+        self._record(result, start)
+        return result
+
+    def _chat(self, message, user_data, conversation_history=None, cache_scope=None):
+        """Answer a chat message (see chat())."""
         try:
+            context = self.build_context(user_data)
+            user_data = context.user_data
+            
             if self.use_openai:
-                return self._openai_response(message, user_data, conversation_history)
+                conversation_history = as_conversation(conversation_history)
+                cacheable = conversation_history.is_empty()
+                if cacheable:
+                    cached = self.cache.get(message, user_data, scope=cache_scope)
+                    if cached is not None:
+                        return {'success': True, 'response': cached, 'source': 'cache'}
+                
+                result = self._openai_response(message, context, conversation_history)
+                if cacheable and result.get('source') == 'openai':
+                    self.cache.set(message, user_data, result['response'], scope=cache_scope)
+                return result
             else:
                 return self._rule_based_response(message, user_data)
         except Exception as e:
-            print(f"AI chat error: {e}")
+            self.metrics.record_error('chat', e)
             return {
                 'success': False,
                 'response': "I'm having trouble processing your request. Please try again.",
-                'error': str(e)
+                'error': str(e),
+                'source': 'error'
             }
 
-    def _openai_response(self, message, user_data, conversation_history=None):
+    def _record(self, result, start, stream=False):
+        """Record a finished call in self.metrics."""
+        self.metrics.record_call(
+            result.get('source', 'error'), (time.monotonic() - start) * 1000,
+            usage=result.get('usage'), fallback_reason=result.get('fallback_reason'),
+            stream=stream
+        )
+
+    def _fallback(self, message, user_data, reason):
+        """Rule-based answer used in place of OpenAI, tagged with the reason."""
+        return dict(self._rule_based_response(message, user_data), fallback_reason=reason)
+
+    def _build_messages(self, message, context, conversation_history=None):
+        """
+        Build the chat completion messages for a user message.
+        
+        The prompt is kept within self.max_prompt_tokens: the message is
+        capped at MAX_MESSAGE_TOKENS, then the summary of older turns and
+        as many recent turns as fit are added, newest first.
+        """
+        conversation = as_conversation(conversation_history)
+        message = truncate_to_tokens(message, MAX_MESSAGE_TOKENS)
+        
+        system_prompt = context.system_prompt
+        used = estimate_tokens(system_prompt) + estimate_tokens(message)
+        summary = conversation.summary
+        if summary and used + estimate_tokens(summary) <= self.max_prompt_tokens:
+            system_prompt = f"{system_prompt}\n\n{summary}"
+            used += estimate_tokens(summary)
+        
+        history = []
+        for turn in reversed(conversation.turns):
+            user = truncate_to_tokens(turn.get('user', ''), MAX_MESSAGE_TOKENS)
+            ai = truncate_to_tokens(turn.get('ai', ''), MAX_MESSAGE_TOKENS)
+            cost = estimate_tokens(user) + estimate_tokens(ai)
+            if used + cost > self.max_prompt_tokens:
+                break
+            used += cost
+            history[:0] = [{"role": "user", "content": user},
+                           {"role": "assistant", "content": ai}]
+        
+        return ([{"role": "system", "content": system_prompt}] + history +
+                [{"role": "user", "content": message}])
+
+    def _openai_response(self, message, context, conversation_history=None):
         """Generate response using OpenAI API."""
+        # While the breaker is open, answer from the rule engine straight away
+        if not self.breaker.allow():
+            return self._fallback(message, context.user_data, 'breaker_open')
+        
         try:
-            messages = [
-                {"role": "system", "content": self.get_system_prompt(user_data)}
-            ]
-            
-            # Add conversation history if provided
-            if conversation_history:
-                for msg in conversation_history[-6:]:  # Keep last 6 messages for context
-                    messages.append({"role": "user", "content": msg.get('user', '')})
-                    messages.append({"role": "assistant", "content": msg.get('ai', '')})
+            messages = self._build_messages(message, context, conversation_history)
             
-            # Add current message
-            messages.append({"role": "user", "content": message})
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7,
-                presence_penalty=0.1,
-                frequency_penalty=0.1
-            )
+            response = self._create_completion(messages)
+            self.breaker.record_success()
             
             ai_response = response.choices[0].message.content
+            usage = getattr(response, 'usage', None)
             
             return {
                 'success': True,
                 'response': ai_response,
-                'source': 'openai'
+                'source': 'openai',
+                'usage': {
+                    'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+                    'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0
+                }
             }
             
         except Exception as e:
-            print(f"OpenAI API error: {e}")
+            self.breaker.record_failure()
+            self.metrics.record_error('openai', e)
             # Fall back to rule-based response
-            return self._rule_based_response(message, user_data)
+            return self._fallback(message, context.user_data, _fallback_reason(e))
+
+    def chat_stream(self, message, user_data, conversation_history=None, cache_scope=None):
+        """
+        Process a chat message and yield the response as it is produced.
+        
+        Yields ('delta', text) events followed by a single ('done', result)
+        event, where result has the same keys as chat() returns. OpenAI
+        answers stream token by token; cached and rule-based answers are
+        split into small chunks so the client renders them the same way.
+        
+        Args:
+            message: User's message
+            user_data: Dictionary with user's financial data, or a FinancialContext
+            conversation_history: Conversation or list of previous messages (optional)
+            cache_scope: Partition for cached answers, e.g. the user id (optional)
+        
+        Yields:
+            tuple: (event, payload) pairs
+        """
+        start = time.monotonic()
+        for event, payload in self._chat_stream(message, user_data, conversation_history,
+                                                cache_scope):
+            if event == 'done':
+                self._record(payload, start, stream=True)
+            yield event, payload
+
+    def _chat_stream(self, message, user_data, conversation_history=None, cache_scope=None):
+        """Stream the answer to a chat message (see chat_stream())."""
+        try:
+            context = self.build_context(user_data)
+            user_data = context.user_data
+            
+            if not self.use_openai:
+                yield from self._stream_text(self._rule_based_response(message, user_data))
+                return
+            
+            conversation_history = as_conversation(conversation_history)
+            cacheable = conversation_history.is_empty()
+            if cacheable:
+                cached = self.cache.get(message, user_data, scope=cache_scope)
+                if cached is not None:
+                    yield from self._stream_text(
+                        {'success': True, 'response': cached, 'source': 'cache'}
+                    )
+                    return
+            
+            result = yield from self._openai_stream(message, context, conversation_history)
+            if cacheable and result.get('source') == 'openai':
+                self.cache.set(message, user_data, result['response'], scope=cache_scope)
+        except Exception as e:
+            self.metrics.record_error('chat_stream', e)
+            yield 'done', {
+                'success': False,
+                'response': "I'm having trouble processing your request. Please try again.",
+                'error': str(e),
+                'source': 'error'
+            }
+
+    def _openai_stream(self, message, context, conversation_history=None):
+        """
+        Stream a response from the OpenAI API.
+        
+        Falls back to a chunked rule-based answer if the stream cannot be
+        opened. If it breaks after some text was sent, the partial answer
+        is finished with a note rather than replaced.
+        
+        Returns:
+            dict: The final result, also sent as the 'done' event
+        """
+        if not self.breaker.allow():
+            return (yield from self._stream_text(
+                self._fallback(message, context.user_data, 'breaker_open')
+            ))
+        
+        messages = self._build_messages(message, context, conversation_history)
+        parts = []
+        usage = None
+        stream = None
+        outcome_recorded = False
+        try:
+            stream = self._create_completion(messages, stream=True)
+            for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    parts.append(text)
+                    yield 'delta', text
+            self.breaker.record_success()
+            outcome_recorded = True
+        except Exception as e:
+            self.breaker.record_failure()
+            outcome_recorded = True
+            self.metrics.record_error('openai_stream', e)
+            reason = _fallback_reason(e)
+            if not parts:
+                return (yield from self._stream_text(
+                    self._fallback(message, context.user_data, reason)
+                ))
+            yield 'delta', INTERRUPTED_NOTE
+            result = {'success': True, 'response': ''.join(parts) + INTERRUPTED_NOTE,
+                      'source': 'openai-partial', 'fallback_reason': reason}
+            yield 'done', result
+            return result
+        finally:
+            # Also runs when the consumer stops early (GeneratorExit), releasing
+            # the HTTP connection and, if this was the breaker's trial, the trial
+            if not outcome_recorded:
+                self.breaker.release_trial()
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+        
+        # Servers that ignore stream_options send no usage; estimate it instead
+        response = ''.join(parts)
+        result = {'success': True, 'response': response, 'source': 'openai', 'usage': {
+            'prompt_tokens': getattr(usage, 'prompt_tokens', None) or
+                             sum(estimate_tokens(m['content']) for m in messages),
+            'completion_tokens': getattr(usage, 'completion_tokens', None) or
+                                 estimate_tokens(response)
+        }}
+        yield 'done', result
+        return result
+
+    def _stream_text(self, result):
+        """Yield a finished result as delta events followed by 'done'."""
+        for text in chunk_text(result['response']):
+            yield 'delta', text
+        yield 'done', result
+        return result
 
     def _rule_based_response(self, message, user_data):
-        """Generate response using rule-based system (fallback)."""
-        message_lower = message.lower()
+        """
+        Generate response using rule-based system (fallback).
         
+        The message is classified with intent_classifier; when it covers
+        more than one topic the answers for the top intents are combined.
+        """
         balance = user_data.get('balance', 0)
         total_income = user_data.get('total_income', 0)
         total_expenses = user_data.get('total_expenses', 0)
         
-        # Determine response based on keywords
-        if any(word in message_lower for word in ['save', 'saving', 'savings']):
-            response = self._saving_advice(balance, total_income, total_expenses)
-        elif any(word in message_lower for word in ['budget', 'budgeting', 'spending plan']):
-            response = self._budget_advice(total_income, total_expenses)
-        elif any(word in message_lower for word in ['debt', 'loan', 'credit card', 'owe', 'pay off']):
-            response = self._debt_advice()
-        elif any(word in message_lower for word in ['invest', 'investment', 'stock', 'portfolio', 'grow']):
-            response = self._investment_advice(balance)
-        elif any(word in message_lower for word in ['emergency', 'fund', 'rainy day', 'unexpected']):
-            response = self._emergency_fund_advice(total_expenses)
-        elif any(word in message_lower for word in ['retirement', 'retire', '401k', 'ira', 'pension', 'future']):
-            response = self._retirement_advice()
-        elif any(word in message_lower for word in ['income', 'earn', 'salary', 'side hustle', 'more money']):
-            response = self._income_advice()
-        elif any(word in message_lower for word in ['spend', 'spending', 'expense', 'cut', 'reduce']):
-            response = self._spending_advice(user_data.get('top_categories', []))
-        elif any(word in message_lower for word in ['hello', 'hi', 'hey', 'help', 'what can you']):
-            response = self._welcome_message(balance, total_income, total_expenses)
-        elif any(word in message_lower for word in ['thank', 'thanks', 'appreciate']):
-            response = "You're welcome! I'm here to help you achieve your financial goals. Feel free to ask me anything else about saving, budgeting, investing, or any other financial topic!"
+        handlers = {
+            'saving': lambda: self._saving_advice(balance, total_income, total_expenses),
+            'budget': lambda: self._budget_advice(total_income, total_expenses),
+            'debt': self._debt_advice,
+            'investment': lambda: self._investment_advice(balance),
+            'emergency_fund': lambda: self._emergency_fund_advice(total_expenses),
+            'retirement': self._retirement_advice,
+            'income': self._income_advice,
+            'spending': lambda: self._spending_advice(user_data.get('top_categories', [])),
+            'greeting': lambda: self._welcome_message(balance, total_income, total_expenses),
+            'thanks': lambda: "You're welcome! I'm here to help you achieve your financial goals. Feel free to ask me anything else about saving, budgeting, investing, or any other financial topic!",
+        }
+        
+        intents = intent_classifier.select(message)
+        if intents:
+            response = "\n\n---\n\n".join(handlers[intent]() for intent in intents)
         else:
             response = self._general_advice(balance, total_income, total_expenses)
         
         return {
             'success': True,
             'response': response,
-            'source': 'rule-based'
+            'source': 'rule-based',
+            'intents': intents
         }
 
     def _saving_advice(self, balance, total_income, total_expenses):
@@ -491,19 +1731,153 @@ Would you like specific advice on saving, budgeting, investing, or debt manageme
 
 # Create singleton instance
 ai_advisor = ChengeAI()
+ai_executor = AIExecutor()
+context_cache = FinancialContextCache()
+
+
+def get_financial_context(scope, version, load_user_data):
+    """
+    Get a user's FinancialContext, rebuilding it only when data changed.
+    
+    Args:
+        scope: Cache partition, e.g. the user id
+        version: Version stamp of the user's data
+        load_user_data: Callable returning the user's financial data dict
+    
+    Returns:
+        FinancialContext: Context to pass to get_ai_response()
+    """
+    return context_cache.get(scope, version,
+                             lambda: ai_advisor.build_context(load_user_data(), version))
 
 
-def get_ai_response(message, user_data, conversation_history=None):
+def get_ai_response(message, user_data, conversation_history=None, cache_scope=None):
     """
     Convenience function to get AI response.
     
+    Model calls run on the bounded AI executor. If it is saturated or the
+    answer misses the request budget, the rule-based answer is returned.
+    
     Args:
         message: User's message
-        user_data: Dictionary with user's financial data
-        conversation_history: Optional list of previous messages
+        user_data: Dictionary with user's financial data, or a FinancialContext
+        conversation_history: Optional Conversation or list of previous messages
+        cache_scope: Optional partition for cached answers (e.g. user id)
     
     Returns:
         dict: Response with 'success' and 'response' keys
     """
-    return ai_advisor.chat(message, user_data, conversation_history)
+    user_data = ai_advisor.build_context(user_data)
+    if not ai_advisor.use_openai:
+        return ai_advisor.chat(message, user_data, conversation_history, cache_scope=cache_scope)
+    
+    try:
+        return ai_executor.run(ai_advisor.chat, message, user_data, conversation_history,
+                               cache_scope=cache_scope)
+    except (AIBusyError, TimeoutError) as e:
+        reason = 'executor_busy' if isinstance(e, AIBusyError) else 'budget_exceeded'
+        ai_advisor.metrics.record_fallback(reason, detail=str(e))
+        return ai_advisor._fallback(message, user_data.user_data, reason)
+
+
+def stream_ai_response(message, user_data, conversation_history=None, cache_scope=None):
+    """
+    Convenience function to stream an AI response.
+    
+    Like get_ai_response, the stream is produced on the AI executor and
+    degrades to the rule-based answer when the executor is saturated or
+    the budget runs out.
+    
+    Returns:
+        generator: ('delta', text) events followed by ('done', result)
+    """
+    user_data = ai_advisor.build_context(user_data)
+    events = ai_advisor.chat_stream(message, user_data, conversation_history,
+                                    cache_scope=cache_scope)
+    if not ai_advisor.use_openai:
+        return events
+    return _degrading_stream(events, message, user_data)
+
+
+def _degrading_stream(events, message, user_data):
+    """Relay a stream from the AI executor, falling back if it is busy or slow."""
+    parts = []
+    relayed = ai_executor.stream(events)
+    try:
+        for event, payload in relayed:
+            if event == 'delta':
+                parts.append(payload)
+            yield event, payload
+    except (AIBusyError, TimeoutError) as e:
+        reason = 'executor_busy' if isinstance(e, AIBusyError) else 'budget_exceeded'
+        ai_advisor.metrics.record_fallback(reason, detail=str(e), stream=True)
+        if not parts:
+            yield from ai_advisor._stream_text(
+                ai_advisor._fallback(message, user_data.user_data, reason)
+            )
+            return
+        yield 'delta', INTERRUPTED_NOTE
+        yield 'done', {'success': True, 'response': ''.join(parts) + INTERRUPTED_NOTE,
+                       'source': 'openai-partial', 'fallback_reason': reason}
+    finally:
+        # Stops the pump when the client disconnects mid-stream
+        relayed.close()
+
+
+_conversation_store = None
+_conversation_store_lock = threading.Lock()
+
+
+def _get_conversation_store():
+    """Create the conversation store on first use (it may open a database)."""
+    global _conversation_store
+    with _conversation_store_lock:
+        if _conversation_store is None:
+            _conversation_store = ConversationStore(
+                create_cache_backend(SESSION_BACKEND, SESSION_PATH)
+            )
+        return _conversation_store
+
 
+def load_conversation(scope, session_id=None, history=None):
+    """
+    Load a user's conversation session.
+    
+    Args:
+        scope: Session partition, e.g. the user id
+        session_id: Id returned with an earlier answer (optional)
+        history: Turns sent by the client, used to seed a new session (optional;
+            anything but a list is ignored)
+    
+    Returns:
+        Conversation: The session to pass as conversation_history
+    """
+    if not isinstance(history, list):
+        history = []
+    conversation = _get_conversation_store().load(scope, session_id)
+    if conversation.is_empty() and history:
+        conversation = Conversation(conversation.id, turns=history)
+    return conversation
+
+
+def record_conversation_turn(scope, conversation, message, response):
+    """Append an answered exchange to a session and save it."""
+    conversation.add_turn(message, response)
+    _get_conversation_store().save(scope, conversation)
+
+
+def get_ai_metrics():
+    """Return advisor call metrics, cache hit rate and executor usage."""
+    metrics = ai_advisor.metrics.snapshot(cache=ai_advisor.cache)
+    metrics['executor'] = ai_executor.stats()
+    metrics['breaker_state'] = ai_advisor.breaker.state
+    return metrics
+
+
+def get_ai_status():
+    """Return the advisor mode and AI executor usage for monitoring."""
+    return {
+        'openai_enabled': ai_advisor.use_openai,
+        'breaker_state': ai_advisor.breaker.state,
+        'executor': ai_executor.stats()
+    }
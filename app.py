@@ -3,16 +3,22 @@ Chengeta - Personal Finance Management Application
 Flask backend with user authentication and multi-user support
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import (Flask, Response, render_template, request, jsonify, send_file, redirect,
+                   url_for, stream_with_context)
 from flask_login import LoginManager, login_required, current_user
 from models import db, User
 from auth import auth_bp
 from finance_tracker import FinanceTracker
-from visualizer import FinanceVisualizer
-from ai_service import get_ai_response
-from youtube_service import fetch_finance_videos
+from visualizer import (FinanceVisualizer, ChartDataset, CHART_DEPENDENCIES,
+                        mark_charts_stale, load_data_versions)
+from ai_service import (get_ai_response, stream_ai_response, get_ai_status, get_ai_metrics,
+                        get_financial_context, load_conversation, record_conversation_turn)
+from youtube_service import fetch_finance_videos, videos_response_body, get_video_index
+from thumbnails import thumbnail_cache, thumbnail_response
+from insights import refresh_user_insights, advisor_summary
 from academy import academy_bp
 import os
+import json
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -41,18 +47,33 @@ def load_user(user_id):
     return User.query.get(int(user_id))
 
 
-def get_user_tracker():
-    """Get tracker instance for current user."""
+def _load_user_tracker():
+    """Load the current user's transactions and budgets."""
     return FinanceTracker(
         data_file=current_user.get_data_file(),
         budget_file=current_user.get_budget_file()
     )
 
 
+def get_user_tracker():
+    """Get tracker instance for current user."""
+    tracker = _load_user_tracker()
+    
+    # Changes mark only the affected charts for regeneration
+    charts_dir = current_user.get_charts_dir()
+    tracker.add_listener(lambda kinds: mark_charts_stale(charts_dir, kinds))
+    return tracker
+
+
 def get_user_visualizer():
     """Get visualizer instance for current user."""
-    tracker = get_user_tracker()
-    return FinanceVisualizer(tracker)
+    # Versions are read before the data, so a change another worker makes
+    # while it loads is never recorded as drawn
+    charts_dir = current_user.get_charts_dir()
+    data_versions = load_data_versions(charts_dir)
+    # The visualizer subscribes to its tracker's changes itself
+    return FinanceVisualizer(_load_user_tracker(), output_dir=charts_dir,
+                             data_versions=data_versions)
 
 
 # Public Routes
@@ -308,15 +329,22 @@ def delete_budget(category):
 @app.route('/api/charts/generate', methods=['POST'])
 @login_required
 def generate_charts():
-    """Generate all visualization charts."""
+    """Regenerate the charts whose data changed (all charts with force=true)."""
     try:
+        data = request.get_json(silent=True) or {}
+        force = data.get('force') or request.args.get('force', 'false').lower() == 'true'
+        
         visualizer = get_user_visualizer()
-        charts = visualizer.generate_all_charts()
+        stale = list(CHART_DEPENDENCIES) if force else visualizer.get_stale_charts()
+        if stale:
+            visualizer.generate_charts(stale)
+        charts = visualizer.get_current_charts()
         
         return jsonify({
             'success': True,
-            'message': f'Generated {len(charts)} charts',
-            'data': charts
+            'message': f'Generated {len(stale)} charts',
+            'data': charts,
+            'regenerated': stale
         })
     except Exception as e:
         return jsonify({
@@ -329,7 +357,7 @@ def generate_charts():
 @login_required
 def get_chart(chart_name):
     """Serve a chart image."""
-    chart_path = os.path.join('data', 'charts', f'{chart_name}.png')
+    chart_path = os.path.join(current_user.get_charts_dir(), f'{chart_name}.png')
     
     if os.path.exists(chart_path):
         return send_file(chart_path, mimetype='image/png')
@@ -382,48 +410,128 @@ def get_recent_stats():
     })
 
 
+def get_ai_user_data(tracker):
+    """Summarize a user's finances for the AI advisor prompt."""
+    return advisor_summary(ChartDataset.from_tracker(tracker))
+
+
+def get_ai_context():
+    """
+    Get the current user's financial context for the AI advisor.
+    
+    The context (summary and rendered system prompt) is cached per user and
+    only rebuilt when their transactions or budgets files change.
+    """
+    version = FinanceTracker.get_data_version(current_user.get_data_file(),
+                                              current_user.get_budget_file())
+    return get_financial_context(current_user.id, version,
+                                 lambda: get_ai_user_data(_load_user_tracker()))
+
+
 @app.route('/api/ai/chat', methods=['POST'])
 @login_required
 def ai_chat():
-    """ChengeAI chat endpoint - provides AI-powered financial advice."""
+    """
+    ChengeAI chat endpoint - provides AI-powered financial advice.
+    
+    Conversations are kept server-side: send the 'session_id' returned with
+    the previous answer instead of the full history. A 'history' list is
+    still accepted to seed a new session.
+    """
     try:
         data = request.get_json()
         user_message = data.get('message', '')
-        conversation_history = data.get('history', [])
+        conversation = load_conversation(current_user.id, data.get('session_id'),
+                                         data.get('history'))
         
         # Get user's financial context
-        tracker = get_user_tracker()
-        summary = tracker.get_summary()
-        
-        # Get expense breakdown by category
-        category_summary = tracker.get_category_summary()
-        
-        # Extract expense amounts from category summary
-        expense_categories = {
-            cat: data['expense'] 
-            for cat, data in category_summary.items() 
-            if data['expense'] > 0
-        }
-        
-        # Prepare user data for AI
-        user_data = {
-            'total_income': summary['total_income'],
-            'total_expenses': summary['total_expenses'],
-            'balance': summary['balance'],
-            'transaction_count': summary['transaction_count'],
-            'top_categories': [
-                {'category': cat, 'amount': amount}
-                for cat, amount in sorted(expense_categories.items(), key=lambda x: x[1], reverse=True)[:5]
-            ]
-        }
+        user_data = get_ai_context()
         
         # Get AI response
-        result = get_ai_response(user_message, user_data, conversation_history)
+        result = get_ai_response(user_message, user_data, conversation,
+                                 cache_scope=current_user.id)
+        if result['success']:
+            record_conversation_turn(current_user.id, conversation, user_message,
+                                     result['response'])
         
         return jsonify({
             'success': result['success'],
             'response': result['response'],
-            'source': result.get('source', 'unknown')
+            'source': result.get('source', 'unknown'),
+            'session_id': conversation.id
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/ai/chat/stream', methods=['GET', 'POST'])
+@login_required
+def ai_chat_stream():
+    """
+    Streaming ChengeAI chat endpoint (Server-Sent Events).
+    
+    Accepts the same JSON body as /api/ai/chat via POST, or 'message',
+    'session_id' and a JSON-encoded 'history' query parameter via GET (for
+    EventSource). Sends 'delta' events with {"text": ...} as the answer is
+    produced and a final 'done' event with the full response, its source
+    and the session id.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+    else:
+        data = dict(request.args)
+        try:
+            data['history'] = json.loads(request.args.get('history', '[]'))
+        except ValueError:
+            data['history'] = []
+    user_message = data.get('message', '')
+    
+    if not user_message.strip():
+        return jsonify({'success': False, 'message': 'Message is required'}), 400
+    
+    # Build the context before streaming starts so errors surface as a 500
+    user_id = current_user.id
+    conversation = load_conversation(user_id, data.get('session_id'), data.get('history'))
+    user_data = get_ai_context()
+    events = stream_ai_response(user_message, user_data, conversation, cache_scope=user_id)
+    
+    def generate():
+        for event, payload in events:
+            if event == 'delta':
+                payload = {'text': payload}
+            elif event == 'done':
+                if payload.get('success'):
+                    record_conversation_turn(user_id, conversation, user_message,
+                                             payload['response'])
+                payload = dict(payload, session_id=conversation.id)
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop nginx-style proxies from buffering the stream
+    })
+
+
+@app.route('/api/ai/insights', methods=['GET'])
+@login_required
+def ai_insights():
+    """
+    Get the current user's weekly insights.
+    
+    Insights are normally precomputed by the insights.py batch job; if they
+    are missing or out of date they are generated here with the rule engine.
+    """
+    try:
+        record, _ = refresh_user_insights(current_user.get_data_file(),
+                                          current_user.get_budget_file(),
+                                          current_user.get_insights_file(),
+                                          user_id=current_user.id)
+        return jsonify({
+            'success': True,
+            'data': record
         })
     except Exception as e:
         return jsonify({
@@ -432,10 +540,41 @@ def ai_chat():
         }), 500
 
 
+@app.route('/api/ai/status', methods=['GET'])
+@login_required
+def ai_status():
+    """Report the AI advisor mode, breaker state and executor queue depth."""
+    return jsonify({
+        'success': True,
+        'data': get_ai_status()
+    })
+
+
+@app.route('/api/ai/metrics', methods=['GET'])
+@login_required
+def ai_metrics():
+    """
+    Report ChengeAI call metrics for this worker process.
+    
+    Includes calls by answer source, a latency histogram with p50/p95/p99,
+    token usage, fallback counts by reason and the response cache hit rate.
+    """
+    return jsonify({
+        'success': True,
+        'data': get_ai_metrics()
+    })
+
+
 @app.route('/api/resources/videos', methods=['GET'])
 @login_required
 def get_resource_videos():
-    """Fetch finance education videos from YouTube."""
+    """
+    Fetch finance education videos from YouTube.
+    
+    Optional query parameters filter and page the library: 'category',
+    'level', 'topic', 'q' (search), 'featured', 'limit' and 'offset'.
+    Without them the whole library is returned.
+    """
     try:
         # Check if refresh is requested
         force_refresh = request.args.get('refresh', 'false').lower() == 'true'
@@ -443,10 +582,22 @@ def get_resource_videos():
         # Fetch videos (from cache or YouTube API)
         videos = fetch_finance_videos(force_refresh=force_refresh)
         
+        filters = {name: request.args.get(name) for name in ('category', 'level', 'topic', 'q')}
+        filters['featured'] = request.args.get('featured', 'false').lower() == 'true'
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        
+        if not any(filters.values()) and limit is None and not offset:
+            # The cached list's JSON body is precomputed
+            return Response(videos_response_body(videos), mimetype='application/json')
+        
+        page, total = get_video_index(videos).query(limit=limit, offset=offset, **filters)
         return jsonify({
             'success': True,
-            'videos': videos,
-            'count': len(videos)
+            'videos': page,
+            'count': len(page),
+            'total': total,
+            'offset': max(0, offset)
         })
     except Exception as e:
         return jsonify({
@@ -456,6 +607,21 @@ def get_resource_videos():
         }), 500
 
 
+@app.route('/api/resources/thumb/<youtube_id>', methods=['GET'])
+@login_required
+def get_resource_thumbnail(youtube_id):
+    """
+    Serve a video thumbnail as WebP from the local thumbnail cache.
+    
+    The optional 'w' query parameter picks the width. Responses carry an
+    ETag and are cached by the browser for THUMB_MAX_AGE_SECONDS.
+    """
+    data = thumbnail_cache.get(youtube_id, request.args.get('w', type=int))
+    if data is None:
+        return jsonify({'success': False, 'message': 'Thumbnail not available'}), 404
+    return thumbnail_response(data, request)
+
+
 # Database initialization
 def init_database():
     """Initialize the database."""
@@ -0,0 +1,123 @@
+"""
+Benchmark for video categorization in the resources library.
+
+Classifies a large synthetic corpus of video titles and descriptions
+with classify_video and with the original approach (three functions that
+each lowercase the text and scan every keyword list), checks that both
+give identical results, and reports videos per second for each.
+
+Usage:
+    python benchmarks/bench_classify.py
+    python benchmarks/bench_classify.py --videos 50000 --seed 7
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from youtube_service import classify_video  # noqa: E402
+
+WORDS = (
+    "how to money make more your the for with and best top tips guide fast easy simple "
+    "budget budgeting spending plan invest investing stock shares etf index fund vanguard "
+    "portfolio save saving savings frugal minimalist emergency fund rainy day debt loan "
+    "credit card credit score fico pay off retire retirement 401k ira pension beginner "
+    "basic 101 introduction advanced expert complex strategy wealth rich millionaire "
+    "financial freedom fire independence real estate rental property side hustle gig "
+    "extra income passive income dividend mindset start today week year salary"
+).split()
+
+
+def reference_classify(title, description):
+    """The original categorize_video, determine_level and extract_topics, unchanged."""
+    text = (title + ' ' + description).lower()
+    if any(word in text for word in ['budget', 'budgeting', '50/30/20', 'spending']):
+        category = 'budgeting'
+    elif any(word in text for word in ['invest', 'stock', 'etf', 'index fund', 'portfolio']):
+        category = 'investing'
+    elif any(word in text for word in ['save', 'saving', 'emergency fund', 'frugal']):
+        category = 'savings'
+    elif any(word in text for word in ['debt', 'credit', 'loan', 'pay off', 'payoff']):
+        category = 'debt'
+    elif any(word in text for word in ['retire', '401k', 'ira', 'pension']):
+        category = 'retirement'
+    elif any(word in text for word in ['mindset', 'wealth', 'rich', 'millionaire', 'financial freedom']):
+        category = 'mindset'
+    else:
+        category = 'general'
+
+    text = (title + ' ' + description).lower()
+    if any(word in text for word in ['beginner', 'basic', 'simple', 'easy', 'start', '101', 'introduction']):
+        level = 'Beginner'
+    elif any(word in text for word in ['advanced', 'expert', 'complex', 'strategy']):
+        level = 'Advanced'
+    else:
+        level = 'All Levels'
+
+    text = (title + ' ' + description).lower()
+    topic_keywords = {
+        'Budgeting': ['budget', 'budgeting', 'spending plan'],
+        'Investing': ['invest', 'investing', 'investment'],
+        'Saving': ['save', 'saving', 'savings'],
+        'Debt': ['debt', 'loan', 'credit card'],
+        'Retirement': ['retire', 'retirement', '401k', 'ira'],
+        'Credit Score': ['credit score', 'fico', 'credit report'],
+        'Emergency Fund': ['emergency fund', 'rainy day'],
+        'Index Funds': ['index fund', 's&p 500', 'vanguard'],
+        'Stocks': ['stock', 'shares', 'equity'],
+        'Real Estate': ['real estate', 'property', 'rental'],
+        'Side Hustle': ['side hustle', 'extra income', 'gig'],
+        'Passive Income': ['passive income', 'dividend'],
+        'Frugal Living': ['frugal', 'minimalist', 'save money'],
+        'Financial Freedom': ['financial freedom', 'fire', 'independence']
+    }
+    topics = [topic for topic, keywords in topic_keywords.items()
+              if any(kw in text for kw in keywords)]
+    return category, level, topics[:3] if topics else ['Personal Finance']
+
+
+def make_corpus(count, seed):
+    """Build (title, description) pairs of YouTube-like length."""
+    rng = random.Random(seed)
+    return [(' '.join(rng.choices(WORDS, k=rng.randint(5, 12))).title(),
+             ' '.join(rng.choices(WORDS, k=rng.randint(20, 45))))
+            for _ in range(count)]
+
+
+def measure(fn, corpus):
+    """Classify the whole corpus; return (results, videos per second)."""
+    start = time.perf_counter()
+    results = [fn(title, description) for title, description in corpus]
+    return results, len(corpus) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure video classification throughput')
+    parser.add_argument('--videos', type=int, default=20000, help='Corpus size (default: 20000)')
+    parser.add_argument('--seed', type=int, default=42, help='Corpus random seed')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.videos, args.seed)
+    expected, reference_rps = measure(reference_classify, corpus)
+    results, classify_rps = measure(classify_video, corpus)
+
+    print(f"original (3 scans):  {reference_rps:10,.0f} videos/s")
+    print(f"classify_video:      {classify_rps:10,.0f} videos/s  ({classify_rps / reference_rps:.1f}x)")
+
+    mismatches = [(corpus[i], expected[i], results[i])
+                  for i in range(len(corpus)) if tuple(results[i]) != tuple(expected[i])]
+    if mismatches:
+        print(f"\nFAIL: {len(mismatches)} videos classified differently, e.g. {mismatches[0]}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
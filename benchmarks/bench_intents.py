@@ -0,0 +1,95 @@
+"""
+Throughput benchmark for the rule-based ChengeAI advisor.
+
+Classifies a mix of typical chat messages with the compiled intent
+classifier and builds full rule-based answers on a single core, reporting
+messages per second for each. Fails when answers are slower than
+--min-rps, the offline fallback's throughput target.
+
+Usage:
+    python benchmarks/bench_intents.py
+    python benchmarks/bench_intents.py --seconds 3 --min-rps 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from ai_service import ChengeAI, ResponseCache, intent_classifier  # noqa: E402
+
+MESSAGES = [
+    "How can I save more money each month?",
+    "Hi! What can you do?",
+    "Help me make a budget for groceries and rent",
+    "I have credit card debt, what should I pay off first?",
+    "Should I invest in stocks or an index fund?",
+    "How big should my emergency fund be?",
+    "When should I start saving for retirement? I have a 401k at work",
+    "How can I earn more money with a side hustle?",
+    "Where can I cut my spending?",
+    "Thanks, that was really helpful",
+    "I want to save for a house and also invest some of my salary",
+    "What's the weather like today?",
+    "I owe my brother $500 and my car loan is due, how do I reduce expenses? " * 3,
+]
+
+USER_DATA = {
+    'total_income': 5000,
+    'total_expenses': 3200,
+    'balance': 1800,
+    'transaction_count': 42,
+    'top_categories': [{'category': 'Rent', 'amount': 1500}, {'category': 'Food', 'amount': 600}]
+}
+
+
+def measure(fn, seconds):
+    """
+    Call fn over MESSAGES repeatedly for about the given time.
+
+    Returns:
+        float: Messages processed per second
+    """
+    count = 0
+    start = time.perf_counter()
+    while True:
+        for message in MESSAGES:
+            fn(message)
+        count += len(MESSAGES)
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure rule-based advisor throughput')
+    parser.add_argument('--seconds', type=float, default=2, help='Time per measurement')
+    parser.add_argument('--min-rps', type=float, default=2000,
+                        help='Fail if full answers are slower than this (default: 2000)')
+    args = parser.parse_args()
+
+    advisor = ChengeAI(cache=ResponseCache(None))
+
+    print("Intents per message:")
+    for message in MESSAGES:
+        print(f"  {', '.join(intent_classifier.select(message)) or '(general)':28} {message[:50]}")
+
+    classify_rps = measure(intent_classifier.classify, args.seconds)
+    answer_rps = measure(lambda m: advisor._rule_based_response(m, USER_DATA), args.seconds)
+
+    print(f"\nclassify:           {classify_rps:10,.0f} messages/s")
+    print(f"rule-based answer:  {answer_rps:10,.0f} messages/s")
+
+    if answer_rps < args.min_rps:
+        print(f"\nFAIL: {answer_rps:,.0f} messages/s is below {args.min_rps:,.0f}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
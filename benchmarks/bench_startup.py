@@ -0,0 +1,122 @@
+"""
+Startup-time benchmark for the Chengeta web app.
+
+Runs ``python -X importtime -c "import app"`` in fresh interpreters (what a
+gunicorn worker pays before serving its first request), reports the median
+import time and the slowest imports, and fails when:
+
+- a module in DEFERRED_MODULES is imported at startup, or
+- the median exceeds --budget-ms, or
+- the median regresses more than --tolerance over a saved baseline.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1500
+    python benchmarks/bench_startup.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(BASE_DIR, 'benchmarks', 'startup_baseline.json')
+
+# Heavy packages that must only be imported on first use
+DEFERRED_MODULES = ['matplotlib', 'pandas', 'openai']
+
+
+def measure_import(module='app'):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        tuple: (total_ms, list of (cumulative_ms, name, depth))
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    total_ms = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name_field = line.split(':', 1)[1].split('|')
+        name = name_field.strip()
+        depth = (len(name_field) - len(name_field.lstrip()) - 1) // 2
+        cumulative_ms = int(cumulative_us) / 1000
+        imports.append((cumulative_ms, name, depth))
+        if name == module:
+            total_ms = cumulative_ms
+
+    return total_ms, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure web worker import time')
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters')
+    parser.add_argument('--top', type=int, default=10, help='Slowest direct imports to show')
+    parser.add_argument('--budget-ms', type=float, help='Fail if the median exceeds this')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed regression over the baseline (default: 0.25)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store this median as the new baseline')
+    args = parser.parse_args()
+
+    totals = []
+    imports = []
+    for _ in range(args.runs):
+        total_ms, imports = measure_import(args.module)
+        totals.append(total_ms)
+    median_ms = statistics.median(totals)
+
+    print(f"import {args.module}: median {median_ms:.0f} ms "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}, {args.runs} runs)")
+
+    print(f"\nSlowest imports under {args.module}:")
+    direct = sorted((i for i in imports if i[2] == 1), reverse=True)
+    for cumulative_ms, name, _ in direct[:args.top]:
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    failures = []
+
+    loaded = {name.split('.')[0] for _, name, _ in imports}
+    for module in DEFERRED_MODULES:
+        if module in loaded:
+            failures.append(f"{module} is imported at startup (should be deferred)")
+
+    if args.budget_ms and median_ms > args.budget_ms:
+        failures.append(f"median {median_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump({'module': args.module, 'median_ms': round(median_ms, 1)}, f, indent=2)
+        print(f"\nBaseline saved to {BASELINE_FILE}")
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r') as f:
+            baseline = json.load(f)
+        limit = baseline['median_ms'] * (1 + args.tolerance)
+        print(f"\nBaseline: {baseline['median_ms']:.0f} ms (limit {limit:.0f} ms)")
+        if baseline.get('module') == args.module and median_ms > limit:
+            failures.append(f"median {median_ms:.0f} ms regressed past baseline limit {limit:.0f} ms")
+
+    if failures:
+        print("\nFAIL:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
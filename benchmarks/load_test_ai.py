@@ -0,0 +1,267 @@
+"""
+Load test for the ChengeAI chat endpoint.
+
+Sends concurrent requests to /api/ai/chat (or /api/ai/chat/stream) and
+reports throughput and p50/p95/p99 latency. The OpenAI path is served by
+the local stub in stub_llm_server.py, so no API key or quota is needed;
+the rule-based path is measured with OpenAI disabled.
+
+By default the app runs in-process through the Flask test client, logged
+in as --user-id (the first user if omitted). Pass --url with --username
+and --password to load-test a running server instead; start that server
+with OPENAI_BASE_URL pointing at a stub to test its OpenAI path.
+
+Usage:
+    python benchmarks/load_test_ai.py --mode both --requests 200 --concurrency 16
+    python benchmarks/load_test_ai.py --mode openai --stream --latency-ms 1200
+    python benchmarks/load_test_ai.py --url http://127.0.0.1:5000 --username demo --password secret
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from stub_llm_server import StubLLMServer  # noqa: E402
+
+MESSAGES = [
+    "How can I save more money each month?",
+    "Help me make a budget for groceries and rent",
+    "I have credit card debt, what should I pay off first?",
+    "Should I invest in stocks or an index fund?",
+    "How big should my emergency fund be?",
+    "Where can I cut my spending?",
+    "When should I start saving for retirement?",
+    "How can I earn more money with a side hustle?",
+]
+
+
+def percentile(values, q):
+    """Return the q-th percentile (0-1) of sorted values, nearest rank."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+def read_stream(lines, start):
+    """
+    Consume an SSE response.
+
+    Args:
+        lines: Iterable of decoded lines
+        start (float): perf_counter() when the request was sent
+
+    Returns:
+        tuple: (seconds until the first delta or None, final 'done' payload or None)
+    """
+    first_delta = None
+    event = None
+    done = None
+    for line in lines:
+        if line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            if event == 'delta' and first_delta is None:
+                first_delta = time.perf_counter() - start
+            elif event == 'done':
+                done = json.loads(line[5:])
+    return first_delta, done
+
+
+class InProcessClient:
+    """Logged-in Flask test client for one worker thread."""
+
+    def __init__(self, app, user_id):
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+    def chat(self, message, stream):
+        path = '/api/ai/chat/stream' if stream else '/api/ai/chat'
+        start = time.perf_counter()
+        response = self.client.post(path, json={'message': message}, buffered=not stream)
+        if not stream:
+            return response.status_code, None, response.get_json()
+        lines = (chunk.decode('utf-8') for chunk in response.response
+                 for chunk in chunk.splitlines())
+        first_delta, done = read_stream(lines, start)
+        response.close()
+        return response.status_code, first_delta, done
+
+
+class HTTPClient:
+    """Logged-in requests session against a running server for one worker thread."""
+
+    def __init__(self, url, username, password):
+        import requests
+        self.url = url.rstrip('/')
+        self.session = requests.Session()
+        response = self.session.post(f'{self.url}/login',
+                                     json={'username': username, 'password': password},
+                                     timeout=10)
+        if not response.ok:
+            raise RuntimeError(f'Login failed with HTTP {response.status_code}')
+
+    def chat(self, message, stream):
+        path = '/api/ai/chat/stream' if stream else '/api/ai/chat'
+        start = time.perf_counter()
+        response = self.session.post(f'{self.url}{path}', json={'message': message},
+                                     stream=stream, timeout=60)
+        if not stream:
+            return response.status_code, None, response.json()
+        first_delta, done = read_stream(response.iter_lines(decode_unicode=True), start)
+        return response.status_code, first_delta, done
+
+
+def run_load(make_client, total, concurrency, stream):
+    """
+    Send total chat requests from concurrency worker threads.
+
+    Args:
+        make_client: Callable returning a logged-in client for a thread
+        total (int): Number of requests
+        concurrency (int): Requests in flight at once
+        stream (bool): Use the streaming endpoint
+
+    Returns:
+        dict: Latencies, time-to-first-token, sources, errors and wall time
+    """
+    local = threading.local()
+    lock = threading.Lock()
+    results = {'latencies': [], 'first_tokens': [], 'sources': Counter(), 'errors': 0}
+
+    def one(i):
+        if not hasattr(local, 'client'):
+            local.client = make_client()
+        # Vary the message so identical requests don't all hit the cache
+        message = f"{MESSAGES[i % len(MESSAGES)]} (request {i})"
+        start = time.perf_counter()
+        try:
+            status, first_delta, body = local.client.chat(message, stream)
+        except Exception as e:
+            print(f"[!] Request {i} failed: {e}")
+            status, first_delta, body = None, None, None
+        elapsed = time.perf_counter() - start
+
+        with lock:
+            if status != 200 or not body or not body.get('success'):
+                results['errors'] += 1
+                return
+            results['latencies'].append(elapsed)
+            results['sources'][body.get('source', 'unknown')] += 1
+            if first_delta is not None:
+                results['first_tokens'].append(first_delta)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    results['wall'] = time.perf_counter() - start
+    return results
+
+
+def report(label, results, metrics=None):
+    """Print throughput and latency percentiles for one run."""
+    latencies = sorted(results['latencies'])
+    ok = len(latencies)
+    print(f"\n{label}")
+    print(f"  requests:   {ok + results['errors']} ({results['errors']} errors)")
+    print(f"  throughput: {ok / results['wall']:,.1f} requests/s over {results['wall']:.2f}s")
+    if latencies:
+        print("  latency:    " + "  ".join(
+            f"p{int(q * 100)} {percentile(latencies, q) * 1000:,.0f}ms" for q in (0.5, 0.95, 0.99)))
+    first_tokens = sorted(results['first_tokens'])
+    if first_tokens:
+        print("  first token: " + "  ".join(
+            f"p{int(q * 100)} {percentile(first_tokens, q) * 1000:,.0f}ms" for q in (0.5, 0.95, 0.99)))
+    print(f"  sources:    {dict(results['sources'])}")
+    if metrics and metrics.get('fallbacks'):
+        print(f"  fallbacks:  {metrics['fallbacks']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the ChengeAI chat endpoint')
+    parser.add_argument('--mode', choices=['rule', 'openai', 'both'], default='both',
+                        help='Advisor path to measure in-process (default: both)')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per run')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once')
+    parser.add_argument('--stream', action='store_true', help='Use the streaming endpoint')
+    parser.add_argument('--cache', action='store_true', help='Keep the response cache enabled')
+    parser.add_argument('--user-id', type=int, help='User to log in as in-process')
+    parser.add_argument('--latency-ms', type=float, default=500, help='Stub time to first token')
+    parser.add_argument('--jitter-ms', type=float, default=100, help='Stub random extra delay')
+    parser.add_argument('--token-delay-ms', type=float, default=10, help='Stub delay per streamed token')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Stub fraction of HTTP 500s')
+    parser.add_argument('--url', help='Load-test a running server instead')
+    parser.add_argument('--username', help='Login for --url')
+    parser.add_argument('--password', help='Password for --url')
+    args = parser.parse_args()
+
+    if args.url:
+        if not (args.username and args.password):
+            parser.error('--url needs --username and --password')
+        results = run_load(lambda: HTTPClient(args.url, args.username, args.password),
+                           args.requests, args.concurrency, args.stream)
+        report(f"{args.url} (stream={args.stream})", results)
+        return 1 if results['errors'] == args.requests else 0
+
+    # Keep load-test conversations out of the on-disk session store
+    os.environ.setdefault('CHENGEAI_SESSION_BACKEND', 'memory')
+    os.chdir(BASE_DIR)
+    from app import app
+    from models import User
+    from ai_service import ai_advisor, ResponseCache, get_ai_metrics
+
+    with app.app_context():
+        user = User.query.get(args.user_id) if args.user_id else User.query.order_by(User.id).first()
+    if user is None:
+        print("No user to log in as; register one or pass --user-id")
+        return 1
+    if not args.cache:
+        ai_advisor.cache = ResponseCache(None)
+
+    modes = ['rule', 'openai'] if args.mode == 'both' else [args.mode]
+    failed = False
+    for mode in modes:
+        stub = None
+        if mode == 'openai':
+            stub = StubLLMServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                 token_delay_ms=args.token_delay_ms,
+                                 error_rate=args.error_rate).start()
+            ai_advisor.api_key = 'stub'
+            ai_advisor.base_url = stub.base_url
+            ai_advisor.client = None
+            ai_advisor.use_openai = True
+        else:
+            ai_advisor.use_openai = False
+
+        before = get_ai_metrics().get('fallbacks', {})
+        try:
+            results = run_load(lambda: InProcessClient(app, user.id),
+                               args.requests, args.concurrency, args.stream)
+        finally:
+            if stub:
+                stub.stop()
+        after = get_ai_metrics().get('fallbacks', {})
+        fallbacks = {key: after[key] - before.get(key, 0) for key in after
+                     if after[key] - before.get(key, 0)}
+
+        label = (f"{mode} (concurrency={args.concurrency}, stream={args.stream}"
+                 + (f", stub latency={args.latency_ms:.0f}ms" if stub else "") + ")")
+        report(label, results, {'fallbacks': fallbacks})
+        failed = failed or results['errors'] == args.requests
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Local OpenAI-compatible stub server for load-testing ChengeAI.
+
+Answers POST /v1/chat/completions with canned financial advice after a
+configurable delay, with or without streaming, so the advisor's OpenAI
+path can be exercised without an API key or quota.
+
+Usage:
+    python benchmarks/stub_llm_server.py --port 8001 --latency-ms 800
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python app.py
+
+Options let the stub add jitter, a per-token delay when streaming and a
+fraction of HTTP 500 responses.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = ("Here are a few ideas based on your numbers. **Automate your savings** by moving a "
+         "fixed amount to savings on payday. Review your top expense categories and set a "
+         "weekly cap for each. Build an emergency fund covering three to six months of "
+         "expenses before investing. What would you like to focus on first?")
+
+
+class StubLLMServer:
+    """
+    Threaded stub of the OpenAI chat completions API.
+
+    Args:
+        port (int): Port to listen on (0 picks a free port)
+        latency_ms (float): Delay before the response (or first token)
+        jitter_ms (float): Random extra delay of up to this much
+        token_delay_ms (float): Delay between streamed tokens
+        error_rate (float): Fraction of requests answered with HTTP 500
+        reply (str): Text every completion returns
+    """
+
+    def __init__(self, port=0, latency_ms=500, jitter_ms=0, token_delay_ms=20,
+                 error_rate=0.0, reply=REPLY):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_delay_ms = token_delay_ms
+        self.error_rate = error_rate
+        self.reply = reply
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/v1'
+        self._thread = None
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with stub._lock:
+                    stub.requests += 1
+                if not self.path.endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+                    return
+
+                request = json.loads(body or b'{}')
+                time.sleep((stub.latency_ms + random.uniform(0, stub.jitter_ms)) / 1000)
+
+                if random.random() < stub.error_rate:
+                    self._send_json(500, {'error': {'message': 'Stub error', 'type': 'server_error'}})
+                    return
+
+                prompt_tokens = sum(len(m.get('content') or '') for m in request.get('messages', [])) // 4
+                completion_tokens = len(stub.reply) // 4
+                if request.get('stream'):
+                    include_usage = (request.get('stream_options') or {}).get('include_usage')
+                    self._send_stream(request, prompt_tokens, completion_tokens, include_usage)
+                else:
+                    self._send_json(200, {
+                        'id': 'chatcmpl-stub', 'object': 'chat.completion',
+                        'created': int(time.time()), 'model': request.get('model', 'stub'),
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': stub.reply}}],
+                        'usage': {'prompt_tokens': prompt_tokens,
+                                  'completion_tokens': completion_tokens,
+                                  'total_tokens': prompt_tokens + completion_tokens}
+                    })
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, request, prompt_tokens, completion_tokens, include_usage):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                def chunk(choices, usage=None):
+                    payload = {'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk',
+                               'created': int(time.time()), 'model': request.get('model', 'stub'),
+                               'choices': choices}
+                    if usage:
+                        payload['usage'] = usage
+                    self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+
+                try:
+                    words = stub.reply.split(' ')
+                    for i, word in enumerate(words):
+                        text = word if i == 0 else ' ' + word
+                        chunk([{'index': 0, 'finish_reason': None, 'delta': {'content': text}}])
+                        time.sleep(stub.token_delay_ms / 1000)
+                    chunk([{'index': 0, 'finish_reason': 'stop', 'delta': {}}])
+                    if include_usage:
+                        chunk([], {'prompt_tokens': prompt_tokens,
+                                   'completion_tokens': completion_tokens,
+                                   'total_tokens': prompt_tokens + completion_tokens})
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenAI-compatible stub server')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=500,
+                        help='Delay before the response or first token (default: 500)')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra delay')
+    parser.add_argument('--token-delay-ms', type=float, default=20,
+                        help='Delay between streamed tokens (default: 20)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with HTTP 500')
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.port, args.latency_ms, args.jitter_ms,
+                           args.token_delay_ms, args.error_rate)
+    print(f"Stub LLM server listening on {server.base_url}")
+    print(f"Use: OPENAI_API_KEY=stub OPENAI_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
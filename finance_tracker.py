@@ -7,7 +7,6 @@ import json
 import os
 from datetime import datetime
 from pathlib import Path
-import pandas as pd
 
 
 class FinanceTracker:
@@ -19,6 +18,7 @@ class FinanceTracker:
         self.budget_file = budget_file
         self.transactions = []
         self.budgets = {}
+        self._listeners = []
         self._ensure_data_directory()
         self._load_transactions()
         self._load_budgets()
@@ -60,6 +60,52 @@ class FinanceTracker:
         with open(self.budget_file, 'w') as f:
             json.dump(self.budgets, f, indent=2)
     
+    def add_listener(self, callback):
+        """
+        Register a callback for data changes.
+        
+        After each mutation the callback is called with the set of data
+        kinds that changed: 'income', 'expense' and/or 'budgets'.
+        
+        Args:
+            callback (callable): Function taking a set of kinds
+        """
+        self._listeners.append(callback)
+    
+    def _notify(self, kinds):
+        """Tell listeners which kinds of data changed."""
+        for callback in self._listeners:
+            callback(set(kinds))
+    
+    @staticmethod
+    def _kind(transaction_type):
+        """Map a transaction type to the data kind it affects."""
+        return 'income' if transaction_type == 'income' else 'expense'
+    
+    @staticmethod
+    def get_data_version(data_file, budget_file=None):
+        """
+        Get a version stamp for stored tracker data without loading it.
+        
+        The stamp changes whenever either file is rewritten, so it can key
+        caches of values derived from the data, across processes too.
+        
+        Args:
+            data_file (str): Transactions file path
+            budget_file (str): Budgets file path (optional)
+            
+        Returns:
+            tuple: (mtime_ns, size) per file, None for missing files
+        """
+        version = []
+        for path in (data_file, budget_file):
+            try:
+                stat = os.stat(path)
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except (OSError, TypeError):
+                version.append(None)
+        return tuple(version)
+    
     def add_transaction(self, amount, category, description, transaction_type):
         """
         Add a new transaction.
@@ -80,6 +126,7 @@ class FinanceTracker:
         }
         self.transactions.append(transaction)
         self._save_transactions()
+        self._notify({self._kind(transaction_type)})
         return transaction
     
     def get_all_transactions(self):
@@ -138,6 +185,10 @@ class FinanceTracker:
         if not self.transactions:
             return False
         
+        # pandas is only needed here, so import it on first export rather
+        # than on every module load
+        import pandas as pd
+        
         df = pd.DataFrame(self.transactions)
         df.to_csv(filename, index=False)
         return True
@@ -156,6 +207,7 @@ class FinanceTracker:
             if transaction['id'] == transaction_id:
                 self.transactions.pop(i)
                 self._save_transactions()
+                self._notify({self._kind(transaction['type'])})
                 return True
         return False
     
@@ -172,10 +224,12 @@ class FinanceTracker:
         """
         for transaction in self.transactions:
             if transaction['id'] == transaction_id:
+                old_kind = self._kind(transaction['type'])
                 for key, value in kwargs.items():
                     if key in transaction and key != 'id':
                         transaction[key] = value
                 self._save_transactions()
+                self._notify({old_kind, self._kind(transaction['type'])})
                 return True
         return False
     
@@ -224,6 +278,7 @@ class FinanceTracker:
             'created_date': datetime.now().strftime('%Y-%m-%d')
         }
         self._save_budgets()
+        self._notify({'budgets'})
     
     def get_budget(self, category):
         """Get budget for a specific category."""
@@ -238,6 +293,7 @@ class FinanceTracker:
         if category in self.budgets:
             del self.budgets[category]
             self._save_budgets()
+            self._notify({'budgets'})
             return True
         return False
     
@@ -261,6 +317,20 @@ class FinanceTracker:
             if t['category'].lower() == category.lower() and t['type'] == 'expense'
         )
         
+        return self.make_budget_status(category, category_expenses)
+    
+    def make_budget_status(self, category, category_expenses):
+        """
+        Build the budget status for a category from its precomputed spending.
+        
+        Args:
+            category (str): Category name (must have a budget)
+            category_expenses (float): Total expenses in the category
+            
+        Returns:
+            dict: Budget status information
+        """
+        budget = self.budgets[category]
         budget_amount = budget['amount']
         remaining = budget_amount - category_expenses
         percentage_used = (category_expenses / budget_amount * 100) if budget_amount > 0 else 0
@@ -0,0 +1,359 @@
+"""
+Weekly Insights for ChengeAI
+Precomputes personalized weekly insights for every user so the AI advisor
+page opens with them ready instead of waiting on a first query.
+
+Run as a batch job (e.g. nightly or weekly from cron):
+    python insights.py
+    python insights.py --workers 8 --llm --force
+"""
+
+import os
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from finance_tracker import FinanceTracker
+from visualizer import ChartDataset
+
+# Insights older than this, or built from older data, are regenerated
+INSIGHTS_MAX_AGE_DAYS = 7
+
+# Users processed at once by the batch job
+DEFAULT_WORKERS = 4
+
+# Savings rate the insights measure users against
+TARGET_SAVINGS_RATE = 20
+
+# Question sent to the model when insights are generated with --llm
+LLM_INSIGHTS_PROMPT = ("Based on my finances, give me three short, specific insights "
+                       "for this week and one next step.")
+
+# One-line next step for the most pressing topic
+NEXT_STEPS = {
+    'budget': "Review your over-budget categories and set a weekly spending cap for each.",
+    'saving': "Set up an automatic transfer to savings on payday, even a small one.",
+    'spending': "Pick one recurring expense to cut or renegotiate this week.",
+    'investment': "You're saving steadily; read up on low-cost index funds for your surplus.",
+    'start': "Add this week's income and expenses so ChengeAI can tailor your insights."
+}
+
+
+def _data_version(data_file, budget_file):
+    """Data version stamp in the JSON form stored with insights."""
+    return [list(v) if v else None
+            for v in FinanceTracker.get_data_version(data_file, budget_file)]
+
+
+def advisor_summary(dataset, top=5):
+    """
+    Summarize a ChartDataset for the AI advisor.
+
+    Args:
+        dataset (ChartDataset): Aggregated transactions
+        top (int): Number of expense categories to include
+
+    Returns:
+        dict: Totals, balance, transaction count and the top expense categories
+    """
+    expenses = [(category, amounts['expense']) for category, amounts in dataset.categories.items()
+                if amounts['expense'] > 0]
+    return {
+        'total_income': dataset.total_income,
+        'total_expenses': dataset.total_expenses,
+        'balance': dataset.balance,
+        'transaction_count': dataset.transaction_count,
+        'top_categories': [
+            {'category': category, 'amount': amount}
+            for category, amount in sorted(expenses, key=lambda x: x[1], reverse=True)[:top]
+        ]
+    }
+
+
+def summarize_finances(tracker, now=None):
+    """
+    Summarize a tracker's data for the weekly insights.
+
+    Totals, daily amounts and budget statuses come from the aggregation
+    the charts use (ChartDataset.from_tracker); only this week's expenses
+    by category are totalled here.
+
+    Args:
+        tracker (FinanceTracker): Loaded tracker
+        now (datetime): End of the weekly period (defaults to now)
+
+    Returns:
+        dict: 'user_data' (the AI advisor summary), weekly totals for this
+        week and the one before, this week's expenses by category and
+        budget statuses
+    """
+    now = now or datetime.now()
+    week_start = (now - timedelta(days=7)).strftime('%Y-%m-%d')
+    previous_start = (now - timedelta(days=14)).strftime('%Y-%m-%d')
+
+    dataset = ChartDataset.from_tracker(tracker)
+
+    week = {'income': 0, 'expense': 0}
+    previous_week = {'income': 0, 'expense': 0}
+    for day, amounts in dataset.daily.items():
+        if day >= week_start:
+            totals = week
+        elif day >= previous_start:
+            totals = previous_week
+        else:
+            continue
+        totals['income'] += amounts['income']
+        totals['expense'] += amounts['expense']
+
+    week_categories = {}
+    for t in tracker.get_transactions_by_date_range(start_date=week_start):
+        if t['type'] != 'income':
+            week_categories[t['category']] = week_categories.get(t['category'], 0) + t['amount']
+
+    return {
+        'user_data': advisor_summary(dataset),
+        'period_start': week_start,
+        'period_end': now.strftime('%Y-%m-%d'),
+        'week': week,
+        'previous_week': previous_week,
+        'week_categories': week_categories,
+        'budget_statuses': dataset.budget_statuses
+    }
+
+
+def rule_based_insights(summary):
+    """
+    Turn a summary into short insight cards.
+
+    Args:
+        summary (dict): Output of summarize_finances
+
+    Returns:
+        list: Insights as {'title': ..., 'text': ...} dicts
+    """
+    user_data = summary['user_data']
+    week = summary['week']
+    previous = summary['previous_week']
+    insights = []
+
+    if user_data['transaction_count'] == 0:
+        return [{'title': 'Next step', 'text': NEXT_STEPS['start']}]
+
+    # Weekly spending trend
+    if week['expense'] or previous['expense']:
+        text = f"You spent ${week['expense']:,.2f} in the last 7 days"
+        if previous['expense']:
+            change = (week['expense'] - previous['expense']) / previous['expense'] * 100
+            direction = 'up' if change >= 0 else 'down'
+            text += f", {direction} {abs(change):.0f}% from the week before."
+        else:
+            text += "."
+        insights.append({'title': 'Weekly spending', 'text': text})
+
+    # Biggest category this week
+    if summary['week_categories']:
+        category, amount = max(summary['week_categories'].items(), key=lambda x: x[1])
+        share = amount / week['expense'] * 100 if week['expense'] else 0
+        insights.append({
+            'title': 'Top category',
+            'text': f"{category} was your biggest expense this week: ${amount:,.2f} "
+                    f"({share:.0f}% of your spending)."
+        })
+
+    # Budgets that need attention
+    over = [s for s in summary['budget_statuses'] if s['status'] == 'over']
+    warning = [s for s in summary['budget_statuses'] if s['status'] == 'warning']
+    for status in over[:2]:
+        insights.append({
+            'title': 'Over budget',
+            'text': f"You're ${-status['remaining']:,.2f} over your {status['category']} budget."
+        })
+    for status in warning[:2]:
+        insights.append({
+            'title': 'Budget alert',
+            'text': f"You've used {status['percentage_used']:.0f}% of your "
+                    f"{status['category']} budget."
+        })
+
+    # Savings rate
+    savings_rate = 0
+    if user_data['total_income'] > 0:
+        savings_rate = user_data['balance'] / user_data['total_income'] * 100
+        verdict = ("on target" if savings_rate >= TARGET_SAVINGS_RATE
+                   else f"below the {TARGET_SAVINGS_RATE}% target")
+        insights.append({
+            'title': 'Savings rate',
+            'text': f"You're keeping {savings_rate:.0f}% of your income, {verdict}."
+        })
+
+    # One next step for the most pressing topic
+    if over:
+        topic = 'budget'
+    elif savings_rate < TARGET_SAVINGS_RATE / 2:
+        topic = 'saving'
+    elif savings_rate < TARGET_SAVINGS_RATE:
+        topic = 'spending'
+    else:
+        topic = 'investment'
+    insights.append({'title': 'Next step', 'text': NEXT_STEPS[topic]})
+
+    return insights
+
+
+def build_insights(data_file, budget_file, use_llm=False, now=None, user_id=None):
+    """
+    Generate weekly insights for one user's data files.
+
+    Args:
+        data_file (str): User's transactions file
+        budget_file (str): User's budgets file
+        use_llm (bool): Also ask ChengeAI for a written summary
+        now (datetime): End of the weekly period (defaults to now)
+        user_id (int): Owner of the data, scoping cached ChengeAI answers
+            (defaults to the data file, which is per user)
+
+    Returns:
+        dict: Insights record, as stored in the user's insights file
+    """
+    now = now or datetime.now()
+    version = _data_version(data_file, budget_file)
+    summary = summarize_finances(FinanceTracker(data_file, budget_file), now)
+    insights = rule_based_insights(summary)
+    source = 'rule-based'
+
+    if use_llm and summary['user_data']['transaction_count']:
+        from ai_service import ai_advisor
+        # The answer quotes this user's figures, so never share it across users
+        scope = user_id if user_id is not None else data_file
+        result = ai_advisor.chat(LLM_INSIGHTS_PROMPT, summary['user_data'], cache_scope=scope)
+        if result['success'] and result.get('source') in ('openai', 'cache'):
+            insights.insert(0, {'title': 'ChengeAI says', 'text': result['response']})
+            source = 'openai'
+
+    return {
+        'generated_at': now.isoformat(),
+        'period_start': summary['period_start'],
+        'period_end': summary['period_end'],
+        'data_version': version,
+        'source': source,
+        'insights': insights
+    }
+
+
+def load_insights(path):
+    """Load stored insights, or None if missing or unreadable."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_insights(path, record):
+    """Write insights atomically so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(record, data_file, budget_file, now=None):
+    """Return whether stored insights are recent and match the current data."""
+    if not record:
+        return False
+    now = now or datetime.now()
+    try:
+        generated_at = datetime.fromisoformat(record['generated_at'])
+    except (KeyError, ValueError):
+        return False
+    return (now - generated_at < timedelta(days=INSIGHTS_MAX_AGE_DAYS) and
+            record.get('data_version') == _data_version(data_file, budget_file))
+
+
+def refresh_user_insights(data_file, budget_file, insights_file, use_llm=False, force=False,
+                          user_id=None):
+    """
+    Regenerate one user's insights unless the stored ones are still fresh.
+
+    user_id scopes cached ChengeAI answers to the user (see build_insights).
+
+    Returns:
+        tuple: (insights record, whether it was regenerated)
+    """
+    record = load_insights(insights_file)
+    if not force and is_fresh(record, data_file, budget_file):
+        return record, False
+    record = build_insights(data_file, budget_file, use_llm=use_llm, user_id=user_id)
+    save_insights(insights_file, record)
+    return record, True
+
+
+def generate_all_insights(users, workers=DEFAULT_WORKERS, use_llm=False, force=False):
+    """
+    Refresh insights for many users with bounded concurrency.
+
+    Users are consumed lazily and at most 2 * workers are queued at once,
+    so memory stays flat however many users there are.
+
+    Args:
+        users: Iterable of User objects
+        workers (int): Users processed concurrently
+        use_llm (bool): Also ask ChengeAI for a written summary
+        force (bool): Regenerate even fresh insights
+
+    Returns:
+        dict: Counts of 'generated', 'skipped' and 'failed' users
+    """
+    counts = {'generated': 0, 'skipped': 0, 'failed': 0}
+
+    def collect(done):
+        for future in done:
+            try:
+                _, regenerated = future.result()
+                counts['generated' if regenerated else 'skipped'] += 1
+            except Exception as e:
+                counts['failed'] += 1
+                print(f"[!] Insights failed for user {pending[future]}: {e}")
+            del pending[future]
+
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='insights') as pool:
+        for user in users:
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = pool.submit(refresh_user_insights, user.get_data_file(),
+                                 user.get_budget_file(), user.get_insights_file(),
+                                 use_llm, force, user.id)
+            pending[future] = user.id
+        collect(wait(pending)[0])
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute weekly ChengeAI insights')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Users processed at once (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--llm', action='store_true',
+                        help='Also ask the model for a written summary (uses OpenAI quota)')
+    parser.add_argument('--force', action='store_true', help='Regenerate fresh insights too')
+    args = parser.parse_args()
+
+    from app import app
+    from models import User
+    from sqlalchemy.orm import load_only
+
+    with app.app_context():
+        users = User.query.options(load_only(User.id)).order_by(User.id).yield_per(500)
+        counts = generate_all_insights(users, workers=args.workers,
+                                       use_llm=args.llm, force=args.force)
+
+    print(f"[+] Insights generated: {counts['generated']}, "
+          f"up to date: {counts['skipped']}, failed: {counts['failed']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -66,6 +66,14 @@ class User(UserMixin, db.Model):
         """Get user-specific budgets file path."""
         return f'data/users/{self.id}/budgets.json'
     
+    def get_charts_dir(self):
+        """Get user-specific chart output directory."""
+        return f'data/users/{self.id}/charts'
+    
+    def get_insights_file(self):
+        """Get user-specific precomputed AI insights file path."""
+        return f'data/users/{self.id}/insights.json'
+    
     def __repr__(self):
         return f'<User {self.username}>'
     
@@ -74,6 +82,69 @@ class User(UserMixin, db.Model):
     taught_courses = db.relationship('Course', secondary=course_instructors, backref='instructors')
 
 
+class Video(db.Model):
+    """YouTube video in the resources library catalog."""
+    
+    __tablename__ = 'videos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    youtube_id = db.Column(db.String(20), unique=True, nullable=False, index=True)
+    title = db.Column(db.String(300), nullable=False)
+    channel = db.Column(db.String(200))
+    description = db.Column(db.Text)
+    thumbnail = db.Column(db.String(500))
+    published_at = db.Column(db.String(40))  # ISO 8601 string from the API
+    
+    # Details (from videos.list)
+    duration = db.Column(db.String(20))
+    rating = db.Column(db.Float)
+    views = db.Column(db.Integer, default=0)
+    
+    # Classification
+    category = db.Column(db.String(50), default='general', index=True)
+    level = db.Column(db.String(20), default='All Levels', index=True)
+    topics = db.Column(db.Text)  # JSON array of topics
+    
+    # Position in the latest search that returned the video
+    rank = db.Column(db.Integer, default=0)
+    
+    # Timestamps
+    first_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    fetched_at = db.Column(db.DateTime)  # When details were last fetched
+    
+    def get_topics(self):
+        """Get topics as a list."""
+        if self.topics:
+            return json.loads(self.topics)
+        return []
+    
+    def set_topics(self, topics_list):
+        """Set topics from a list."""
+        self.topics = json.dumps(topics_list)
+    
+    def to_dict(self):
+        """Video in the shape served by /api/resources/videos."""
+        return {
+            'id': self.id,
+            'youtubeId': self.youtube_id,
+            'title': self.title,
+            'channel': self.channel,
+            'description': self.description or '',
+            'thumbnail': self.thumbnail,
+            'publishedAt': self.published_at,
+            'duration': self.duration,
+            'rating': self.rating,
+            'views': self.views,
+            'category': self.category,
+            'level': self.level,
+            'topics': self.get_topics()
+        }
+    
+    def __repr__(self):
+        return f'<Video {self.youtube_id}>'
+
+
 class Course(db.Model):
     """Course model for Chengeta Academy."""
     
@@ -157,8 +228,33 @@ class Course(db.Model):
         self.requirements = json.dumps(req_list)
     
     def get_total_lessons(self):
-        """Get total number of lessons."""
-        return self.lessons.count()
+        """Get total number of lessons (preloaded by load_lesson_counts when listing)."""
+        count = getattr(self, '_total_lessons', None)
+        if count is None:
+            count = self.lessons.count()
+        return count
+    
+    @classmethod
+    def load_lesson_counts(cls, courses):
+        """
+        Preload get_total_lessons() for many courses with one grouped query.
+        
+        Args:
+            courses (list): Course objects
+            
+        Returns:
+            list: The same courses
+        """
+        ids = [course.id for course in courses]
+        counts = {}
+        if ids:
+            counts = dict(db.session.query(Lesson.course_id, db.func.count(Lesson.id))
+                          .filter(Lesson.course_id.in_(ids))
+                          .group_by(Lesson.course_id)
+                          .all())
+        for course in courses:
+            course._total_lessons = counts.get(course.id, 0)
+        return courses
     
     def get_published_lessons(self):
         """Get published lessons."""
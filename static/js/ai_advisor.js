@@ -1,6 +1,7 @@
 // ChengeAI - AI Financial Advisor JavaScript
 
 let chatHistory = [];
+let sessionId = sessionStorage.getItem('chengeai_session');
 let userInitial = 'U';
 
 // Send message to AI
@@ -24,25 +25,17 @@ async function sendMessage(message) {
     sendBtn.disabled = true;
     
     try {
-        const response = await apiCall('/api/ai/chat', {
-            method: 'POST',
-            body: JSON.stringify({ 
-                message: message,
-                history: chatHistory.slice(-6) // Send last 6 exchanges for context
-            })
-        });
+        const result = await streamChat(message);
         
-        // Remove typing indicator
-        removeTypingIndicator();
-        
-        // Add AI response
-        if (response.success) {
-            addMessage(response.response, 'ai');
-            chatHistory.push({ user: message, ai: response.response });
+        if (result.success) {
+            chatHistory.push({ user: message, ai: result.response });
             
-            // Store in session storage for persistence during session
+            // The server keeps the conversation; the local copy is only for redisplay
+            sessionId = result.session_id;
+            sessionStorage.setItem('chengeai_session', sessionId);
             sessionStorage.setItem('chengeai_history', JSON.stringify(chatHistory));
         } else {
+            removeTypingIndicator();
             addMessage('Sorry, I encountered an error. Please try again.', 'ai');
         }
         
@@ -59,7 +52,84 @@ async function sendMessage(message) {
     scrollToBottom();
 }
 
-// Add message to chat
+// Stream the AI response over Server-Sent Events, rendering text as it arrives.
+// Resolves with the final result ({success, response, source, session_id}).
+async function streamChat(message) {
+    // Recent turns always go along: the server only uses them to seed a new
+    // session when ours is missing or has expired
+    const body = { message: message, session_id: sessionId, history: chatHistory.slice(-6) };
+
+    const response = await fetch('/api/ai/chat/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify(body)
+    });
+    
+    if (!response.ok || !response.body) {
+        throw new Error(`Stream request failed (${response.status})`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let bubble = null;
+    let result = null;
+    
+    while (result === null) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const event = parseSseEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            
+            if (event.type === 'delta') {
+                if (!bubble) {
+                    // First token: swap the typing indicator for the answer
+                    removeTypingIndicator();
+                    bubble = addMessage('', 'ai');
+                }
+                text += event.data.text;
+                bubble.innerHTML = formatMessage(text);
+                scrollToBottom();
+            } else if (event.type === 'done') {
+                result = event.data;
+            }
+        }
+    }
+    
+    if (result === null) {
+        throw new Error('Stream ended unexpectedly');
+    }
+    if (result.success && !bubble) {
+        removeTypingIndicator();
+        addMessage(result.response, 'ai');
+    }
+    return result;
+}
+
+// Parse one SSE event block into {type, data}
+function parseSseEvent(block) {
+    let type = 'message';
+    const dataLines = [];
+    block.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            type = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            dataLines.push(line.slice(5).trim());
+        }
+    });
+    return { type: type, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : {} };
+}
+
+// Add message to chat; returns the message bubble element
 function addMessage(text, sender) {
     const messagesArea = document.getElementById('messages-area');
     const messageDiv = document.createElement('div');
@@ -98,6 +168,8 @@ function addMessage(text, sender) {
         messageDiv.style.opacity = '1';
         messageDiv.style.transform = 'translateY(0)';
     });
+    
+    return messageDiv.querySelector('.message-bubble');
 }
 
 // Format time
@@ -194,7 +266,9 @@ function clearChat() {
         document.getElementById('messages-area').innerHTML = '';
         document.getElementById('chat-welcome').style.display = 'flex';
         chatHistory = [];
+        sessionId = null;
         sessionStorage.removeItem('chengeai_history');
+        sessionStorage.removeItem('chengeai_session');
         showToast('Chat cleared', 'info');
     }
 }
@@ -223,8 +297,29 @@ document.getElementById('chat-input')?.addEventListener('keydown', (e) => {
     }
 });
 
+// Load precomputed weekly insights into the sidebar
+async function loadInsights() {
+    try {
+        const result = await apiCall('/api/ai/insights');
+        const insights = result.data.insights || [];
+        if (insights.length === 0) return;
+        
+        document.getElementById('insights-list').innerHTML = insights.map(insight => `
+            <div class="tip-card insight-card">
+                <h4>${escapeHtml(insight.title)}</h4>
+                <p>${formatMessage(insight.text)}</p>
+            </div>
+        `).join('');
+        document.getElementById('insights-section').style.display = 'block';
+    } catch (error) {
+        console.log('Could not load insights');
+    }
+}
+
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', async () => {
+    loadInsights();
+    
     // Get user initial for avatar
     try {
         const userInfo = await apiCall('/api/user/info');
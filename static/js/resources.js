@@ -1,7 +1,12 @@
 // Financial Resources Library JavaScript
 // Automatically fetches finance videos from YouTube API
 
-let resources = { videos: [] };
+const PAGE_SIZE = 24;
+
+// videos: the loaded pages of the grid; total: how many match the current filters
+let resources = { videos: [], featured: [], total: 0, offline: false };
+let currentFilters = {};
+let filterRequest = 0;
 let isLoading = false;
 
 // Load resources on page load
@@ -9,29 +14,52 @@ document.addEventListener('DOMContentLoaded', () => {
     loadVideosFromAPI();
 });
 
+// Build the videos API URL from filters, skipping empty values
+function buildVideosUrl(params) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined && value !== null && value !== '') {
+            query.set(key, value);
+        }
+    });
+    return `/api/resources/videos?${query.toString()}`;
+}
+
+// Fetch one page of videos matching filters (filtered and paged by the server)
+async function fetchVideos(filters, offset = 0, extra = {}) {
+    const response = await fetch(buildVideosUrl({ ...filters, ...extra, limit: PAGE_SIZE, offset }));
+    const data = await response.json();
+    if (!data.success) {
+        throw new Error(data.message || 'Failed to load videos');
+    }
+    return data;
+}
+
 // Fetch videos from backend API
 async function loadVideosFromAPI(forceRefresh = false) {
     if (isLoading) return;
     isLoading = true;
+    currentFilters = {};
+    filterRequest++;
     
     // Show loading state
     showLoadingState();
     
     try {
-        const url = forceRefresh 
-            ? '/api/resources/videos?refresh=true' 
-            : '/api/resources/videos';
-            
-        const response = await fetch(url);
-        const data = await response.json();
+        // Refresh (if asked) with the first page, then read featured from the warm cache
+        const page = await fetchVideos({}, 0, forceRefresh ? { refresh: 'true' } : {});
+        const featured = await fetchVideos({ featured: 'true' });
         
-        if (data.success && data.videos.length > 0) {
-            resources.videos = data.videos;
-            console.log(`Loaded ${data.count} videos`);
+        if (page.videos.length > 0) {
+            resources.videos = page.videos;
+            resources.total = page.total;
+            resources.featured = featured.videos;
+            resources.offline = false;
+            console.log(`Loaded ${page.count} of ${page.total} videos`);
         } else {
             // Use fallback videos if API fails
             console.log('Using fallback videos');
-            resources.videos = getDefaultVideos();
+            useFallbackVideos();
         }
         
         // Render the videos
@@ -40,7 +68,7 @@ async function loadVideosFromAPI(forceRefresh = false) {
     } catch (error) {
         console.error('Error fetching videos:', error);
         // Use fallback videos
-        resources.videos = getDefaultVideos();
+        useFallbackVideos();
         loadResources();
     } finally {
         isLoading = false;
@@ -48,6 +76,70 @@ async function loadVideosFromAPI(forceRefresh = false) {
     }
 }
 
+// Switch to the built-in videos, filtered in the browser
+function useFallbackVideos() {
+    const videos = getDefaultVideos();
+    resources.videos = videos;
+    resources.total = videos.length;
+    resources.featured = videos.filter(v => v.featured);
+    resources.offline = true;
+}
+
+// Filter the fallback videos the way the server does
+function filterLocally(filters) {
+    const topic = (filters.topic || '').toLowerCase();
+    return getDefaultVideos().filter(v =>
+        (!filters.category || v.category === filters.category) &&
+        (!topic || v.category === topic ||
+            (v.topics && v.topics.some(t => t.toLowerCase().includes(topic))))
+    );
+}
+
+// Load the first page of videos matching filters into the grid
+async function applyFilters(filters, emptyMessage) {
+    const request = ++filterRequest;
+    currentFilters = filters;
+    
+    if (resources.offline) {
+        resources.videos = filterLocally(filters);
+        resources.total = resources.videos.length;
+    } else {
+        try {
+            const data = await fetchVideos(filters);
+            // Ignore responses to filters the user has already left
+            if (request !== filterRequest) return null;
+            resources.videos = data.videos;
+            resources.total = data.total;
+        } catch (error) {
+            console.error('Error filtering videos:', error);
+            resources.videos = [];
+            resources.total = 0;
+        }
+    }
+    
+    renderVideoGrid(emptyMessage);
+    return resources.total;
+}
+
+// Append the next page of videos for the current filters
+async function loadMoreVideos() {
+    const request = filterRequest;
+    try {
+        const data = await fetchVideos(currentFilters, resources.videos.length);
+        if (request !== filterRequest) return;
+        resources.videos = resources.videos.concat(data.videos);
+        resources.total = data.total;
+        renderVideoGrid();
+    } catch (error) {
+        console.error('Error loading more videos:', error);
+    }
+}
+
+// Find a loaded video by id
+function findVideo(id) {
+    return resources.videos.find(v => v.id === id) || resources.featured.find(v => v.id === id);
+}
+
 // Show loading spinner
 function showLoadingState() {
     const featuredGrid = document.getElementById('featured-grid');
@@ -77,7 +169,7 @@ function loadResources() {
 
 // Load featured resources
 function loadFeatured() {
-    const featured = resources.videos.filter(r => r.featured);
+    const featured = resources.featured;
     const grid = document.getElementById('featured-grid');
     if (grid) {
         if (featured.length > 0) {
@@ -90,19 +182,32 @@ function loadFeatured() {
 
 // Load all videos
 function loadAllVideos() {
+    renderVideoGrid('No videos available');
+}
+
+// Render the loaded videos, with a "Load more" button while more match
+function renderVideoGrid(emptyMessage = 'No videos found') {
     const grid = document.getElementById('videos-grid');
-    if (grid) {
-        if (resources.videos.length > 0) {
-            grid.innerHTML = resources.videos.map(video => createVideoCard(video)).join('');
-        } else {
-            grid.innerHTML = '<p class="no-results">No videos available</p>';
-        }
+    if (!grid) return;
+    
+    if (resources.videos.length === 0) {
+        grid.innerHTML = `<p class="no-results">${emptyMessage}</p>`;
+        return;
     }
+    
+    const loadMore = resources.videos.length < resources.total ? `
+        <div class="load-more">
+            <button class="btn btn-secondary" onclick="loadMoreVideos()">
+                Load more (${resources.total - resources.videos.length} remaining)
+            </button>
+        </div>
+    ` : '';
+    grid.innerHTML = resources.videos.map(video => createVideoCard(video)).join('') + loadMore;
 }
 
-// Get YouTube thumbnail URL
+// Get thumbnail URL (served as WebP from our thumbnail cache)
 function getYouTubeThumbnail(videoId) {
-    return `https://img.youtube.com/vi/${videoId}/mqdefault.jpg`;
+    return `/api/resources/thumb/${encodeURIComponent(videoId)}`;
 }
 
 // Create video card
@@ -115,7 +220,7 @@ function createVideoCard(video) {
     return `
         <div class="resource-card video-card" onclick="openResource(${video.id})">
             <div class="video-thumbnail">
-                <img src="${thumbnail}" alt="${video.title}" onerror="this.style.display='none'">
+                <img src="${thumbnail}" alt="${video.title}" loading="lazy" onerror="this.style.display='none'">
                 <div class="play-overlay">
                     <div class="play-button">▶</div>
                 </div>
@@ -138,7 +243,6 @@ function createVideoCard(video) {
 function filterResources(type) {
     const tabs = document.querySelectorAll('.filter-tab');
     const featuredSection = document.querySelector('.featured-section');
-    const videosGrid = document.getElementById('videos-grid');
     
     // Update active tab
     tabs.forEach(tab => tab.classList.remove('active'));
@@ -146,35 +250,15 @@ function filterResources(type) {
     
     if (type === 'all') {
         if (featuredSection) featuredSection.style.display = 'block';
-        videosGrid.innerHTML = resources.videos.map(video => createVideoCard(video)).join('');
+        applyFilters({}, 'No videos available');
     } else {
         if (featuredSection) featuredSection.style.display = 'none';
-        const filtered = resources.videos.filter(v => v.category === type);
-        videosGrid.innerHTML = filtered.length > 0 
-            ? filtered.map(video => createVideoCard(video)).join('')
-            : '<p class="no-results">No videos found for this category</p>';
+        applyFilters({ category: type }, 'No videos found for this category');
     }
 }
 
 // Filter by topic
-function filterByTopic(topic) {
-    const filtered = resources.videos.filter(v => 
-        v.category === topic || 
-        (v.topics && v.topics.some(t => t.toLowerCase().includes(topic.toLowerCase())))
-    );
-    
-    // Show toast with filter info
-    if (typeof showToast === 'function') {
-        showToast(`Found ${filtered.length} resources on ${topic}`, 'info');
-    }
-    
-    const videosGrid = document.getElementById('videos-grid');
-    if (videosGrid) {
-        videosGrid.innerHTML = filtered.length > 0
-            ? filtered.map(video => createVideoCard(video)).join('')
-            : '<p class="no-results">No videos found for this topic</p>';
-    }
-    
+async function filterByTopic(topic) {
     // Hide featured section when filtering
     const featuredSection = document.querySelector('.featured-section');
     if (featuredSection) featuredSection.style.display = 'none';
@@ -182,11 +266,18 @@ function filterByTopic(topic) {
     // Update tabs
     const tabs = document.querySelectorAll('.filter-tab');
     tabs.forEach(tab => tab.classList.remove('active'));
+    
+    const total = await applyFilters({ topic }, 'No videos found for this topic');
+    
+    // Show toast with filter info
+    if (total !== null && typeof showToast === 'function') {
+        showToast(`Found ${total} resources on ${topic}`, 'info');
+    }
 }
 
 // Open resource detail with embedded player
 function openResource(id) {
-    const resource = resources.videos.find(v => v.id === id);
+    const resource = findVideo(id);
     
     if (!resource) return;
     
@@ -300,7 +391,7 @@ function refreshVideos() {
 
 // Reset filters
 function resetFilters() {
-    loadResources();
+    applyFilters({}, 'No videos available');
     const featuredSection = document.querySelector('.featured-section');
     if (featuredSection) featuredSection.style.display = 'block';
     
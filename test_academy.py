@@ -0,0 +1,188 @@
+"""
+Unit tests for the Chengeta Academy catalog
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from unittest import mock
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from sqlalchemy import event
+import academy
+from app import app
+from models import db, User, Course, Lesson
+
+
+class TestCatalogCache(unittest.TestCase):
+    """Test caching and invalidating the rendered course catalog."""
+
+    def setUp(self):
+        """Create an empty database, a logged-in user and a private version file."""
+        self.data_dir = tempfile.mkdtemp()
+        self.version_file = os.path.join(self.data_dir, 'academy_catalog.version')
+        patcher = mock.patch('academy.CATALOG_VERSION_FILE', self.version_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        academy._catalog_cache.clear()
+        academy._catalog_version = None
+
+        app.config['TESTING'] = True
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        user = User(username='admin', email='admin@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+
+    def tearDown(self):
+        """Drop the database and the version file."""
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def add_course(self, title, published=True, lessons=0):
+        """Add a course with the given number of lessons."""
+        course = Course(title=title, slug=title.lower().replace(' ', '-'),
+                        description=f'{title} description', is_published=published)
+        db.session.add(course)
+        db.session.flush()
+        for order in range(lessons):
+            db.session.add(Lesson(course_id=course.id, title=f'Lesson {order}',
+                                  slug=f'lesson-{order}', order=order))
+        db.session.commit()
+        return course
+
+    @contextmanager
+    def recorded_queries(self):
+        """Collect the SQL statements run inside the block."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    def catalog_queries(self):
+        """Load the catalog page, returning (HTML, number of course queries)."""
+        with self.recorded_queries() as statements:
+            response = self.client.get('/academy/')
+        self.assertEqual(response.status_code, 200)
+        return (response.get_data(as_text=True),
+                sum('FROM courses' in statement for statement in statements))
+
+    def assert_invalidates(self, action):
+        """Check action clears a warm catalog cache."""
+        self.catalog_queries()
+        self.assertEqual(self.catalog_queries()[1], 0)
+
+        response = action()
+        self.assertIn(response.status_code, (200, 302))
+
+        self.assertGreater(self.catalog_queries()[1], 0)
+
+    def test_cache_hit_skips_query(self):
+        """Test a repeat visit is served from the cache without querying courses."""
+        self.add_course('Budget Basics')
+
+        html, queries = self.catalog_queries()
+        self.assertIn('Budget Basics', html)
+        self.assertGreater(queries, 0)
+
+        html, queries = self.catalog_queries()
+        self.assertIn('Budget Basics', html)
+        self.assertEqual(queries, 0)
+
+    def test_filters_are_cached_separately(self):
+        """Test each filter combination gets its own cache entry."""
+        self.add_course('Budget Basics')
+        self.catalog_queries()
+
+        with self.recorded_queries() as statements:
+            self.client.get('/academy/?level=advanced')
+        self.assertTrue(any('FROM courses' in statement for statement in statements))
+
+    def test_course_changes_invalidate(self):
+        """Test creating, editing, publishing and unpublishing a course clear the cache."""
+        form = {'title': 'Emergency Fund', 'description': 'Pay it off'}
+        self.assert_invalidates(lambda: self.client.post('/academy/admin/course/new', data=form))
+        course = Course.query.filter_by(slug='emergency-fund').one()
+
+        self.assert_invalidates(lambda: self.client.post(f'/academy/admin/course/{course.id}/publish'))
+        self.assertIn('Emergency Fund', self.catalog_queries()[0])
+
+        form['title'] = 'Emergency Fund Plus'
+        self.assert_invalidates(lambda: self.client.post(f'/academy/admin/course/{course.id}/edit',
+                                                         data=form))
+        self.assertIn('Emergency Fund Plus', self.catalog_queries()[0])
+
+        self.assert_invalidates(lambda: self.client.post(f'/academy/admin/course/{course.id}/publish'))
+        self.assertNotIn('Emergency Fund', self.catalog_queries()[0])
+
+    def test_lesson_changes_invalidate(self):
+        """Test adding and deleting a lesson update the cached lesson counts."""
+        course = self.add_course('Budget Basics')
+        self.assertIn('0 lessons', self.catalog_queries()[0])
+
+        self.assert_invalidates(lambda: self.client.post(f'/academy/admin/course/{course.id}/lessons',
+                                                         data={'title': 'Intro'}))
+        self.assertIn('1 lessons', self.catalog_queries()[0])
+
+        lesson = Lesson.query.filter_by(course_id=course.id).one()
+        self.assert_invalidates(lambda: self.client.post(f'/academy/admin/lesson/{lesson.id}/delete'))
+        self.assertIn('0 lessons', self.catalog_queries()[0])
+
+    def test_invalidation_from_another_process(self):
+        """Test a version bump written by another worker drops this worker's fragments."""
+        self.add_course('Budget Basics')
+        self.catalog_queries()
+        self.assertEqual(self.catalog_queries()[1], 0)
+
+        script = ('import academy; '
+                  f'academy.CATALOG_VERSION_FILE = {self.version_file!r}; '
+                  'academy.invalidate_catalog()')
+        subprocess.run([sys.executable, '-c', script], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+
+        self.assertGreater(self.catalog_queries()[1], 0)
+        self.assertEqual(self.catalog_queries()[1], 0)
+
+    def test_lesson_counts_use_one_grouped_query(self):
+        """Test the listing and the courses API count lessons in one query, not one per course."""
+        self.add_course('Budget Basics', lessons=3)
+        self.add_course('Investing 101', lessons=1)
+        self.add_course('Money Mindset')
+
+        with self.recorded_queries() as statements:
+            html = self.client.get('/academy/').get_data(as_text=True)
+        lesson_queries = [s for s in statements if 'FROM lessons' in s]
+        self.assertEqual(len(lesson_queries), 1)
+        self.assertIn('GROUP BY', lesson_queries[0])
+        for count in ('3 lessons', '1 lessons', '0 lessons'):
+            self.assertIn(count, html)
+
+        with self.recorded_queries() as statements:
+            courses = self.client.get('/academy/api/courses').get_json()['courses']
+        self.assertEqual(sum('FROM lessons' in s for s in statements), 1)
+        self.assertEqual({c['title']: c['total_lessons'] for c in courses},
+                         {'Budget Basics': 3, 'Investing 101': 1, 'Money Mindset': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,762 @@
+"""
+Unit tests for the ChengeAI advisor service
+"""
+
+import unittest
+import os
+import json
+import time
+import tempfile
+import sqlite3
+import threading
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ai_service import (AIBusyError, AIExecutor, AIMetrics, ChengeAI, CircuitBreaker, Conversation,
+                        ConversationStore, FinancialContextCache, ResponseCache,
+                        IntentClassifier, MemoryCacheBackend, SQLiteCacheBackend, chunk_text,
+                        load_conversation, record_conversation_turn,
+                        estimate_tokens, normalize_message, truncate_to_tokens, user_data_fingerprint,
+                        AI_THREAD_HEADROOM, HISTORY_KEEP_TURNS, SUMMARY_MAX_TOKENS)
+
+
+USER_DATA = {
+    'total_income': 5000,
+    'total_expenses': 3200,
+    'balance': 1800,
+    'transaction_count': 42,
+    'top_categories': [{'category': 'Rent', 'amount': 1500}, {'category': 'Food', 'amount': 600}]
+}
+
+
+def wait_until(condition, timeout=1):
+    """Poll condition until it is true or timeout seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FakeCompletions:
+    """Stand-in for client.chat.completions that counts calls."""
+
+    def __init__(self, content='Model answer'):
+        self.content = content
+        self.calls = 0
+        self.last_messages = None
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.last_messages = kwargs['messages']
+        message = type('Message', (), {'content': self.content})
+        choice = type('Choice', (), {'message': message})
+        return type('Response', (), {'choices': [choice]})
+
+
+class FakeClient:
+    """Stand-in for the OpenAI client."""
+
+    def __init__(self, completions):
+        self.chat = type('Chat', (), {'completions': completions})
+
+
+class FakeOpenAIServer:
+    """
+    Local OpenAI-compatible server for exercising the real client.
+
+    mode is 'ok', 'slow' (sleeps before answering) or 'error' (HTTP 500).
+    """
+
+    def __init__(self, mode='ok', delay=1.0):
+        self.mode = mode
+        self.delay = delay
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                server.requests += 1
+                if server.mode == 'error':
+                    self._send(500, {'error': {'message': 'boom', 'type': 'server_error'}})
+                    return
+                if server.mode == 'slow':
+                    time.sleep(server.delay)
+                if request.get('stream'):
+                    self._send_stream(['Stub', ' streamed', ' answer'])
+                    return
+                self._send(200, {
+                    'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0,
+                    'model': 'gpt-3.5-turbo',
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': 'Stub answer'}}],
+                    'usage': {'prompt_tokens': 10, 'completion_tokens': 2, 'total_tokens': 12}
+                })
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _send_stream(self, parts):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for part in parts:
+                    chunk = {'id': 'chatcmpl-test', 'object': 'chat.completion.chunk',
+                             'created': 0, 'model': 'gpt-3.5-turbo',
+                             'choices': [{'index': 0, 'finish_reason': None,
+                                          'delta': {'content': part}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/v1'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_openai_advisor(completions, backend=None):
+    """Build an advisor that talks to a fake OpenAI client."""
+    advisor = ChengeAI(cache=ResponseCache(backend or MemoryCacheBackend()))
+    advisor.use_openai = True
+    advisor.client = FakeClient(completions)
+    return advisor
+
+
+class TestIntentClassifier(unittest.TestCase):
+    """Test cases for the compiled rule-based intent classifier."""
+
+    def setUp(self):
+        """Set up a classifier and a rule-based advisor."""
+        self.classifier = IntentClassifier()
+        self.advisor = ChengeAI(cache=ResponseCache(None))
+
+    def test_scores_rank_intents(self):
+        """Test that intents with more keyword hits rank first."""
+        ranked = self.classifier.classify('Should I save, or invest in stocks and a portfolio?')
+
+        self.assertEqual(ranked[0], ('investment', 3))
+        self.assertIn(('saving', 1), ranked)
+
+    def test_keywords_match_word_starts(self):
+        """Test prefix matching and whole-word keywords."""
+        self.assertEqual(self.classifier.select('Investing for retirement'),
+                         ['investment', 'retirement'])
+        self.assertEqual(self.classifier.select('high yield accounts'), [])
+        self.assertEqual(self.classifier.select('Hi there'), ['greeting'])
+
+    def test_social_intents_yield_to_topics(self):
+        """Test that greetings are dropped when a topic is asked about."""
+        self.assertEqual(self.classifier.select('Hi! How do I pay off my loan?'), ['debt'])
+
+    def test_multi_intent_answer(self):
+        """Test that a two-topic question gets both answers."""
+        result = self.advisor._rule_based_response('How do I save and invest?', USER_DATA)
+
+        self.assertEqual(result['intents'], ['saving', 'investment'])
+        self.assertIn(self.advisor._saving_advice(1800, 5000, 3200), result['response'])
+        self.assertIn(self.advisor._investment_advice(1800), result['response'])
+
+    def test_no_intent_gives_general_advice(self):
+        """Test the general answer for unrecognized messages."""
+        result = self.advisor._rule_based_response('What is the weather?', USER_DATA)
+
+        self.assertEqual(result['intents'], [])
+        self.assertEqual(result['response'], self.advisor._general_advice(1800, 5000, 3200))
+
+
+class TestResponseCacheKeys(unittest.TestCase):
+    """Test cases for cache key normalization."""
+
+    def test_near_identical_questions_match(self):
+        """Test that trivially different phrasings normalize the same."""
+        self.assertEqual(normalize_message('How do I budget?'), normalize_message('how to budget'))
+        self.assertNotEqual(normalize_message('how to budget'), normalize_message('how to invest'))
+
+    def test_word_order_changes_key(self):
+        """Test that questions with the same words in a different order don't share a key."""
+        cache = ResponseCache(None)
+        pairs = [
+            ('I earn 500 and spend 1000, how do I budget?',
+             'I earn 1000 and spend 500, how do I budget?'),
+            ('pay off debt before I invest', 'invest before I pay off debt'),
+        ]
+        for first, second in pairs:
+            self.assertNotEqual(cache.make_key(first, USER_DATA), cache.make_key(second, USER_DATA))
+
+    def test_fingerprint_buckets_amounts(self):
+        """Test that small changes in amounts keep the same fingerprint."""
+        nearby = dict(USER_DATA, total_income=5100, balance=1850)
+        far = dict(USER_DATA, total_income=50000)
+
+        self.assertEqual(user_data_fingerprint(USER_DATA), user_data_fingerprint(nearby))
+        self.assertNotEqual(user_data_fingerprint(USER_DATA), user_data_fingerprint(far))
+
+    def test_scope_separates_entries(self):
+        """Test that different scopes get different keys."""
+        cache = ResponseCache(MemoryCacheBackend())
+        self.assertNotEqual(cache.make_key('budget', USER_DATA, scope=1),
+                            cache.make_key('budget', USER_DATA, scope=2))
+
+
+class TestFinancialContext(unittest.TestCase):
+    """Test cases for the cached per-user financial context."""
+
+    def test_rebuilt_only_when_version_changes(self):
+        """Test that the context is reused until the data version changes."""
+        advisor = ChengeAI(cache=ResponseCache(None))
+        cache = FinancialContextCache()
+        builds = []
+
+        def build():
+            builds.append(1)
+            return advisor.build_context(USER_DATA)
+
+        first = cache.get(1, ('v1',), build)
+        self.assertIs(cache.get(1, ('v1',), build), first)
+        self.assertIsNot(cache.get(1, ('v2',), build), first)
+        cache.get(2, ('v2',), build)
+
+        self.assertEqual(len(builds), 3)
+        self.assertEqual(cache.hits, 1)
+
+    def test_chat_reuses_rendered_prompt(self):
+        """Test that chat turns send the pre-rendered system prompt."""
+        completions = FakeCompletions()
+        advisor = make_openai_advisor(completions)
+        context = advisor.build_context(USER_DATA)
+        context.system_prompt = 'Pre-rendered prompt'
+
+        history = [{'user': 'hi', 'ai': 'hello'}]
+        advisor.chat('How do I budget?', context, history)
+
+        self.assertEqual(completions.last_messages[0]['content'], 'Pre-rendered prompt')
+        self.assertEqual(completions.last_messages[-1]['content'], 'How do I budget?')
+
+
+class TestConversation(unittest.TestCase):
+    """Test cases for conversation sessions and prompt budgeting."""
+
+    def test_truncate_to_tokens(self):
+        """Test that long text is cut to the budget at a word boundary."""
+        text = 'word ' * 500
+
+        cut = truncate_to_tokens(text, 50)
+
+        self.assertLessEqual(estimate_tokens(cut), 50)
+        self.assertTrue(cut.endswith(' …'))
+        self.assertEqual(truncate_to_tokens('short', 50), 'short')
+
+    def test_old_turns_fold_into_summary(self):
+        """Test that turns past the limit are summarized, not dropped."""
+        conversation = Conversation()
+        for i in range(HISTORY_KEEP_TURNS + 3):
+            conversation.add_turn(f'Question {i}? More detail.', f'Answer {i}. Extra.')
+
+        self.assertEqual(len(conversation.turns), HISTORY_KEEP_TURNS)
+        self.assertEqual(len(conversation.summary_points), 3)
+        self.assertIn('Question 0?', conversation.summary)
+        self.assertNotIn('More detail', conversation.summary)
+
+    def test_summary_is_bounded(self):
+        """Test that the rolling summary stays within its token budget."""
+        conversation = Conversation()
+        for i in range(200):
+            conversation.add_turn(f'Question number {i} about budgeting', 'An answer')
+
+        self.assertLessEqual(estimate_tokens(conversation.summary), SUMMARY_MAX_TOKENS)
+        self.assertIn('Question number 199', conversation.turns[-1]['user'])
+
+    def test_prompt_stays_within_budget(self):
+        """Test that long pasted messages and history fit max_prompt_tokens."""
+        completions = FakeCompletions()
+        advisor = make_openai_advisor(completions)
+        advisor.max_prompt_tokens = 800
+        history = [{'user': 'x ' * 3000, 'ai': 'y ' * 3000} for _ in range(10)]
+
+        advisor.chat('z ' * 3000, USER_DATA, history)
+
+        total = sum(estimate_tokens(m['content']) for m in completions.last_messages)
+        self.assertLessEqual(total, 800)
+        self.assertEqual(completions.last_messages[-1]['role'], 'user')
+
+    def test_store_round_trip(self):
+        """Test that sessions are saved and restored per scope."""
+        store = ConversationStore(MemoryCacheBackend())
+        conversation = store.load(1, None)
+        conversation.add_turn('hi', 'hello')
+        store.save(1, conversation)
+
+        restored = store.load(1, conversation.id)
+        self.assertEqual(restored.turns, conversation.turns)
+        self.assertTrue(store.load(2, conversation.id).is_empty())
+
+    def test_load_conversation_history(self):
+        """Test that client history seeds an unknown session and bad history is ignored."""
+        store = ConversationStore(MemoryCacheBackend())
+        with mock.patch('ai_service._conversation_store', store):
+            seeded = load_conversation(1, 'expired-id', [{'user': 'hi', 'ai': 'hello'}])
+            self.assertEqual(seeded.turns[0]['user'], 'hi')
+
+            for history in (5, 'x', {'user': 'hi'}, None):
+                self.assertTrue(load_conversation(1, None, history).is_empty())
+
+            record_conversation_turn(1, seeded, 'next', 'answer')
+            restored = load_conversation(1, seeded.id, [{'user': 'other', 'ai': 'turns'}])
+            self.assertEqual([turn['user'] for turn in restored.turns], ['hi', 'next'])
+
+
+class TestCacheBackends(unittest.TestCase):
+    """Test cases for the memory and SQLite cache backends."""
+
+    def test_memory_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set('a', 1, ttl=60)
+        backend.set('b', 2, ttl=60)
+        backend.get('a')
+        backend.set('c', 3, ttl=60)
+
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('c'), 3)
+
+    def test_memory_ttl_expiry(self):
+        """Test that expired entries are not returned."""
+        backend = MemoryCacheBackend()
+        backend.set('a', 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(backend.get('a'))
+
+    def test_sqlite_persistence_and_eviction(self):
+        """Test that SQLite entries persist across instances and are bounded."""
+        path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+        backend = SQLiteCacheBackend(path, max_entries=2)
+        backend.set('a', 'answer a', ttl=60)
+        time.sleep(0.01)
+        backend.set('b', 'answer b', ttl=60)
+        time.sleep(0.01)
+        backend.set('c', 'answer c', ttl=60)
+
+        reopened = SQLiteCacheBackend(path, max_entries=2)
+        self.assertIsNone(reopened.get('a'))
+        self.assertEqual(reopened.get('c'), 'answer c')
+
+        reopened.set('d', 'answer d', ttl=-1)
+        self.assertIsNone(reopened.get('d'))
+
+    def test_sqlite_connections_are_closed(self):
+        """Test that every connection the SQLite backend opens is closed again."""
+        opened = []
+
+        class TrackedConnection(sqlite3.Connection):
+            closed = False
+
+            def close(self):
+                self.closed = True
+                super().close()
+
+        def connect(*args, **kwargs):
+            opened.append(real_connect(*args, factory=TrackedConnection, **kwargs))
+            return opened[-1]
+
+        real_connect = sqlite3.connect
+        path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+        with mock.patch('ai_service.sqlite3.connect', connect):
+            backend = SQLiteCacheBackend(path)
+            backend.set('a', 'answer a', ttl=60)
+            backend.get('a')
+            backend.clear()
+
+        self.assertEqual(len(opened), 4)
+        self.assertTrue(all(conn.closed for conn in opened))
+
+
+class TestChengeAICache(unittest.TestCase):
+    """Test cases for cached chat responses."""
+
+    def test_repeated_question_skips_api(self):
+        """Test that a repeated question is answered from the cache."""
+        completions = FakeCompletions()
+        advisor = make_openai_advisor(completions)
+
+        first = advisor.chat('How do I budget?', USER_DATA, cache_scope=1)
+        second = advisor.chat('how to budget', USER_DATA, cache_scope=1)
+
+        self.assertEqual(first['source'], 'openai')
+        self.assertEqual(second['source'], 'cache')
+        self.assertEqual(second['response'], 'Model answer')
+        self.assertEqual(completions.calls, 1)
+
+    def test_follow_up_messages_bypass_cache(self):
+        """Test that messages with history always reach the model."""
+        completions = FakeCompletions()
+        advisor = make_openai_advisor(completions)
+        history = [{'user': 'hi', 'ai': 'hello'}]
+
+        advisor.chat('How do I budget?', USER_DATA, history, cache_scope=1)
+        advisor.chat('How do I budget?', USER_DATA, history, cache_scope=1)
+
+        self.assertEqual(completions.calls, 2)
+
+
+class TestResiliencePolicy(unittest.TestCase):
+    """Test cases for timeouts, retries and the circuit breaker."""
+
+    def make_advisor(self, server, **policy):
+        """Build an advisor using the real OpenAI client against a fake server."""
+        advisor = ChengeAI(cache=ResponseCache(None))
+        advisor.api_key = 'test-key'
+        advisor.use_openai = True
+        advisor.base_url = server.base_url
+        advisor.timeout = policy.get('timeout', 2)
+        advisor.deadline = policy.get('deadline', 5)
+        advisor.max_retries = policy.get('max_retries', 0)
+        advisor.breaker = policy.get('breaker', CircuitBreaker(failure_threshold=3, cooldown=60))
+        return advisor
+
+    def setUp(self):
+        """Skip when the OpenAI package is not installed."""
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            self.skipTest('openai package not installed')
+
+    def test_successful_call(self):
+        """Test a normal round trip through the fake server."""
+        server = FakeOpenAIServer('ok')
+        self.addCleanup(server.close)
+
+        result = self.make_advisor(server).chat('How do I save?', USER_DATA)
+
+        self.assertEqual(result['source'], 'openai')
+        self.assertEqual(result['response'], 'Stub answer')
+
+    def test_slow_provider_hits_deadline(self):
+        """Test that a slow provider falls back within the deadline."""
+        server = FakeOpenAIServer('slow', delay=2)
+        self.addCleanup(server.close)
+        advisor = self.make_advisor(server, timeout=0.2, deadline=0.5, max_retries=3)
+
+        start = time.monotonic()
+        result = advisor.chat('How do I save?', USER_DATA)
+
+        self.assertEqual(result['source'], 'rule-based')
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_server_errors_are_retried(self):
+        """Test that 5xx responses are retried before falling back."""
+        server = FakeOpenAIServer('error')
+        self.addCleanup(server.close)
+        advisor = self.make_advisor(server, max_retries=2)
+
+        result = advisor.chat('How do I save?', USER_DATA)
+
+        self.assertEqual(result['source'], 'rule-based')
+        self.assertEqual(server.requests, 3)
+
+    def test_breaker_opens_and_recovers(self):
+        """Test that the breaker skips the provider and recovers after cool-down."""
+        server = FakeOpenAIServer('error')
+        self.addCleanup(server.close)
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=0.2)
+        advisor = self.make_advisor(server, breaker=breaker)
+
+        advisor.chat('How do I save?', USER_DATA)
+        advisor.chat('How do I save?', USER_DATA)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        result = advisor.chat('How do I save?', USER_DATA)
+        self.assertEqual(result['source'], 'rule-based')
+        self.assertEqual(server.requests, 2)  # Routed straight to the rule engine
+
+        time.sleep(0.25)
+        server.mode = 'ok'
+        result = advisor.chat('How do I save?', USER_DATA)
+        self.assertEqual(result['source'], 'openai')
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_trial_stream_closed_early_is_released(self):
+        """Test that a half-open trial stream stopped by its consumer frees the trial."""
+        server = FakeOpenAIServer('ok')
+        self.addCleanup(server.close)
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+        advisor = self.make_advisor(server, breaker=breaker)
+        breaker.record_failure()
+        breaker.opened_at -= 60  # Cool-down has passed
+
+        events = advisor.chat_stream('How do I save?', USER_DATA)
+        self.assertEqual(next(events)[0], 'delta')
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())  # Trial in flight
+        events.close()
+
+        self.assertTrue(breaker.allow())
+        breaker.release_trial()
+        result = advisor.chat('How do I save?', USER_DATA)
+        self.assertEqual(result['source'], 'openai')
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_unresolved_trial_expires_after_cooldown(self):
+        """Test that a trial that never reports back stops blocking after cool-down."""
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0.1)
+        breaker.record_failure()
+        time.sleep(0.15)
+
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        time.sleep(0.15)
+        self.assertTrue(breaker.allow())
+
+
+class TestChatStream(unittest.TestCase):
+    """Test cases for streamed chat responses."""
+
+    def collect(self, events):
+        """Split streamed events into the delta texts and the final result."""
+        events = list(events)
+        self.assertEqual([event for event, _ in events[:-1]], ['delta'] * (len(events) - 1))
+        self.assertEqual(events[-1][0], 'done')
+        return [text for _, text in events[:-1]], events[-1][1]
+
+    def test_chunk_text_round_trips(self):
+        """Test that chunks join back into the original text."""
+        text = "**Tip:**\n\n• Save first, spend later\n- Review weekly "
+        chunks = list(chunk_text(text, words_per_chunk=2))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), text)
+
+    def test_rule_based_answer_is_chunked(self):
+        """Test that the rule-based fallback streams in several chunks."""
+        advisor = ChengeAI(cache=ResponseCache(None))
+        advisor.use_openai = False
+
+        deltas, result = self.collect(advisor.chat_stream('How do I save?', USER_DATA))
+
+        self.assertGreater(len(deltas), 1)
+        self.assertEqual(result['source'], 'rule-based')
+        self.assertEqual(''.join(deltas), result['response'])
+
+    def test_openai_tokens_are_streamed_and_cached(self):
+        """Test streaming from the model, then replaying the cached answer."""
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            self.skipTest('openai package not installed')
+        server = FakeOpenAIServer('ok')
+        self.addCleanup(server.close)
+        advisor = ChengeAI(cache=ResponseCache(MemoryCacheBackend()))
+        advisor.api_key = 'test-key'
+        advisor.use_openai = True
+        advisor.base_url = server.base_url
+
+        deltas, result = self.collect(advisor.chat_stream('How do I save?', USER_DATA, cache_scope=1))
+        self.assertEqual(deltas, ['Stub', ' streamed', ' answer'])
+        self.assertEqual(result['source'], 'openai')
+
+        deltas, result = self.collect(advisor.chat_stream('how to save', USER_DATA, cache_scope=1))
+        self.assertEqual(result['source'], 'cache')
+        self.assertEqual(''.join(deltas), 'Stub streamed answer')
+        self.assertEqual(server.requests, 1)
+
+
+class TestAIMetrics(unittest.TestCase):
+    """Test cases for advisor call metrics."""
+
+    def test_histogram_percentiles(self):
+        """Test latency percentiles estimated from the histogram."""
+        metrics = AIMetrics(buckets=(10, 100, 1000))
+        for latency in [5] * 90 + [50] * 9 + [5000]:
+            metrics.record_call('rule-based', latency)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['latency']['p50_ms'], 10)
+        self.assertEqual(snapshot['latency']['p95_ms'], 100)
+        self.assertEqual(snapshot['latency']['p99_ms'], 100)
+        self.assertEqual(snapshot['latency']['histogram'][-1], {'le_ms': 'inf', 'count': 1})
+        self.assertEqual(snapshot['calls_by_source'], {'rule-based': 100})
+
+    def test_chat_records_tokens_and_cache_hits(self):
+        """Test that model calls record tokens and repeats count as cache hits."""
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            self.skipTest('openai package not installed')
+        server = FakeOpenAIServer('ok')
+        self.addCleanup(server.close)
+        advisor = ChengeAI(cache=ResponseCache(MemoryCacheBackend()))
+        advisor.api_key = 'test-key'
+        advisor.use_openai = True
+        advisor.base_url = server.base_url
+
+        advisor.chat('How do I save?', USER_DATA, cache_scope=1)
+        advisor.chat('How do I save?', USER_DATA, cache_scope=1)
+        snapshot = advisor.metrics.snapshot(cache=advisor.cache)
+
+        self.assertEqual(snapshot['calls_by_source'], {'openai': 1, 'cache': 1})
+        self.assertEqual(snapshot['tokens'], {'prompt': 10, 'completion': 2})
+        self.assertEqual(snapshot['cache']['hit_rate'], 0.5)
+
+    def test_fallback_reasons(self):
+        """Test that fallbacks to the rule engine are counted by reason."""
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            self.skipTest('openai package not installed')
+        server = FakeOpenAIServer('error')
+        self.addCleanup(server.close)
+        advisor = ChengeAI(cache=ResponseCache(None))
+        advisor.api_key = 'test-key'
+        advisor.use_openai = True
+        advisor.base_url = server.base_url
+        advisor.max_retries = 0
+        advisor.breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+
+        advisor.chat('How do I save?', USER_DATA)
+        result = advisor.chat('How do I save?', USER_DATA)
+
+        self.assertEqual(result['fallback_reason'], 'breaker_open')
+        self.assertEqual(advisor.metrics.snapshot()['fallbacks'],
+                         {'server_error': 1, 'breaker_open': 1})
+
+    def test_retries_and_errors_are_counted(self):
+        """Test that retried attempts and OpenAI errors reach the metrics and the log."""
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            self.skipTest('openai package not installed')
+        server = FakeOpenAIServer('error')
+        self.addCleanup(server.close)
+        advisor = ChengeAI(cache=ResponseCache(None))
+        advisor.api_key = 'test-key'
+        advisor.use_openai = True
+        advisor.base_url = server.base_url
+        advisor.max_retries = 1
+
+        with self.assertLogs('chengeai', level='WARNING') as logs:
+            advisor.chat('How do I save?', USER_DATA)
+
+        snapshot = advisor.metrics.snapshot()
+        self.assertEqual(snapshot['retries'], {'server_error': 1})
+        self.assertEqual(snapshot['errors'], {'openai': 1})
+        events = [json.loads(line.split(':', 2)[2])['event'] for line in logs.output]
+        self.assertIn('ai_retry', events)
+        self.assertIn('ai_error', events)
+
+
+class TestAIExecutor(unittest.TestCase):
+    """Test cases for the bounded AI request executor."""
+
+    def setUp(self):
+        """Set up an executor with one worker and one queue slot."""
+        self.executor = AIExecutor(max_workers=1, max_queue=1, budget=2)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def test_rejects_when_queue_full(self):
+        """Test that submissions past the queue limit fail fast."""
+        self.executor.submit(self.release.wait)
+        self.executor.submit(self.release.wait)
+
+        self.assertEqual(self.executor.queue_depth, 1)
+        with self.assertRaises(AIBusyError):
+            self.executor.submit(self.release.wait)
+        self.assertEqual(self.executor.stats()['rejected'], 1)
+
+    def test_saturated_executor_leaves_web_threads_free(self):
+        """Test that admission stays below the web thread count when every thread asks."""
+        executor = AIExecutor(max_workers=4, max_queue=8, budget=2, web_threads=8)
+        results = []
+
+        def handle_request():
+            try:
+                results.append(executor.run(self.release.wait))
+            except AIBusyError:
+                results.append('busy')
+
+        threads = [threading.Thread(target=handle_request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(wait_until(lambda: results.count('busy') == 2))
+        self.assertEqual(executor.pending, 8 - AI_THREAD_HEADROOM)
+
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 6)
+
+    def test_run_times_out_within_budget(self):
+        """Test that a slow call is abandoned once the budget is spent."""
+        self.executor.budget = 0.1
+
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            self.executor.run(self.release.wait)
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(self.executor.stats()['timed_out'], 1)
+
+    def test_stream_relays_items_and_errors(self):
+        """Test that generator items and exceptions reach the caller."""
+        def events():
+            yield 'a'
+            yield 'b'
+            raise ValueError('boom')
+
+        received = []
+        with self.assertRaises(ValueError):
+            for item in self.executor.stream(events()):
+                received.append(item)
+
+        self.assertEqual(received, ['a', 'b'])
+
+    def endless_events(self, closed):
+        """A slow, never-ending upstream stream that records when it is closed."""
+        try:
+            while True:
+                time.sleep(0.02)
+                yield 'chunk'
+        finally:
+            closed.set()
+
+    def test_stream_closes_upstream_when_consumer_stops(self):
+        """Test that a client going away stops the pump and frees the worker."""
+        closed = threading.Event()
+        relayed = self.executor.stream(self.endless_events(closed))
+        self.assertEqual(next(relayed), 'chunk')
+
+        relayed.close()
+
+        self.assertTrue(closed.wait(1))
+        self.assertTrue(wait_until(lambda: self.executor.stats()['in_flight'] == 0))
+
+    def test_stream_closes_upstream_on_timeout(self):
+        """Test that a stream over budget stops draining the upstream."""
+        self.executor.budget = 0.1
+        closed = threading.Event()
+
+        with self.assertRaises(TimeoutError):
+            for _ in self.executor.stream(self.endless_events(closed)):
+                pass
+
+        self.assertTrue(closed.wait(1))
+        self.assertTrue(wait_until(lambda: self.executor.stats()['in_flight'] == 0))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -219,6 +219,32 @@ class TestFinanceTracker(unittest.TestCase):
         statuses = self.tracker.get_all_budget_statuses()
         self.assertEqual(len(statuses), 2)
     
+    def test_change_listener(self):
+        """Test that mutations report which kinds of data changed."""
+        changes = []
+        self.tracker.add_listener(changes.append)
+        
+        t = self.tracker.add_transaction(1000, 'Salary', 'Income', 'income')
+        self.tracker.update_transaction(t['id'], type='expense')
+        self.tracker.set_budget('Food', 500, 'monthly')
+        self.tracker.delete_transaction(t['id'])
+        
+        self.assertEqual(changes, [{'income'}, {'income', 'expense'}, {'budgets'}, {'expense'}])
+    
+    def test_data_version(self):
+        """Test that the data version changes when stored data changes."""
+        files = (self.test_data_file, self.test_budget_file)
+        empty = FinanceTracker.get_data_version(*files)
+        self.assertEqual(empty, (None, None))
+        
+        self.tracker.add_transaction(1000, 'Salary', 'Income', 'income')
+        after_add = FinanceTracker.get_data_version(*files)
+        self.assertNotEqual(after_add, empty)
+        self.assertEqual(FinanceTracker.get_data_version(*files), after_add)
+        
+        self.tracker.set_budget('Food', 500, 'monthly')
+        self.assertNotEqual(FinanceTracker.get_data_version(*files), after_add)
+    
     def test_persistence(self):
         """Test that data persists between instances."""
         # Add transaction in first instance
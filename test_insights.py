@@ -0,0 +1,147 @@
+"""
+Unit tests for weekly insight generation
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+from finance_tracker import FinanceTracker
+from insights import (summarize_finances, rule_based_insights, refresh_user_insights,
+                      generate_all_insights, load_insights, build_insights, advisor_summary)
+from visualizer import ChartDataset
+
+
+NOW = datetime(2024, 3, 15, 12, 0, 0)
+
+
+def add_transaction(tracker, days_ago, amount, category, transaction_type):
+    """Append a transaction dated days_ago before NOW."""
+    tracker.transactions.append({
+        'id': len(tracker.transactions) + 1,
+        'date': (NOW - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S'),
+        'amount': amount,
+        'category': category,
+        'description': '',
+        'type': transaction_type
+    })
+
+
+class FakeUser:
+    """Stand-in for models.User with per-user file paths."""
+
+    def __init__(self, user_id, base_dir):
+        self.id = user_id
+        self.base_dir = os.path.join(base_dir, str(user_id))
+
+    def get_data_file(self):
+        return os.path.join(self.base_dir, 'transactions.json')
+
+    def get_budget_file(self):
+        return os.path.join(self.base_dir, 'budgets.json')
+
+    def get_insights_file(self):
+        return os.path.join(self.base_dir, 'insights.json')
+
+
+class TestInsights(unittest.TestCase):
+    """Test cases for weekly insights."""
+
+    def setUp(self):
+        """Set up a user directory with a week of data."""
+        self.base_dir = tempfile.mkdtemp()
+        self.user = FakeUser(1, self.base_dir)
+        os.makedirs(self.user.base_dir)
+        self.tracker = FinanceTracker(self.user.get_data_file(), self.user.get_budget_file())
+        add_transaction(self.tracker, 2, 1000, 'Salary', 'income')
+        add_transaction(self.tracker, 3, 300, 'Food', 'expense')
+        add_transaction(self.tracker, 4, 100, 'Transport', 'expense')
+        add_transaction(self.tracker, 10, 200, 'Food', 'expense')
+        add_transaction(self.tracker, 40, 600, 'Rent', 'expense')
+        self.tracker._save_transactions()
+        self.tracker.set_budget('food', 400, 'monthly')
+
+    def tearDown(self):
+        """Clean up test files."""
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_summary_matches_tracker(self):
+        """Test the single-pass summary against the tracker's own queries."""
+        summary = summarize_finances(self.tracker, NOW)
+        tracker_summary = self.tracker.get_summary()
+
+        self.assertEqual(summary['user_data']['total_expenses'], tracker_summary['total_expenses'])
+        self.assertEqual(summary['user_data']['balance'], tracker_summary['balance'])
+        self.assertEqual(summary['user_data']['top_categories'][0],
+                         {'category': 'Rent', 'amount': 600})
+        self.assertEqual(summary['budget_statuses'], self.tracker.get_all_budget_statuses())
+        self.assertEqual(summary['week'], {'income': 1000, 'expense': 400})
+        self.assertEqual(summary['previous_week'], {'income': 0, 'expense': 200})
+        self.assertEqual(summary['week_categories'], {'Food': 300, 'Transport': 100})
+
+    def test_advisor_summary(self):
+        """Test the AI advisor summary built from the chart dataset."""
+        summary = advisor_summary(ChartDataset.from_tracker(self.tracker), top=2)
+
+        self.assertEqual(summary['transaction_count'], len(self.tracker.transactions))
+        self.assertEqual(summary['total_income'], 1000)
+        self.assertEqual(summary['top_categories'], [{'category': 'Rent', 'amount': 600},
+                                                     {'category': 'Food', 'amount': 500}])
+
+    def test_rule_based_insights(self):
+        """Test the insight cards built from a summary."""
+        insights = rule_based_insights(summarize_finances(self.tracker, NOW))
+        by_title = {insight['title']: insight['text'] for insight in insights}
+
+        self.assertIn('up 100% from the week before', by_title['Weekly spending'])
+        self.assertIn('Food', by_title['Top category'])
+        self.assertIn('$100.00 over your food budget', by_title['Over budget'])
+        self.assertIn('budget', by_title['Next step'])
+
+    def test_refresh_skips_fresh_insights(self):
+        """Test that insights are only rebuilt when the data changes."""
+        files = (self.user.get_data_file(), self.user.get_budget_file(),
+                 self.user.get_insights_file())
+
+        first, regenerated = refresh_user_insights(*files)
+        self.assertTrue(regenerated)
+        self.assertEqual(load_insights(self.user.get_insights_file()), first)
+
+        _, regenerated = refresh_user_insights(*files)
+        self.assertFalse(regenerated)
+
+        self.tracker.set_budget('Transport', 50, 'monthly')
+        _, regenerated = refresh_user_insights(*files)
+        self.assertTrue(regenerated)
+
+    def test_generate_all_insights(self):
+        """Test the batch job over many users, including ones without data."""
+        users = [self.user] + [FakeUser(i, self.base_dir) for i in range(2, 12)]
+
+        counts = generate_all_insights(iter(users), workers=2)
+        self.assertEqual(counts, {'generated': 11, 'skipped': 0, 'failed': 0})
+        for user in users:
+            self.assertIsNotNone(load_insights(user.get_insights_file()))
+
+        counts = generate_all_insights(iter(users), workers=2)
+        self.assertEqual(counts['skipped'], 11)
+
+    def test_llm_insights_are_cached_per_user(self):
+        """Test ChengeAI answers for insights are cached under the user's scope."""
+        reply = {'success': True, 'response': 'Spend less on food.', 'source': 'openai'}
+        with mock.patch('ai_service.ai_advisor.chat', return_value=reply) as chat:
+            record = build_insights(self.user.get_data_file(), self.user.get_budget_file(),
+                                    use_llm=True, now=NOW, user_id=7)
+        self.assertEqual(chat.call_args.kwargs['cache_scope'], 7)
+        self.assertEqual(record['insights'][0]['text'], 'Spend less on food.')
+
+        with mock.patch('ai_service.ai_advisor.chat', return_value=reply) as chat:
+            build_insights(self.user.get_data_file(), self.user.get_budget_file(),
+                           use_llm=True, now=NOW)
+        self.assertEqual(chat.call_args.kwargs['cache_scope'], self.user.get_data_file())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
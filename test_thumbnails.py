@@ -0,0 +1,171 @@
+"""
+Unit tests for the resources thumbnail cache
+"""
+
+import unittest
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+from flask import Flask, request
+import youtube_service
+from thumbnails import (ThumbnailCache, thumbnail_response, THUMB_WIDTHS, THUMB_MAX_AGE_SECONDS,
+                        THUMB_FAILURE_TTL_SECONDS)
+
+VIDEO_ID = 'abcdefghijk'
+
+
+def make_jpeg(width=320, height=180):
+    """Build a JPEG shaped like a YouTube mqdefault thumbnail."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class FakeImageServer:
+    """Local stand-in for i.ytimg.com serving /vi/<id>/mqdefault.jpg."""
+
+    def __init__(self, missing=()):
+        self.requests = []
+        self.image = make_jpeg()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                youtube_id = self.path.split('/')[2]
+                server.requests.append(youtube_id)
+                if youtube_id in missing:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(server.image)))
+                self.end_headers()
+                self.wfile.write(server.image)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.source_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/vi/{{youtube_id}}/mqdefault.jpg'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestThumbnailCache(unittest.TestCase):
+    """Test fetching, resizing and bounding the thumbnail cache."""
+
+    def setUp(self):
+        """Point a cache at a temporary directory and a local image server."""
+        self.server = FakeImageServer(missing=('missingvid0',))
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ThumbnailCache(directory=self.cache_dir, max_bytes=10 ** 6,
+                                    source_url=self.server.source_url)
+        youtube_service._session = None
+
+    def tearDown(self):
+        """Stop the image server and remove the cache."""
+        youtube_service.get_http_session().close()
+        youtube_service._session = None
+        self.server.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_fetches_once_and_stores_webp_variants(self):
+        """Test one download produces every width, served from disk afterwards."""
+        data = self.cache.get(VIDEO_ID)
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (320, 180))
+        with Image.open(io.BytesIO(self.cache.get(VIDEO_ID, 100))) as image:
+            self.assertEqual(image.size, (160, 90))
+
+        for _ in range(3):
+            self.assertEqual(self.cache.get(VIDEO_ID), data)
+        self.assertEqual(self.server.requests, [VIDEO_ID])
+        self.assertEqual(sorted(os.listdir(self.cache_dir)),
+                         sorted(f'{VIDEO_ID}_{width}.webp' for width in THUMB_WIDTHS))
+
+    def test_concurrent_misses_share_one_download(self):
+        """Test simultaneous requests for an uncached video download it once."""
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get(VIDEO_ID)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.server.requests, [VIDEO_ID])
+
+    def test_invalid_and_missing_ids(self):
+        """Test malformed ids are rejected and upstream 404s are not retried."""
+        self.assertIsNone(self.cache.get('../../etc/passwd'))
+        self.assertIsNone(self.cache.get('short'))
+        self.assertIsNone(self.cache.get('missingvid0'))
+        self.assertIsNone(self.cache.get('missingvid0'))
+        self.assertEqual(self.server.requests, ['missingvid0'])
+
+    def test_failures_are_bounded(self):
+        """Test remembered failures expire and never exceed the size limit."""
+        self.cache._failures['expiredvid0'] = time.time() - THUMB_FAILURE_TTL_SECONDS - 1
+        self.cache.get('missingvid0')
+        self.assertEqual(list(self.cache._failures), ['missingvid0'])
+
+        with mock.patch('thumbnails.THUMB_FAILURE_MAX_ENTRIES', 3):
+            for n in range(5):
+                self.cache._record_failure(f'failedvid{n:02d}')
+        self.assertEqual(list(self.cache._failures), ['failedvid02', 'failedvid03', 'failedvid04'])
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache stays under its size limit by dropping the oldest files."""
+        first = self.cache.get('aaaaaaaaaaa')
+        per_video = sum(os.path.getsize(self.cache.path('aaaaaaaaaaa', w)) for w in THUMB_WIDTHS)
+        self.cache.max_bytes = per_video * 2
+        for path in os.listdir(self.cache_dir):
+            os.utime(os.path.join(self.cache_dir, path), (1, 1))
+
+        self.cache.get('bbbbbbbbbbb')
+        self.cache.get('ccccccccccc')
+
+        files = os.listdir(self.cache_dir)
+        self.assertFalse(any(name.startswith('aaaaaaaaaaa') for name in files))
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.cache_dir, name))
+                                 for name in files), self.cache.max_bytes)
+        self.assertEqual(self.cache.get('aaaaaaaaaaa'), first)
+        self.assertEqual(self.server.requests.count('aaaaaaaaaaa'), 2)
+
+    def test_etag_and_conditional_response(self):
+        """Test thumbnail responses are long-lived and answer If-None-Match with 304."""
+        app = Flask(__name__)
+
+        @app.route('/thumb/<youtube_id>')
+        def thumb(youtube_id):
+            return thumbnail_response(self.cache.get(youtube_id), request)
+
+        client = app.test_client()
+        first = client.get(f'/thumb/{VIDEO_ID}')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.mimetype, 'image/webp')
+        self.assertIn(f'max-age={THUMB_MAX_AGE_SECONDS}', first.headers['Cache-Control'])
+        etag = first.headers['ETag']
+
+        second = client.get(f'/thumb/{VIDEO_ID}', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,307 @@
+"""
+Unit tests for Finance Visualizer
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from unittest import mock
+from finance_tracker import FinanceTracker
+from visualizer import (FinanceVisualizer, ChartDataset, aggregate_time_series,
+                        lttb_indices, mark_charts_stale, CHART_DEPENDENCIES,
+                        MAX_TIME_SERIES_POINTS, load_data_versions)
+
+# Charts are checked for existence, not looks, so save them at low resolution
+_low_dpi = mock.patch('visualizer.CHART_DPI', 20)
+
+
+def setUpModule():
+    _low_dpi.start()
+
+
+def tearDownModule():
+    _low_dpi.stop()
+
+
+def make_transactions(days, start=datetime(2020, 1, 1)):
+    """Build one income and one expense transaction per day."""
+    transactions = []
+    for i in range(days):
+        date = (start + timedelta(days=i)).strftime('%Y-%m-%d %H:%M:%S')
+        transactions.append({'id': len(transactions) + 1, 'date': date, 'amount': 100.0,
+                             'category': 'Salary', 'description': '', 'type': 'income'})
+        transactions.append({'id': len(transactions) + 1, 'date': date, 'amount': 40.0 + i % 7,
+                             'category': 'Food', 'description': '', 'type': 'expense'})
+    return transactions
+
+
+class TestDownsampling(unittest.TestCase):
+    """Test cases for time-series aggregation and LTTB downsampling."""
+
+    def test_short_history_stays_daily(self):
+        """Test that short histories are plotted per day."""
+        daily = {'2024-01-01': {'income': 10, 'expense': 5},
+                 '2024-01-02': {'income': 0, 'expense': 7}}
+        granularity, dates, incomes, expenses = aggregate_time_series(daily)
+
+        self.assertEqual(granularity, 'day')
+        self.assertEqual(len(dates), 2)
+        self.assertEqual(expenses, [5, 7])
+
+    def test_long_history_is_bucketed(self):
+        """Test that long histories are aggregated and totals preserved."""
+        daily = {}
+        for i in range(3 * 365):
+            date = (datetime(2020, 1, 1) + timedelta(days=i)).strftime('%Y-%m-%d')
+            daily[date] = {'income': 10, 'expense': 4}
+
+        granularity, dates, incomes, expenses = aggregate_time_series(daily)
+
+        self.assertIn(granularity, ('week', 'month'))
+        self.assertLessEqual(len(dates), MAX_TIME_SERIES_POINTS)
+        self.assertEqual(sum(incomes), 10 * 3 * 365)
+        self.assertEqual(sum(expenses), 4 * 3 * 365)
+
+    def test_lttb_keeps_endpoints_and_extremes(self):
+        """Test that LTTB keeps the first, last and peak points."""
+        xs = list(range(1000))
+        ys = [0] * 1000
+        ys[500] = 100
+
+        keep = lttb_indices(xs, ys, 50)
+
+        self.assertEqual(len(keep), 50)
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], 999)
+        self.assertIn(500, keep)
+        self.assertEqual(keep, sorted(keep))
+
+    def test_lttb_below_threshold(self):
+        """Test that short series are returned unchanged."""
+        self.assertEqual(lttb_indices([1, 2, 3], [1, 2, 3], 10), [0, 1, 2])
+
+
+class TestChartDataset(unittest.TestCase):
+    """Test cases for the single-pass chart dataset."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_data_file = 'data/test_dataset_transactions.json'
+        self.test_budget_file = 'data/test_dataset_budgets.json'
+        self.tracker = FinanceTracker(self.test_data_file, self.test_budget_file)
+
+    def tearDown(self):
+        """Clean up test files."""
+        if os.path.exists(self.test_data_file):
+            os.remove(self.test_data_file)
+        if os.path.exists(self.test_budget_file):
+            os.remove(self.test_budget_file)
+
+    def test_matches_tracker_queries(self):
+        """Test that the dataset agrees with the tracker's own summaries."""
+        self.tracker.transactions = make_transactions(10)
+        self.tracker.set_budget('food', 300, 'monthly')
+
+        dataset = ChartDataset.from_tracker(self.tracker)
+        summary = self.tracker.get_summary()
+
+        self.assertEqual(dataset.total_income, summary['total_income'])
+        self.assertEqual(dataset.total_expenses, summary['total_expenses'])
+        self.assertEqual(dataset.balance, summary['balance'])
+        self.assertEqual(dataset.transaction_count, summary['transaction_count'])
+        self.assertEqual(dataset.categories, self.tracker.get_category_summary())
+        self.assertEqual(dataset.budget_statuses, self.tracker.get_all_budget_statuses())
+        self.assertEqual(len(dataset.daily), 10)
+        self.assertAlmostEqual(dataset.balances[-1], summary['balance'])
+
+    def test_empty_tracker(self):
+        """Test dataset for a tracker with no data."""
+        dataset = ChartDataset.from_tracker(self.tracker)
+
+        self.assertEqual(dataset.transaction_count, 0)
+        self.assertEqual(dataset.daily, {})
+        self.assertEqual(dataset.budget_statuses, [])
+
+
+class TestFinanceVisualizer(unittest.TestCase):
+    """Test cases for FinanceVisualizer chart generation."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_data_file = 'data/test_viz_transactions.json'
+        self.test_budget_file = 'data/test_viz_budgets.json'
+        self.tracker = FinanceTracker(self.test_data_file, self.test_budget_file)
+        self.visualizer = FinanceVisualizer(self.tracker, output_dir=tempfile.mkdtemp())
+
+    def tearDown(self):
+        """Clean up test files."""
+        shutil.rmtree(self.visualizer.output_dir, ignore_errors=True)
+        if os.path.exists(self.test_data_file):
+            os.remove(self.test_data_file)
+        if os.path.exists(self.test_budget_file):
+            os.remove(self.test_budget_file)
+
+    def test_long_history_charts(self):
+        """Test that multi-year histories render the time-series charts."""
+        self.tracker.transactions = make_transactions(2 * 365)
+
+        self.assertTrue(os.path.exists(self.visualizer.plot_spending_over_time()))
+        self.assertTrue(os.path.exists(self.visualizer.plot_cumulative_balance()))
+
+    def test_generate_all_charts(self):
+        """Test generating every chart from one shared dataset."""
+        self.tracker.transactions = make_transactions(30)
+        self.tracker.set_budget('Food', 1000, 'monthly')
+
+        charts = self.visualizer.generate_all_charts()
+
+        self.assertEqual(len(charts), 6)
+        for path in charts.values():
+            self.assertTrue(os.path.exists(path))
+
+    def test_concurrent_rendering(self):
+        """Test rendering charts for different users from several threads."""
+        self.tracker.transactions = make_transactions(30)
+        other_tracker = FinanceTracker(self.test_data_file, self.test_budget_file)
+        other_tracker.transactions = make_transactions(5)
+        other = FinanceVisualizer(other_tracker, output_dir=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, other.output_dir, True)
+
+        results = []
+        threads = [threading.Thread(target=lambda v=v: results.append(v.generate_all_charts()))
+                   for v in (self.visualizer, other, self.visualizer)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 3)
+        for charts in results:
+            self.assertEqual(len(charts), 5)  # No budgets, so no budget chart
+
+    def test_empty_tracker(self):
+        """Test that charts needing transactions are skipped when empty."""
+        self.assertIsNone(self.visualizer.plot_spending_over_time())
+        self.assertIsNone(self.visualizer.plot_cumulative_balance())
+
+
+def _mark_expenses(output_dir, count):
+    """Mark expense charts stale count times (run in a child process)."""
+    for _ in range(count):
+        mark_charts_stale(output_dir, {'expense'})
+
+
+class TestIncrementalCharts(unittest.TestCase):
+    """Test cases for change-driven chart regeneration."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_data_file = 'data/test_incr_transactions.json'
+        self.test_budget_file = 'data/test_incr_budgets.json'
+        self.tracker = FinanceTracker(self.test_data_file, self.test_budget_file)
+        self.tracker.add_transaction(1000, 'Salary', 'Income', 'income')
+        self.tracker.add_transaction(200, 'Food', 'Groceries', 'expense')
+        self.tracker.set_budget('Food', 500, 'monthly')
+        self.output_dir = tempfile.mkdtemp()
+        self.visualizer = FinanceVisualizer(self.tracker, output_dir=self.output_dir)
+
+    def tearDown(self):
+        """Clean up test files."""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        if os.path.exists(self.test_data_file):
+            os.remove(self.test_data_file)
+        if os.path.exists(self.test_budget_file):
+            os.remove(self.test_budget_file)
+
+    def test_all_charts_stale_initially(self):
+        """Test that charts never drawn are stale."""
+        self.assertEqual(set(self.visualizer.get_stale_charts()), set(CHART_DEPENDENCIES))
+
+        charts = self.visualizer.generate_stale_charts()
+
+        self.assertEqual(len(charts), 6)
+        self.assertEqual(self.visualizer.get_stale_charts(), [])
+
+    def test_budget_change_only_marks_budget_chart(self):
+        """Test that a budget change only invalidates the budget chart."""
+        self.visualizer.generate_all_charts()
+
+        self.tracker.set_budget('Transport', 100, 'monthly')
+
+        self.assertEqual(self.visualizer.get_stale_charts(), ['budget_progress'])
+
+    def test_income_change_skips_expense_only_charts(self):
+        """Test that adding income leaves expense-only charts alone."""
+        self.visualizer.generate_all_charts()
+
+        self.tracker.add_transaction(50, 'Gift', 'Birthday', 'income')
+
+        stale = set(self.visualizer.get_stale_charts())
+        self.assertIn('income_breakdown', stale)
+        self.assertIn('cumulative_balance', stale)
+        self.assertNotIn('expense_breakdown', stale)
+        self.assertNotIn('budget_progress', stale)
+
+    def test_marks_from_another_tracker_instance(self):
+        """Test that changes recorded elsewhere (e.g. another worker) are seen."""
+        self.visualizer.generate_all_charts()
+
+        affected = mark_charts_stale(self.output_dir, {'expense'})
+
+        self.assertEqual(set(self.visualizer.get_stale_charts()), set(affected))
+
+        # This visualizer's tracker doesn't hold that change, so its charts
+        # can't be recorded as up to date; one that reloads the data can
+        self.visualizer.generate_stale_charts()
+        self.assertEqual(set(self.visualizer.get_stale_charts()), set(affected))
+
+        data_versions = load_data_versions(self.output_dir)
+        reloaded = FinanceVisualizer(FinanceTracker(self.test_data_file, self.test_budget_file),
+                                     output_dir=self.output_dir, data_versions=data_versions)
+        reloaded.generate_stale_charts()
+        self.assertEqual(reloaded.get_stale_charts(), [])
+
+    def test_change_while_loading_stays_stale(self):
+        """Test that a change made after the versions were read is not recorded as drawn."""
+        self.visualizer.generate_all_charts()
+        data_versions = load_data_versions(self.output_dir)
+        tracker = FinanceTracker(self.test_data_file, self.test_budget_file)
+
+        # Another worker adds an expense after the versions were read
+        mark_charts_stale(self.output_dir, {'expense'})
+
+        visualizer = FinanceVisualizer(tracker, output_dir=self.output_dir,
+                                       data_versions=data_versions)
+        visualizer.generate_stale_charts()
+        self.assertIn('expense_breakdown', visualizer.get_stale_charts())
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'chart_state.json.lock')))
+
+    def test_concurrent_marks_from_processes(self):
+        """Test that marks made by several worker processes at once are all counted."""
+        import multiprocessing
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_mark_expenses, args=(self.output_dir, 25))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+
+        self.assertEqual(load_data_versions(self.output_dir)['expense'], 100)
+
+    def test_chart_without_data_is_removed(self):
+        """Test that a chart whose data disappeared is no longer served."""
+        self.visualizer.generate_all_charts()
+
+        self.tracker.delete_budget('Food')
+        charts = self.visualizer.generate_stale_charts()
+
+        self.assertNotIn('budget_progress', charts)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'budget_progress.png')))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,491 @@
+"""
+Unit tests for the YouTube resources service
+"""
+
+import unittest
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from flask import Flask
+from models import db, Video
+import youtube_service
+
+
+def make_search_item(video_id):
+    """Build a search.list result item."""
+    return {
+        'id': {'videoId': video_id},
+        'snippet': {
+            'title': f'Budgeting basics {video_id}',
+            'channelTitle': 'Test Channel',
+            'description': 'How to budget money for beginners',
+            'thumbnails': {'medium': {'url': f'https://i.ytimg.com/vi/{video_id}/mqdefault.jpg'}},
+            'publishedAt': '2024-01-01T00:00:00Z'
+        }
+    }
+
+
+def make_video_item(video_id):
+    """Build a videos.list result item."""
+    return {
+        'id': video_id,
+        'snippet': {
+            'title': f'Budgeting basics {video_id}',
+            'channelTitle': 'Test Channel',
+            'description': 'How to budget money for beginners'
+        },
+        'contentDetails': {'duration': 'PT10M5S'},
+        'statistics': {'viewCount': '1000', 'likeCount': '50'}
+    }
+
+
+class FakeYouTubeAPI:
+    """
+    Local stand-in for the YouTube Data API.
+
+    Every search returns three videos derived from the query, one of them
+    shared by all queries; each request sleeps for delay seconds.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = {'search': 0, 'videos': 0}
+        self.batch_sizes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                endpoint = url.path.rsplit('/', 1)[-1]
+                with api._lock:
+                    api.requests[endpoint] = api.requests.get(endpoint, 0) + 1
+                    api.in_flight += 1
+                    api.max_in_flight = max(api.max_in_flight, api.in_flight)
+                time.sleep(api.delay)
+
+                if endpoint == 'search':
+                    query = params['q'][0].replace(' ', '-')
+                    ids = ['shared', f'{query}-1', f'{query}-2']
+                    body = {'items': [make_search_item(i) for i in ids]}
+                else:
+                    ids = params['id'][0].split(',')
+                    with api._lock:
+                        api.batch_sizes.append(len(ids))
+                    body = {'items': [make_video_item(i) for i in ids]}
+
+                with api._lock:
+                    api.in_flight -= 1
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/youtube/v3'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class YouTubeAPITestCase(unittest.TestCase):
+    """Base class pointing the service at a mock API and a temporary cache."""
+
+    delay = 0.0
+
+    def setUp(self):
+        """Point the service at a mock API, an in-memory catalog and a temporary cache."""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.api = FakeYouTubeAPI(delay=self.delay)
+        self.cache_dir = tempfile.mkdtemp()
+        self.saved = {name: getattr(youtube_service, name)
+                      for name in ('YOUTUBE_API_KEY', 'YOUTUBE_API_URL', 'CACHE_FILE', 'quota')}
+        youtube_service.YOUTUBE_API_KEY = 'test-key'
+        youtube_service.YOUTUBE_API_URL = self.api.base_url
+        youtube_service.CACHE_FILE = os.path.join(self.cache_dir, 'youtube_cache.json')
+        youtube_service.quota = youtube_service.QuotaAccountant(
+            os.path.join(self.cache_dir, 'youtube_quota.json'), daily_budget=10 ** 6)
+        youtube_service._refresh_failed_at = 0
+        youtube_service._session = None
+        youtube_service._memory_cache = None
+
+    def tearDown(self):
+        """Restore the service settings and stop the mock API."""
+        if youtube_service._refresh_thread is not None:
+            youtube_service._refresh_thread.join(5)
+        for name, value in self.saved.items():
+            setattr(youtube_service, name, value)
+        youtube_service.get_http_session().close()
+        youtube_service._session = None
+        self.api.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def write_cache(self, videos, age):
+        """Write a cache file that is age (a timedelta) old, as another worker would."""
+        written = datetime.now() - age
+        with open(youtube_service.CACHE_FILE, 'w') as f:
+            json.dump({'timestamp': written.isoformat(), 'videos': videos}, f)
+        os.utime(youtube_service.CACHE_FILE, (written.timestamp(), written.timestamp()))
+
+
+class TestYouTubeFetch(YouTubeAPITestCase):
+    """Test fetching videos against a local mock API."""
+
+    delay = 0.2
+
+    def test_searches_run_concurrently(self):
+        """Test that a refresh costs about one round trip per stage, not one per query."""
+        start = time.perf_counter()
+        videos = youtube_service.fetch_finance_videos(force_refresh=True)
+        elapsed = time.perf_counter() - start
+
+        searches = len(youtube_service.FINANCE_SEARCHES)
+        self.assertEqual(self.api.requests['search'], searches)
+        self.assertGreater(self.api.max_in_flight, 1)
+        # Serial searches alone would take searches * 0.2s
+        self.assertLess(elapsed, searches * self.api.delay / 2)
+
+        # The shared video is only kept once
+        self.assertEqual(len(videos), 2 * searches + 1)
+        self.assertEqual(videos[0]['youtubeId'], 'shared')
+        self.assertEqual(len({v['youtubeId'] for v in videos}), len(videos))
+        self.assertEqual(self.api.requests['videos'], 1)
+        self.assertEqual(videos[0]['category'], 'budgeting')
+        self.assertEqual(videos[0]['duration'], '10:05')
+        self.assertTrue(os.path.exists(youtube_service.CACHE_FILE))
+
+    def test_search_all_keeps_query_order(self):
+        """Test that concurrent results are merged in query order."""
+        videos = youtube_service.search_all_videos(['a b', 'c d'], max_results=3)
+        self.assertEqual([v['youtubeId'] for v in videos],
+                         ['shared', 'a-b-1', 'a-b-2', 'c-d-1', 'c-d-2'])
+
+    def test_details_are_batched(self):
+        """Test that details are requested at most 50 ids per call."""
+        ids = [f'video-{i}' for i in range(120)]
+        videos = youtube_service.get_video_details(ids)
+
+        self.assertEqual([v['youtubeId'] for v in videos], ids)
+        self.assertEqual(sorted(self.api.batch_sizes), [20, 50, 50])
+
+
+class TestVideoCatalog(YouTubeAPITestCase):
+    """Test the persistent Video catalog."""
+
+    def test_refresh_keeps_history(self):
+        """Test that videos from earlier refreshes stay in the catalog with stable ids."""
+        first = youtube_service.refresh_videos()
+        ids = {v['youtubeId']: v['id'] for v in first}
+
+        with mock.patch.object(youtube_service, 'FINANCE_SEARCHES', ['brand new query']):
+            videos = youtube_service.refresh_videos()
+
+        self.assertEqual(Video.query.count(), len(first) + 2)
+        self.assertEqual(len(videos), len(first) + 2)
+        # Latest results first, earlier ones keep their ids
+        self.assertEqual([v['youtubeId'] for v in videos[:3]],
+                         ['shared', 'brand-new-query-1', 'brand-new-query-2'])
+        self.assertTrue(all(ids[v['youtubeId']] == v['id'] for v in videos if v['youtubeId'] in ids))
+        self.assertEqual([v['featured'] for v in videos].count(True), youtube_service.FEATURED_COUNT)
+
+    def test_only_stale_details_are_refreshed(self):
+        """Test that details are fetched for new or stale videos only."""
+        found = youtube_service.search_all_videos(['a b'], max_results=3)
+        self.assertEqual(youtube_service.upsert_videos(found), 3)
+        self.assertEqual(youtube_service.upsert_videos(found), 0)
+
+        video = Video.query.filter_by(youtube_id='a-b-1').first()
+        video.fetched_at -= timedelta(hours=youtube_service.DETAILS_MAX_AGE_HOURS + 1)
+        db.session.commit()
+        self.assertEqual(youtube_service.upsert_videos(found), 1)
+        self.assertEqual(self.api.batch_sizes, [3, 1])
+        self.assertEqual(video.duration, '10:05')
+        self.assertEqual(video.get_topics(), ['Budgeting'])
+
+    def test_cache_rebuilt_from_catalog(self):
+        """Test that a missing cache file is rebuilt from the database, not the API."""
+        youtube_service.refresh_videos()
+        requests_made = dict(self.api.requests)
+        os.remove(youtube_service.CACHE_FILE)
+        youtube_service._memory_cache = None
+
+        videos = youtube_service.fetch_finance_videos()
+        self.assertEqual(len(videos), Video.query.count())
+        self.assertEqual(self.api.requests, requests_made)
+        self.assertTrue(os.path.exists(youtube_service.CACHE_FILE))
+
+    def test_rebuilt_cache_dated_by_last_refresh(self):
+        """Test the rebuilt cache's local timestamp matches the UTC refresh time."""
+        with mock.patch.dict(os.environ, {'TZ': 'Africa/Harare'}):
+            time.tzset()
+            self.addCleanup(time.tzset)
+            refreshed = datetime.now(timezone.utc) - timedelta(hours=2)
+            youtube_service.upsert_videos(youtube_service.search_all_videos(['a b'], max_results=3),
+                                          now=refreshed.replace(tzinfo=None))
+
+            videos, cached_time = youtube_service._publish_catalog_from_db()
+
+            self.assertEqual(len(videos), Video.query.count())
+            self.assertAlmostEqual((datetime.now() - cached_time).total_seconds(), 2 * 3600, delta=5)
+
+
+class TestQuota(YouTubeAPITestCase):
+    """Test quota accounting and the search scheduler."""
+
+    def setUp(self):
+        """Use a small daily budget."""
+        super().setUp()
+        youtube_service.quota.daily_budget = 1000
+
+    def test_reserve_within_budget(self):
+        """Test that units are recorded per day and refused over budget."""
+        quota = youtube_service.quota
+        for _ in range(9):
+            self.assertTrue(quota.reserve('search', 100))
+        self.assertTrue(quota.reserve('videos', 1))
+        self.assertFalse(quota.reserve('search', 100))
+        self.assertEqual(quota.spent(), 901)
+        self.assertEqual(quota.remaining(), 99)
+
+        # Persisted for other workers
+        saved = youtube_service.QuotaAccountant(quota.path, 1000)
+        self.assertEqual(saved._load()['days'][quota.today()],
+                         {'units': 901, 'search': 9, 'videos': 1})
+
+    def test_calls_are_charged(self):
+        """Test that API calls reserve their cost first."""
+        youtube_service.search_youtube_videos('a b')
+        youtube_service.get_video_details(['x', 'y'])
+        self.assertEqual(youtube_service.quota.spent(), 101)
+
+    def test_searches_staggered_across_the_day(self):
+        """Test that the budget is split between the day's remaining refreshes."""
+        queries = ['q1', 'q2', 'q3', 'q4', 'q5']
+        tz = youtube_service.QUOTA_TIMEZONE
+        midnight = datetime(2024, 3, 15, 0, 0, tzinfo=tz)
+        evening = datetime(2024, 3, 15, 20, 0, tzinfo=tz)
+
+        # Four 6-hour refreshes left: (1000 // 4 - 2) // 100 = 2 searches each
+        self.assertEqual(youtube_service.plan_searches(queries, midnight), ['q1', 'q2'])
+        self.assertEqual(youtube_service.plan_searches(queries, midnight), ['q3', 'q4'])
+        # Last refresh of the day may use everything left, capped at one pass
+        self.assertEqual(youtube_service.plan_searches(queries, evening),
+                         ['q5', 'q1', 'q2', 'q3', 'q4'])
+
+    def test_spent_budget_degrades_to_cache(self):
+        """Test that refreshes stop without API calls once the budget is spent."""
+        youtube_service.quota.reserve('search', 1000)
+
+        self.assertIsNone(youtube_service.refresh_videos())
+        self.assertEqual(self.api.requests['search'], 0)
+
+        self.assertEqual(youtube_service.fetch_finance_videos(force_refresh=True),
+                         youtube_service.get_default_videos())
+
+        stale = [{'youtubeId': 'old', 'title': 'Old video'}]
+        self.write_cache(stale, timedelta(hours=30))
+        self.assertEqual(youtube_service.fetch_finance_videos(force_refresh=True), stale)
+        self.assertEqual(self.api.requests['search'], 0)
+
+
+class TestStaleWhileRevalidate(YouTubeAPITestCase):
+    """Test serving stale videos while one worker refreshes the cache."""
+
+    STALE = [{'youtubeId': 'old', 'title': 'Old video'}]
+
+    def test_fresh_cache_makes_no_requests(self):
+        """Test that a fresh cache is served without touching the API."""
+        self.write_cache(self.STALE, timedelta(hours=1))
+        self.assertEqual(youtube_service.fetch_finance_videos(), self.STALE)
+        self.assertEqual(self.api.requests['search'], 0)
+
+    def test_stale_cache_served_while_refreshing(self):
+        """Test that an expired cache is returned at once and refreshed in the background."""
+        self.write_cache(self.STALE, timedelta(hours=25))
+
+        self.assertEqual(youtube_service.fetch_finance_videos(), self.STALE)
+        youtube_service._refresh_thread.join(5)
+
+        self.assertEqual(self.api.requests['search'], len(youtube_service.FINANCE_SEARCHES))
+        refreshed = youtube_service.get_cached_videos()
+        self.assertEqual(refreshed[0]['youtubeId'], 'shared')
+        self.assertFalse(os.path.exists(youtube_service.CACHE_FILE + '.lock'))
+
+    def test_locked_refresh_is_skipped(self):
+        """Test that only the worker holding the lock refreshes."""
+        self.write_cache(self.STALE, timedelta(hours=25))
+        self.assertTrue(youtube_service.acquire_refresh_lock())
+        self.assertFalse(youtube_service.acquire_refresh_lock())
+        try:
+            self.assertEqual(youtube_service.fetch_finance_videos(), self.STALE)
+            youtube_service._refresh_thread.join(5)
+            self.assertEqual(self.api.requests['search'], 0)
+        finally:
+            youtube_service.release_refresh_lock()
+
+    def test_abandoned_lock_is_taken_over(self):
+        """Test that a lock left by a dead worker does not block refreshes forever."""
+        lock_file = youtube_service.CACHE_FILE + '.lock'
+        with open(lock_file, 'w') as f:
+            f.write('12345')
+        old = time.time() - youtube_service.REFRESH_LOCK_TIMEOUT_SECONDS - 1
+        os.utime(lock_file, (old, old))
+
+        self.assertTrue(youtube_service.acquire_refresh_lock())
+        youtube_service.release_refresh_lock()
+
+    def test_forced_refresh_is_rate_limited(self):
+        """Test that forced refreshes are ignored while the cache is recent."""
+        self.write_cache(self.STALE, timedelta(seconds=10))
+        self.assertEqual(youtube_service.fetch_finance_videos(force_refresh=True), self.STALE)
+        self.assertEqual(self.api.requests['search'], 0)
+
+        self.write_cache(self.STALE, timedelta(hours=1))
+        videos = youtube_service.fetch_finance_videos(force_refresh=True)
+        self.assertEqual(videos[0]['youtubeId'], 'shared')
+        self.assertEqual(self.api.requests['search'], len(youtube_service.FINANCE_SEARCHES))
+
+
+class TestMemoryTier(YouTubeAPITestCase):
+    """Test the in-memory tier in front of the cache file."""
+
+    VIDEOS = [{'youtubeId': 'abc', 'title': 'Budgeting 101'}]
+
+    def test_hot_reads_skip_the_file(self):
+        """Test that the file is only parsed again after it changes."""
+        self.write_cache(self.VIDEOS, timedelta(hours=1))
+        videos, _ = youtube_service.read_cache()
+        self.assertEqual(videos, self.VIDEOS)
+
+        with mock.patch('youtube_service.json.load', side_effect=AssertionError('re-read')):
+            self.assertIs(youtube_service.read_cache()[0], videos)
+
+        # Another worker refreshes the file
+        self.write_cache([{'youtubeId': 'xyz', 'title': 'Investing'}], timedelta(minutes=1))
+        self.assertEqual(youtube_service.read_cache()[0][0]['youtubeId'], 'xyz')
+
+    def test_response_body_is_precomputed(self):
+        """Test that the cached list's response body is built once."""
+        self.write_cache(self.VIDEOS, timedelta(hours=1))
+        videos = youtube_service.fetch_finance_videos()
+
+        body = youtube_service.videos_response_body(videos)
+        self.assertIs(youtube_service.videos_response_body(videos), body)
+        self.assertEqual(json.loads(body), {'success': True, 'videos': self.VIDEOS, 'count': 1})
+
+        defaults = youtube_service.get_default_videos()
+        self.assertEqual(json.loads(youtube_service.videos_response_body(defaults))['count'],
+                         len(defaults))
+
+    def test_save_fills_memory_tier(self):
+        """Test that the refreshing worker does not re-read its own write."""
+        youtube_service.save_to_cache(self.VIDEOS)
+        with mock.patch('youtube_service.json.load', side_effect=AssertionError('re-read')):
+            self.assertEqual(youtube_service.get_cached_videos(), self.VIDEOS)
+
+
+class TestClassifyVideo(unittest.TestCase):
+    """Test the combined video classifier."""
+
+    def test_matches_individual_functions(self):
+        """Test that classify_video agrees with the three single-purpose functions."""
+        samples = [(v['title'], v['description']) for v in youtube_service.get_default_videos()]
+        samples += [('', ''), ('Advanced IRA strategy', 'Fire your advisor, buy rental property'),
+                    ('Savings 101', 'Save money with a side hustle and index funds')]
+        for title, description in samples:
+            self.assertEqual(youtube_service.classify_video(title, description),
+                             (youtube_service.categorize_video(title, description),
+                              youtube_service.determine_level(title, description),
+                              youtube_service.extract_topics(title, description)))
+
+    def test_rules(self):
+        """Test row order, substring matching and the topic limit."""
+        self.assertEqual(youtube_service.classify_video('Budgeting 101', 'Spending less'),
+                         ('budgeting', 'Beginner', ['Budgeting']))
+        self.assertEqual(youtube_service.classify_video('Advanced IRA strategy', ''),
+                         ('retirement', 'Advanced', ['Retirement']))
+        self.assertEqual(youtube_service.classify_video('Savings 101',
+                                                        'Save money with a side hustle and index funds'),
+                         ('investing', 'Beginner', ['Saving', 'Index Funds', 'Side Hustle']))
+        self.assertEqual(youtube_service.classify_video('Vlog', 'My week'),
+                         ('general', 'All Levels', ['Personal Finance']))
+
+
+class TestVideoIndex(unittest.TestCase):
+    """Test filtering, search and paging through the inverted indexes."""
+
+    def setUp(self):
+        """Index the default library."""
+        self.videos = youtube_service.get_default_videos()
+        self.index = youtube_service.VideoIndex(self.videos)
+
+    def ids(self, **kwargs):
+        page, _ = self.index.query(**kwargs)
+        return [v['id'] for v in page]
+
+    def test_filters_match_a_linear_scan(self):
+        """Test each filter against filtering the list directly."""
+        self.assertEqual(self.ids(category='investing'),
+                         [v['id'] for v in self.videos if v['category'] == 'investing'])
+        self.assertEqual(self.ids(level='all levels'),
+                         [v['id'] for v in self.videos if v['level'] == 'All Levels'])
+        self.assertEqual(self.ids(featured=True),
+                         [v['id'] for v in self.videos if v['featured']])
+        self.assertEqual(self.ids(category='debt', level='Beginner'), [3, 9])
+
+    def test_topic_matches_category_or_topic_text(self):
+        """Test topic filtering as the page's topic chips expect."""
+        self.assertEqual(self.ids(topic='retirement'), [7, 12])
+        self.assertEqual(self.ids(topic='debt'), [3, 8, 9])
+
+    def test_search_prefixes(self):
+        """Test that every search word must prefix-match."""
+        self.assertEqual(self.ids(q='Roth'), [7])
+        self.assertEqual(self.ids(q='invest begin'), [2, 11])
+        self.assertEqual(self.ids(q='budg'), [1, 4])
+        self.assertEqual(self.ids(q='nonexistent'), [])
+
+    def test_paging(self):
+        """Test limit and offset with the total count."""
+        page, total = self.index.query(limit=5, offset=10)
+        self.assertEqual([v['id'] for v in page], [11, 12])
+        self.assertEqual(total, 12)
+
+        page, total = self.index.query(category='investing', limit=2, offset=1)
+        self.assertEqual([v['id'] for v in page], [5, 10])
+        self.assertEqual(total, 4)
+
+        page, _ = self.index.query(limit=10000)
+        self.assertEqual(len(page), 12)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,222 @@
+"""
+Thumbnail Cache for Chengeta Resources
+Fetches each video's YouTube thumbnail once and keeps resized WebP
+variants in a bounded on-disk cache, served by /api/resources/thumb/<id>.
+"""
+
+import os
+import io
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from youtube_service import get_http_session
+
+THUMB_CACHE_DIR = "data/thumbnails"
+THUMB_SOURCE_URL = os.environ.get('YOUTUBE_THUMBNAIL_URL',
+                                  "https://i.ytimg.com/vi/{youtube_id}/mqdefault.jpg")
+THUMB_WIDTHS = (160, 320)  # Variants made from each source image (mqdefault is 320px wide)
+DEFAULT_THUMB_WIDTH = 320
+THUMB_QUALITY = 80  # WebP quality
+THUMB_CACHE_MAX_BYTES = int(os.environ.get('THUMB_CACHE_MAX_MB', 50)) * 1024 * 1024
+THUMB_FETCH_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+THUMB_FAILURE_TTL_SECONDS = 10 * 60  # Don't refetch a missing thumbnail before this
+THUMB_FAILURE_MAX_ENTRIES = 1024  # Recent failures remembered
+THUMB_TOUCH_SECONDS = 24 * 60 * 60  # Refresh a file's mtime (its LRU age) at most daily
+THUMB_MAX_AGE_SECONDS = 30 * 24 * 60 * 60  # Browser cache lifetime
+
+YOUTUBE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+
+def thumbnail_response(data, request):
+    """
+    Build the HTTP response for a thumbnail.
+
+    Args:
+        data (bytes): WebP image
+        request: Current Flask request, for If-None-Match
+
+    Returns:
+        Response: Long-lived, ETag-tagged image (304 when the browser's copy matches)
+    """
+    from flask import Response
+
+    response = Response(data, mimetype='image/webp')
+    response.set_etag(hashlib.sha1(data).hexdigest()[:20])
+    response.cache_control.private = True
+    response.cache_control.max_age = THUMB_MAX_AGE_SECONDS
+    return response.make_conditional(request)
+
+
+class ThumbnailCache:
+    """
+    Bounded on-disk cache of resized WebP thumbnails.
+
+    The source image is downloaded once per video and every width in
+    THUMB_WIDTHS is stored from it. Concurrent misses for the same video
+    wait for a single download. When the cache grows past max_bytes the
+    least recently used files (oldest mtime) are removed.
+
+    Args:
+        directory (str): Cache directory
+        max_bytes (int): Size limit for all cached files
+        source_url (str): Source image URL template with {youtube_id}
+    """
+
+    def __init__(self, directory=THUMB_CACHE_DIR, max_bytes=THUMB_CACHE_MAX_BYTES,
+                 source_url=THUMB_SOURCE_URL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.source_url = source_url
+        self.fetches = 0
+        self._size = None  # Bytes on disk, scanned on first store
+        self._failures = OrderedDict()  # youtube_id -> failure time, oldest first
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def path(self, youtube_id, width):
+        """File path of a thumbnail variant."""
+        return os.path.join(self.directory, f"{youtube_id}_{width}.webp")
+
+    @staticmethod
+    def choose_width(width):
+        """Smallest stored width that covers the requested one."""
+        if not width:
+            return DEFAULT_THUMB_WIDTH
+        for candidate in THUMB_WIDTHS:
+            if candidate >= width:
+                return candidate
+        return THUMB_WIDTHS[-1]
+
+    def get(self, youtube_id, width=None):
+        """
+        Return a thumbnail, fetching and resizing it on first use.
+
+        Args:
+            youtube_id (str): YouTube video id
+            width (int): Requested width in pixels (default DEFAULT_THUMB_WIDTH)
+
+        Returns:
+            bytes: WebP image, or None for an invalid id or an unavailable thumbnail
+        """
+        if not YOUTUBE_ID_PATTERN.match(youtube_id or ''):
+            return None
+        path = self.path(youtube_id, self.choose_width(width))
+
+        data = self._read(path)
+        if data is not None:
+            return data
+
+        with self._key_lock(youtube_id):
+            # Another thread may have stored it while we waited
+            data = self._read(path)
+            if data is not None:
+                return data
+            if time.time() - self._failures.get(youtube_id, 0) < THUMB_FAILURE_TTL_SECONDS:
+                return None
+            try:
+                self._store(youtube_id, self._download(youtube_id))
+            except Exception as e:
+                print(f"Thumbnail error for {youtube_id}: {e}")
+                self._record_failure(youtube_id)
+                return None
+            finally:
+                with self._lock:
+                    self._locks.pop(youtube_id, None)
+        return self._read(path)
+
+    def _key_lock(self, youtube_id):
+        with self._lock:
+            return self._locks.setdefault(youtube_id, threading.Lock())
+
+    def _record_failure(self, youtube_id):
+        """Remember a failed fetch, dropping expired and excess entries."""
+        now = time.time()
+        with self._lock:
+            self._failures.pop(youtube_id, None)
+            self._failures[youtube_id] = now
+            while self._failures:
+                oldest_id, failed_at = next(iter(self._failures.items()))
+                if (now - failed_at < THUMB_FAILURE_TTL_SECONDS and
+                        len(self._failures) <= THUMB_FAILURE_MAX_ENTRIES):
+                    break
+                del self._failures[oldest_id]
+
+    def _read(self, path):
+        """Read a cached file, marking it recently used."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if time.time() - os.path.getmtime(path) > THUMB_TOUCH_SECONDS:
+                os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _download(self, youtube_id):
+        """Download the source image."""
+        self.fetches += 1
+        response = get_http_session().get(self.source_url.format(youtube_id=youtube_id),
+                                          timeout=THUMB_FETCH_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+
+    def _store(self, youtube_id, source):
+        """Write every width as WebP, then enforce the size limit."""
+        from PIL import Image
+
+        os.makedirs(self.directory, exist_ok=True)
+        with Image.open(io.BytesIO(source)) as image:
+            image = image.convert('RGB')
+            written = 0
+            for width in THUMB_WIDTHS:
+                variant = image
+                if image.width > width:
+                    height = max(1, round(image.height * width / image.width))
+                    variant = image.resize((width, height), Image.LANCZOS)
+                buffer = io.BytesIO()
+                variant.save(buffer, 'WEBP', quality=THUMB_QUALITY, method=4)
+
+                path = self.path(youtube_id, width)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(buffer.getvalue())
+                os.replace(tmp_path, path)
+                written += buffer.tell()
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()[0]
+            else:
+                self._size += written
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _disk_usage(self):
+        """Return (total bytes, [(mtime, size, path), ...]) of cached files."""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.webp'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return sum(size for _, size, _ in files), files
+
+    def _evict(self):
+        """Remove least recently used files until the cache is at 90% of its limit."""
+        total, files = self._disk_usage()
+        files.sort()
+        target = self.max_bytes * 0.9
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+
+thumbnail_cache = ThumbnailCache()
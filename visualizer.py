@@ -3,80 +3,593 @@ Finance Tracker - Visualization Module
 Generate charts and graphs for financial data visualization.
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import defaultdict
+import json
 import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Time-series charts with more points than this are aggregated into
+# weekly, monthly or yearly buckets before plotting
+MAX_TIME_SERIES_POINTS = 120
+
+# Cumulative balance lines are downsampled (LTTB) to at most this many points
+MAX_BALANCE_POINTS = 400
+
+# Markers are only drawn when a line has few enough points to read them
+MAX_MARKER_POINTS = 60
+
+# Resolution of saved chart images
+CHART_DPI = 300
+
+BUCKET_LABELS = {
+    'day': 'Daily',
+    'week': 'Weekly',
+    'month': 'Monthly',
+    'year': 'Yearly'
+}
+
+
+def _bucket_start(date, granularity):
+    """Return the first day of the bucket that contains date."""
+    if granularity == 'week':
+        return date - timedelta(days=date.weekday())
+    if granularity == 'month':
+        return date.replace(day=1)
+    if granularity == 'year':
+        return date.replace(month=1, day=1)
+    return date
+
+
+def aggregate_time_series(daily_data, max_points=MAX_TIME_SERIES_POINTS):
+    """
+    Aggregate daily income/expense totals into coarser buckets if needed.
+    
+    Tries daily, weekly, monthly and yearly buckets in that order and
+    returns the first one that fits within max_points.
+    
+    Args:
+        daily_data (dict): Maps 'YYYY-MM-DD' to {'income': x, 'expense': y}
+        max_points (int): Maximum number of points to plot
+        
+    Returns:
+        tuple: (granularity, dates, incomes, expenses)
+    """
+    days = {datetime.strptime(d, '%Y-%m-%d'): v for d, v in daily_data.items()}
+    
+    for granularity in ('day', 'week', 'month', 'year'):
+        buckets = defaultdict(lambda: {'income': 0, 'expense': 0})
+        for date, amounts in days.items():
+            bucket = buckets[_bucket_start(date, granularity)]
+            bucket['income'] += amounts['income']
+            bucket['expense'] += amounts['expense']
+        if len(buckets) <= max_points or granularity == 'year':
+            break
+    
+    dates = sorted(buckets.keys())
+    incomes = [buckets[d]['income'] for d in dates]
+    expenses = [buckets[d]['expense'] for d in dates]
+    return granularity, dates, incomes, expenses
+
+
+def lttb_indices(xs, ys, threshold):
+    """
+    Select point indices with the Largest-Triangle-Three-Buckets algorithm.
+    
+    Keeps the first and last points and, for every bucket in between, the
+    point forming the largest triangle with its neighbours, which preserves
+    the visual shape of the line (peaks and dips) with far fewer points.
+    
+    Args:
+        xs (list): Numeric x values in ascending order
+        ys (list): Numeric y values
+        threshold (int): Maximum number of points to keep
+        
+    Returns:
+        list: Indices of the points to keep
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    
+    indices = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    
+    for i in range(threshold - 2):
+        # Average point of the next bucket
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+        
+        # Pick the point in this bucket with the largest triangle area
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        max_area = -1
+        chosen = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        
+        indices.append(chosen)
+        a = chosen
+    
+    indices.append(n - 1)
+    return indices
+
+
+class ChartDataset:
+    """
+    Every series the charts need, computed in a single pass over the data.
+    
+    Attributes:
+        total_income (float): Sum of all income
+        total_expenses (float): Sum of all expenses
+        balance (float): total_income - total_expenses
+        transaction_count (int): Number of transactions
+        categories (dict): Maps category to {'income': x, 'expense': y}
+        daily (dict): Maps 'YYYY-MM-DD' to {'income': x, 'expense': y}
+        balance_dates (list): Transaction datetimes in chronological order
+        balances (list): Running balance after each of those transactions
+        budget_statuses (list): Budget status dicts, as get_all_budget_statuses
+    """
+    
+    def __init__(self):
+        self.total_income = 0
+        self.total_expenses = 0
+        self.balance = 0
+        self.transaction_count = 0
+        self.categories = {}
+        self.daily = {}
+        self.balance_dates = []
+        self.balances = []
+        self.budget_statuses = []
+    
+    @classmethod
+    def from_tracker(cls, tracker):
+        """
+        Build a dataset by walking the tracker's transactions once.
+        
+        Args:
+            tracker: FinanceTracker instance
+            
+        Returns:
+            ChartDataset: Precomputed chart data
+        """
+        dataset = cls()
+        expenses_by_category = defaultdict(float)  # Lower-cased, for budgets
+        changes = []
+        
+        for t in tracker.get_all_transactions():
+            amount = t['amount']
+            category = t['category']
+            kind = 'income' if t['type'] == 'income' else 'expense'
+            
+            if category not in dataset.categories:
+                dataset.categories[category] = {'income': 0, 'expense': 0}
+            dataset.categories[category][kind] += amount
+            
+            date = t['date'].split()[0]
+            if date not in dataset.daily:
+                dataset.daily[date] = {'income': 0, 'expense': 0}
+            dataset.daily[date][kind] += amount
+            
+            if kind == 'income':
+                dataset.total_income += amount
+                changes.append((t['date'], amount))
+            else:
+                if t['type'] == 'expense':
+                    dataset.total_expenses += amount
+                    expenses_by_category[category.lower()] += amount
+                changes.append((t['date'], -amount))
+            dataset.transaction_count += 1
+        
+        dataset.balance = dataset.total_income - dataset.total_expenses
+        
+        # Running balance in chronological order
+        current_balance = 0
+        for date, change in sorted(changes, key=lambda x: x[0]):
+            current_balance += change
+            dataset.balance_dates.append(datetime.strptime(date, '%Y-%m-%d %H:%M:%S'))
+            dataset.balances.append(current_balance)
+        
+        for category in tracker.get_all_budgets():
+            spent = expenses_by_category.get(category.lower(), 0)
+            dataset.budget_statuses.append(tracker.make_budget_status(category, spent))
+        
+        return dataset
+
+class FigureTemplate:
+    """
+    A pre-styled Figure/Axes pair that is reused across renders of one chart.
+    
+    Static styling (size, title, axis labels, grid, date formatting) is
+    applied once when the template is built. Each render updates the
+    persistent artists with new data and replaces the per-render ones
+    registered with track(). Figures are created through the object-oriented
+    API rather than pyplot, and renders of the same template are serialised
+    by its lock, so charts can be rendered from several threads at once.
+    """
+    
+    def __init__(self, figsize, title, xlabel=None, ylabel=None, grid_axis='both',
+                 date_axis=False):
+        """
+        Build the figure and apply its static styling.
+        
+        Args:
+            figsize (tuple): Figure size in inches
+            title (str): Chart title
+            xlabel (str): X-axis label
+            ylabel (str): Y-axis label
+            grid_axis (str): 'both', 'x', 'y' or None for no grid
+            date_axis (bool): Whether the x-axis shows dates
+        """
+        # Imported here so that importing this module stays cheap
+        from matplotlib.figure import Figure
+        import matplotlib.dates as mdates
+        
+        self.figure = Figure(figsize=figsize, layout='tight')
+        self.ax = self.figure.add_subplot()
+        self.title = self.ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        if xlabel:
+            self.ax.set_xlabel(xlabel, fontsize=12)
+        if ylabel:
+            self.ax.set_ylabel(ylabel, fontsize=12)
+        if grid_axis:
+            self.ax.grid(True, axis=grid_axis, alpha=0.3, linestyle='--')
+        if date_axis:
+            self.ax.xaxis_date()
+            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        
+        self.lock = threading.Lock()
+        self._artists = []
+    
+    def track(self, *artists):
+        """Register artists to be removed at the start of the next render."""
+        self._artists.extend(artists)
+    
+    def reset(self):
+        """Remove the artists drawn by the previous render."""
+        for artist in self._artists:
+            artist.remove()
+        self._artists = []
+    
+    def rescale(self):
+        """Recompute the data limits after artists were updated."""
+        self.ax.relim()
+        self.ax.autoscale_view()
+    
+    def output(self, filename, save, show):
+        """Save and/or display the current render."""
+        if save:
+            self.figure.savefig(filename, dpi=CHART_DPI, bbox_inches='tight')
+        if show:
+            _show_figure(self.figure)
+
+
+def _show_figure(figure):
+    """
+    Display a rendered figure in an interactive pyplot window.
+    
+    Templates are shared and redrawn, so the window shows an image of the
+    current render rather than the template figure itself.
+    """
+    import io
+    import matplotlib.pyplot as plt
+    import matplotlib.image as mpimg
+    
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', bbox_inches='tight')
+    buffer.seek(0)
+    
+    window = plt.figure(figsize=figure.get_size_inches())
+    window.add_axes([0, 0, 1, 1]).imshow(mpimg.imread(buffer))
+    window.axes[0].axis('off')
+    plt.show()
+    plt.close(window)
+
+
+def _build_income_vs_expenses():
+    template = FigureTemplate((10, 6), 'Income vs Expenses', ylabel='Amount ($)',
+                              grid_axis='y')
+    ax = template.ax
+    template.bars = ax.bar(['Income', 'Expenses'], [0, 0], color=['#2ecc71', '#e74c3c'],
+                           alpha=0.8, edgecolor='black')
+    template.labels = [
+        ax.text(bar.get_x() + bar.get_width()/2., 0, '', ha='center', va='bottom',
+                fontsize=12, fontweight='bold')
+        for bar in template.bars
+    ]
+    ax.axhline(y=0, color='black', linestyle='-', linewidth=0.5)
+    return template
+
+
+def _build_category_breakdown(transaction_type):
+    title = f'{transaction_type.capitalize()} Breakdown by Category'
+    return FigureTemplate((12, 8), title, grid_axis=None)
+
+
+def _build_spending_over_time():
+    template = FigureTemplate((14, 7), 'Income and Expenses Over Time', xlabel='Date',
+                              ylabel='Amount ($)', date_axis=True)
+    ax = template.ax
+    template.income_line, = ax.plot([], [], linewidth=2, label='Income', color='#2ecc71',
+                                    markersize=6)
+    template.expense_line, = ax.plot([], [], linewidth=2, label='Expenses', color='#e74c3c',
+                                     markersize=6)
+    ax.legend(fontsize=11, loc='best')
+    return template
+
+
+def _build_budget_progress():
+    return FigureTemplate((12, 7), 'Budget Progress by Category', xlabel='Category',
+                          ylabel='Amount ($)', grid_axis='y')
+
+
+def _build_cumulative_balance():
+    template = FigureTemplate((14, 7), 'Cumulative Balance Over Time', xlabel='Date',
+                              ylabel='Balance ($)', date_axis=True)
+    ax = template.ax
+    template.line, = ax.plot([], [], linewidth=2.5, color='#3498db', markersize=5,
+                             markerfacecolor='white', markeredgewidth=2)
+    ax.axhline(y=0, color='red', linestyle='--', linewidth=1, alpha=0.7)
+    return template
+
+
+# Builders for each chart's template, keyed by chart name
+TEMPLATE_BUILDERS = {
+    'income_vs_expenses': _build_income_vs_expenses,
+    'expense_breakdown': lambda: _build_category_breakdown('expense'),
+    'income_breakdown': lambda: _build_category_breakdown('income'),
+    'spending_over_time': _build_spending_over_time,
+    'budget_progress': _build_budget_progress,
+    'cumulative_balance': _build_cumulative_balance
+}
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(name):
+    """Return the cached template for a chart, building it on first use."""
+    with _templates_lock:
+        if name not in _templates:
+            _templates[name] = TEMPLATE_BUILDERS[name]()
+        return _templates[name]
+
+
+# Kinds of tracker data each chart is drawn from (see FinanceTracker.add_listener)
+CHART_DEPENDENCIES = {
+    'income_vs_expenses': {'income', 'expense'},
+    'expense_breakdown': {'expense'},
+    'income_breakdown': {'income'},
+    'spending_over_time': {'income', 'expense'},
+    'budget_progress': {'budgets', 'expense'},
+    'cumulative_balance': {'income', 'expense'}
+}
+
+# Per-directory record of data versions and the versions each chart was drawn at
+CHART_STATE_FILE = 'chart_state.json'
+
+# A state lock file older than this was left by a dead process and is taken over
+CHART_STATE_LOCK_TIMEOUT_SECONDS = 10
+
+_state_lock = threading.Lock()
+
+
+@contextmanager
+def _locked_chart_state(output_dir):
+    """
+    Hold the chart state lock for a read-modify-write of the state file.
+    
+    Web workers are separate processes, so besides the thread lock this
+    takes a lock file next to the state file (created with O_EXCL),
+    waiting for other processes to release it.
+    """
+    lock_file = os.path.join(output_dir, f'{CHART_STATE_FILE}.lock')
+    with _state_lock:
+        while True:
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    age = time.time() - os.path.getmtime(lock_file)
+                except OSError:
+                    continue  # Released in the meantime
+                if age >= CHART_STATE_LOCK_TIMEOUT_SECONDS:
+                    print("Taking over abandoned chart state lock")
+                    try:
+                        os.remove(lock_file)
+                    except OSError:
+                        pass
+                    continue
+                time.sleep(0.005)
+        try:
+            os.close(fd)
+            yield
+        finally:
+            try:
+                os.remove(lock_file)
+            except OSError:
+                pass
+
+
+def _load_chart_state(output_dir):
+    """Load the chart state file, or an empty state if there is none."""
+    try:
+        with open(os.path.join(output_dir, CHART_STATE_FILE), 'r') as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        state = {}
+    state.setdefault('versions', {})
+    state.setdefault('charts', {})
+    return state
+
+
+def _save_chart_state(output_dir, state):
+    """Write the chart state atomically so other workers never read a partial file."""
+    path = os.path.join(output_dir, CHART_STATE_FILE)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _dependency_versions(state, name):
+    """Current versions of the data kinds a chart depends on."""
+    return {kind: state['versions'].get(kind, 0) for kind in CHART_DEPENDENCIES[name]}
+
+
+def mark_charts_stale(output_dir, kinds):
+    """
+    Record that some kinds of data changed, making dependent charts stale.
+    
+    Each kind has a version counter in the output directory's state file.
+    A chart is stale when any of its dependencies has moved past the
+    version it was last drawn at, so the mark survives across processes
+    (e.g. a change in one web worker and regeneration in another).
+    
+    Args:
+        output_dir (str): Chart output directory
+        kinds (set): Changed kinds ('income', 'expense', 'budgets')
+        
+    Returns:
+        list: Names of the charts affected by the change
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with _locked_chart_state(output_dir):
+        state = _load_chart_state(output_dir)
+        for kind in kinds:
+            state['versions'][kind] = state['versions'].get(kind, 0) + 1
+        _save_chart_state(output_dir, state)
+    
+    return [name for name, deps in CHART_DEPENDENCIES.items() if deps & set(kinds)]
+
+
+def load_data_versions(output_dir):
+    """
+    Get the current data versions recorded for a chart directory.
+    
+    Take this before loading the tracker data the charts will be drawn
+    from, and pass it to FinanceVisualizer: a change made by another
+    process after this point is then still treated as not drawn.
+    
+    Returns:
+        dict: Version counter per data kind
+    """
+    return _load_chart_state(output_dir)['versions']
 
 
 class FinanceVisualizer:
     """Class for generating financial data visualizations."""
     
-    def __init__(self, tracker):
+    def __init__(self, tracker, output_dir='data/charts', data_versions=None):
         """
         Initialize visualizer with a tracker instance.
         
+        Changes made through the tracker afterwards mark the affected
+        charts stale (see generate_stale_charts).
+        
         Args:
             tracker: FinanceTracker instance
+            output_dir (str): Directory the charts are saved to
+            data_versions (dict): load_data_versions() taken before the
+                tracker's data was loaded (defaults to the versions now)
         """
         self.tracker = tracker
-        self.output_dir = 'data/charts'
+        self.output_dir = output_dir
         self._ensure_output_directory()
+        if data_versions is None:
+            data_versions = load_data_versions(output_dir)
+        # Versions of the data in this tracker, recorded for the charts it draws
+        self.data_versions = dict(data_versions)
+        tracker.add_listener(self.mark_stale)
     
     def _ensure_output_directory(self):
         """Create output directory for charts if it doesn't exist."""
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
     
-    def plot_income_vs_expenses(self, save=True, show=False):
+    def mark_stale(self, kinds):
+        """Mark the charts depending on the given data kinds as stale."""
+        # This tracker holds the change, so its data moves one version on.
+        # A concurrent change elsewhere moves the file further and keeps
+        # the charts stale.
+        for kind in kinds:
+            self.data_versions[kind] = self.data_versions.get(kind, 0) + 1
+        return mark_charts_stale(self.output_dir, kinds)
+    
+    def get_stale_charts(self):
+        """
+        Get the charts that need to be redrawn.
+        
+        Returns:
+            list: Names of charts never drawn or drawn from outdated data
+        """
+        state = _load_chart_state(self.output_dir)
+        stale = []
+        for name in CHART_DEPENDENCIES:
+            chart = state['charts'].get(name)
+            if chart is None or chart['versions'] != _dependency_versions(state, name):
+                stale.append(name)
+            elif chart['file'] and not os.path.exists(chart['file']):
+                stale.append(name)
+        return stale
+    
+    def get_current_charts(self):
+        """
+        Get the up-to-date charts that have been drawn.
+        
+        Returns:
+            dict: Dictionary of chart names and their file paths
+        """
+        state = _load_chart_state(self.output_dir)
+        stale = set(self.get_stale_charts())
+        return {
+            name: chart['file'] for name, chart in state['charts'].items()
+            if name not in stale and chart['file']
+        }
+    
+    def plot_income_vs_expenses(self, save=True, show=False, dataset=None):
         """
         Create a bar chart comparing total income vs expenses.
         
         Args:
             save (bool): Whether to save the chart to file
             show (bool): Whether to display the chart
+            dataset (ChartDataset): Precomputed data (built if not given)
             
         Returns:
             str: Path to saved chart file
         """
-        summary = self.tracker.get_summary()
-        
-        categories = ['Income', 'Expenses']
-        amounts = [summary['total_income'], summary['total_expenses']]
-        colors = ['#2ecc71', '#e74c3c']
-        
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(categories, amounts, color=colors, alpha=0.8, edgecolor='black')
-        
-        # Add value labels on bars
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'${height:,.2f}',
-                    ha='center', va='bottom', fontsize=12, fontweight='bold')
-        
-        plt.title('Income vs Expenses', fontsize=16, fontweight='bold', pad=20)
-        plt.ylabel('Amount ($)', fontsize=12)
-        plt.grid(axis='y', alpha=0.3, linestyle='--')
-        
-        # Add balance line
-        balance = summary['balance']
-        balance_color = 'green' if balance >= 0 else 'red'
-        plt.axhline(y=0, color='black', linestyle='-', linewidth=0.5)
-        
-        plt.tight_layout()
-        
+        dataset = dataset or ChartDataset.from_tracker(self.tracker)
+        amounts = [dataset.total_income, dataset.total_expenses]
         filename = os.path.join(self.output_dir, 'income_vs_expenses.png')
-        if save:
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
-        if show:
-            plt.show()
-        plt.close()
+        
+        template = get_template('income_vs_expenses')
+        with template.lock:
+            # Update bar heights and value labels in place
+            for bar, label, amount in zip(template.bars, template.labels, amounts):
+                bar.set_height(amount)
+                label.set_y(amount)
+                label.set_text(f'${amount:,.2f}')
+            
+            template.rescale()
+            template.output(filename, save, show)
         
         return filename
     
-    def plot_category_breakdown(self, transaction_type='expense', save=True, show=False):
+    def plot_category_breakdown(self, transaction_type='expense', save=True, show=False,
+                                dataset=None):
         """
         Create a pie chart showing breakdown by category.
         
@@ -84,11 +597,13 @@ class FinanceVisualizer:
             transaction_type (str): 'income' or 'expense'
             save (bool): Whether to save the chart to file
             show (bool): Whether to display the chart
+            dataset (ChartDataset): Precomputed data (built if not given)
             
         Returns:
             str: Path to saved chart file
         """
-        categories = self.tracker.get_category_summary()
+        dataset = dataset or ChartDataset.from_tracker(self.tracker)
+        categories = dataset.categories
         
         # Filter by transaction type
         data = {}
@@ -105,122 +620,99 @@ class FinanceVisualizer:
         
         # Sort by amount
         sorted_data = dict(sorted(data.items(), key=lambda x: x[1], reverse=True))
+        filename = os.path.join(self.output_dir, f'{transaction_type}_breakdown.png')
         
-        plt.figure(figsize=(12, 8))
-        
-        # Create pie chart
-        colors = plt.cm.Set3(range(len(sorted_data)))
-        wedges, texts, autotexts = plt.pie(
-            sorted_data.values(),
-            labels=sorted_data.keys(),
-            autopct='%1.1f%%',
-            colors=colors,
-            startangle=90,
-            pctdistance=0.85
-        )
-        
-        # Enhance text
-        for text in texts:
-            text.set_fontsize(10)
-            text.set_fontweight('bold')
-        
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-            autotext.set_fontsize(9)
-        
-        title = f'{transaction_type.capitalize()} Breakdown by Category'
-        plt.title(title, fontsize=16, fontweight='bold', pad=20)
-        
-        # Add legend with amounts
-        legend_labels = [f'{cat}: ${amt:,.2f}' for cat, amt in sorted_data.items()]
-        plt.legend(legend_labels, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1))
-        
-        plt.tight_layout()
+        from matplotlib import colormaps
         
-        filename = os.path.join(self.output_dir, f'{transaction_type}_breakdown.png')
-        if save:
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
-        if show:
-            plt.show()
-        plt.close()
+        template = get_template(f'{transaction_type}_breakdown')
+        with template.lock:
+            template.reset()
+            ax = template.ax
+            
+            # Create pie chart
+            colors = colormaps['Set3'](range(len(sorted_data)))
+            wedges, texts, autotexts = ax.pie(
+                sorted_data.values(),
+                labels=sorted_data.keys(),
+                autopct='%1.1f%%',
+                colors=colors,
+                startangle=90,
+                pctdistance=0.85
+            )
+            
+            # Enhance text
+            for text in texts:
+                text.set_fontsize(10)
+                text.set_fontweight('bold')
+            
+            for autotext in autotexts:
+                autotext.set_color('white')
+                autotext.set_fontweight('bold')
+                autotext.set_fontsize(9)
+            
+            # Add legend with amounts
+            legend_labels = [f'{cat}: ${amt:,.2f}' for cat, amt in sorted_data.items()]
+            legend = ax.legend(legend_labels, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1))
+            
+            template.track(*wedges, *texts, *autotexts, legend)
+            template.output(filename, save, show)
         
         return filename
     
-    def plot_spending_over_time(self, save=True, show=False):
+    def plot_spending_over_time(self, save=True, show=False, dataset=None):
         """
         Create a line chart showing spending over time.
         
         Args:
             save (bool): Whether to save the chart to file
             show (bool): Whether to display the chart
+            dataset (ChartDataset): Precomputed data (built if not given)
             
         Returns:
             str: Path to saved chart file
         """
-        transactions = self.tracker.get_all_transactions()
+        dataset = dataset or ChartDataset.from_tracker(self.tracker)
         
-        if not transactions:
+        if not dataset.daily:
             return None
         
-        # Group transactions by date
-        daily_data = defaultdict(lambda: {'income': 0, 'expense': 0})
-        
-        for t in transactions:
-            date = t['date'].split()[0]  # Get date part
-            if t['type'] == 'income':
-                daily_data[date]['income'] += t['amount']
-            else:
-                daily_data[date]['expense'] += t['amount']
-        
-        # Sort by date
-        sorted_dates = sorted(daily_data.keys())
-        dates = [datetime.strptime(d, '%Y-%m-%d') for d in sorted_dates]
-        incomes = [daily_data[d]['income'] for d in sorted_dates]
-        expenses = [daily_data[d]['expense'] for d in sorted_dates]
-        
-        plt.figure(figsize=(14, 7))
-        
-        # Plot lines
-        plt.plot(dates, incomes, marker='o', linewidth=2, label='Income', 
-                color='#2ecc71', markersize=6)
-        plt.plot(dates, expenses, marker='s', linewidth=2, label='Expenses', 
-                color='#e74c3c', markersize=6)
-        
-        # Formatting
-        plt.title('Income and Expenses Over Time', fontsize=16, fontweight='bold', pad=20)
-        plt.xlabel('Date', fontsize=12)
-        plt.ylabel('Amount ($)', fontsize=12)
-        plt.legend(fontsize=11, loc='best')
-        plt.grid(True, alpha=0.3, linestyle='--')
-        
-        # Format x-axis dates
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        plt.gcf().autofmt_xdate()
-        
-        plt.tight_layout()
+        # Aggregate into weekly/monthly buckets for long histories
+        granularity, dates, incomes, expenses = aggregate_time_series(dataset.daily)
+        show_markers = len(dates) <= MAX_MARKER_POINTS
         
+        title = 'Income and Expenses Over Time'
+        if granularity != 'day':
+            title += f' ({BUCKET_LABELS[granularity]} Totals)'
         filename = os.path.join(self.output_dir, 'spending_over_time.png')
-        if save:
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
-        if show:
-            plt.show()
-        plt.close()
+        
+        template = get_template('spending_over_time')
+        with template.lock:
+            template.title.set_text(title)
+            template.income_line.set_data(dates, incomes)
+            template.income_line.set_marker('o' if show_markers else '')
+            template.expense_line.set_data(dates, expenses)
+            template.expense_line.set_marker('s' if show_markers else '')
+            
+            template.rescale()
+            template.figure.autofmt_xdate()
+            template.output(filename, save, show)
         
         return filename
     
-    def plot_budget_progress(self, save=True, show=False):
+    def plot_budget_progress(self, save=True, show=False, dataset=None):
         """
         Create a bar chart showing budget progress for all categories.
         
         Args:
             save (bool): Whether to save the chart to file
             show (bool): Whether to display the chart
+            dataset (ChartDataset): Precomputed data (built if not given)
             
         Returns:
             str: Path to saved chart file
         """
-        statuses = self.tracker.get_all_budget_statuses()
+        dataset = dataset or ChartDataset.from_tracker(self.tracker)
+        statuses = dataset.budget_statuses
         
         if not statuses:
             return None
@@ -231,107 +723,149 @@ class FinanceVisualizer:
         
         x = range(len(categories))
         width = 0.35
-        
-        plt.figure(figsize=(12, 7))
-        
-        bars1 = plt.bar([i - width/2 for i in x], budgets, width, 
-                       label='Budget', color='#3498db', alpha=0.8, edgecolor='black')
-        bars2 = plt.bar([i + width/2 for i in x], spent, width, 
-                       label='Spent', color='#e74c3c', alpha=0.8, edgecolor='black')
-        
-        # Add value labels
-        for bar in bars1:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'${height:,.0f}',
-                    ha='center', va='bottom', fontsize=9)
-        
-        for bar in bars2:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'${height:,.0f}',
-                    ha='center', va='bottom', fontsize=9)
-        
-        plt.xlabel('Category', fontsize=12)
-        plt.ylabel('Amount ($)', fontsize=12)
-        plt.title('Budget Progress by Category', fontsize=16, fontweight='bold', pad=20)
-        plt.xticks(x, categories, rotation=45, ha='right')
-        plt.legend(fontsize=11)
-        plt.grid(axis='y', alpha=0.3, linestyle='--')
-        
-        plt.tight_layout()
-        
         filename = os.path.join(self.output_dir, 'budget_progress.png')
-        if save:
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
-        if show:
-            plt.show()
-        plt.close()
+        
+        template = get_template('budget_progress')
+        with template.lock:
+            template.reset()
+            ax = template.ax
+            
+            bars1 = ax.bar([i - width/2 for i in x], budgets, width, 
+                           label='Budget', color='#3498db', alpha=0.8, edgecolor='black')
+            bars2 = ax.bar([i + width/2 for i in x], spent, width, 
+                           label='Spent', color='#e74c3c', alpha=0.8, edgecolor='black')
+            template.track(bars1, bars2)
+            
+            # Add value labels
+            for bar in list(bars1) + list(bars2):
+                height = bar.get_height()
+                template.track(ax.text(bar.get_x() + bar.get_width()/2., height,
+                                       f'${height:,.0f}',
+                                       ha='center', va='bottom', fontsize=9))
+            
+            ax.set_xticks(x, categories, rotation=45, ha='right')
+            template.track(ax.legend(fontsize=11))
+            
+            template.rescale()
+            template.output(filename, save, show)
         
         return filename
     
-    def plot_cumulative_balance(self, save=True, show=False):
+    def plot_cumulative_balance(self, save=True, show=False, dataset=None):
         """
         Create a line chart showing cumulative balance over time.
         
         Args:
             save (bool): Whether to save the chart to file
             show (bool): Whether to display the chart
+            dataset (ChartDataset): Precomputed data (built if not given)
             
         Returns:
             str: Path to saved chart file
         """
-        transactions = sorted(self.tracker.get_all_transactions(), 
-                             key=lambda x: x['date'])
+        dataset = dataset or ChartDataset.from_tracker(self.tracker)
         
-        if not transactions:
+        if not dataset.balances:
             return None
         
-        dates = []
-        balances = []
-        current_balance = 0
-        
-        for t in transactions:
-            date = datetime.strptime(t['date'], '%Y-%m-%d %H:%M:%S')
-            if t['type'] == 'income':
-                current_balance += t['amount']
-            else:
-                current_balance -= t['amount']
-            
-            dates.append(date)
-            balances.append(current_balance)
-        
-        plt.figure(figsize=(14, 7))
-        
-        # Plot line
-        plt.plot(dates, balances, linewidth=2.5, color='#3498db', marker='o', 
-                markersize=5, markerfacecolor='white', markeredgewidth=2)
-        
-        # Fill area
-        plt.fill_between(dates, balances, alpha=0.3, color='#3498db')
+        dates = dataset.balance_dates
+        balances = dataset.balances
         
-        # Add zero line
-        plt.axhline(y=0, color='red', linestyle='--', linewidth=1, alpha=0.7)
-        
-        plt.title('Cumulative Balance Over Time', fontsize=16, fontweight='bold', pad=20)
-        plt.xlabel('Date', fontsize=12)
-        plt.ylabel('Balance ($)', fontsize=12)
-        plt.grid(True, alpha=0.3, linestyle='--')
+        # Downsample long histories while keeping peaks and dips
+        if len(dates) > MAX_BALANCE_POINTS:
+            xs = [d.timestamp() for d in dates]
+            keep = lttb_indices(xs, balances, MAX_BALANCE_POINTS)
+            dates = [dates[i] for i in keep]
+            balances = [balances[i] for i in keep]
+        show_markers = len(dates) <= MAX_MARKER_POINTS
+        filename = os.path.join(self.output_dir, 'cumulative_balance.png')
         
-        # Format x-axis dates
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        plt.gcf().autofmt_xdate()
+        template = get_template('cumulative_balance')
+        with template.lock:
+            template.reset()
+            template.line.set_data(dates, balances)
+            template.line.set_marker('o' if show_markers else '')
+            
+            # Fill area
+            template.track(template.ax.fill_between(dates, balances, alpha=0.3,
+                                                    color='#3498db'))
+            
+            template.rescale()
+            template.figure.autofmt_xdate()
+            template.output(filename, save, show)
         
-        plt.tight_layout()
+        return filename
+    
+    def _chart_renderers(self):
+        """Map chart names to their display label and render function."""
+        return {
+            'income_vs_expenses': ('Income vs Expenses',
+                                   lambda d: self.plot_income_vs_expenses(dataset=d)),
+            'expense_breakdown': ('Expense Breakdown',
+                                  lambda d: self.plot_category_breakdown('expense', dataset=d)),
+            'income_breakdown': ('Income Breakdown',
+                                 lambda d: self.plot_category_breakdown('income', dataset=d)),
+            'spending_over_time': ('Spending Over Time',
+                                   lambda d: self.plot_spending_over_time(dataset=d)),
+            'budget_progress': ('Budget Progress',
+                                lambda d: self.plot_budget_progress(dataset=d)),
+            'cumulative_balance': ('Cumulative Balance',
+                                   lambda d: self.plot_cumulative_balance(dataset=d))
+        }
+    
+    def generate_charts(self, names):
+        """
+        Render the given charts and record them as up to date.
         
-        filename = os.path.join(self.output_dir, 'cumulative_balance.png')
-        if save:
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
-        if show:
-            plt.show()
-        plt.close()
+        Args:
+            names (list): Chart names (keys of CHART_DEPENDENCIES)
+            
+        Returns:
+            dict: Dictionary of chart names and their file paths
+        """
+        renderers = self._chart_renderers()
+        snapshot = {'versions': self.data_versions}
+        
+        # Walk the transactions once and share the result across all charts
+        dataset = ChartDataset.from_tracker(self.tracker)
+        
+        rendered = {}
+        for name in names:
+            label, render = renderers[name]
+            filename = render(dataset)
+            rendered[name] = filename
+            if filename:
+                print(f"  [+] {label} chart saved")
+            else:
+                # No data for this chart any more; drop the outdated image
+                old_file = os.path.join(self.output_dir, f'{name}.png')
+                if os.path.exists(old_file):
+                    os.remove(old_file)
+        
+        # Record the data versions the charts were drawn at, re-reading the
+        # state so marks made while rendering are kept
+        with _locked_chart_state(self.output_dir):
+            state = _load_chart_state(self.output_dir)
+            for name, filename in rendered.items():
+                state['charts'][name] = {
+                    'file': filename,
+                    'versions': _dependency_versions(snapshot, name)
+                }
+            _save_chart_state(self.output_dir, state)
+        
+        return {name: filename for name, filename in rendered.items() if filename}
+    
+    def generate_stale_charts(self):
+        """
+        Regenerate only the charts affected by changes since they were drawn.
         
-        return filename
+        Returns:
+            dict: Dictionary of all current chart names and their file paths
+        """
+        stale = self.get_stale_charts()
+        if stale:
+            self.generate_charts(stale)
+        return self.get_current_charts()
     
     def generate_all_charts(self):
         """
@@ -340,48 +874,11 @@ class FinanceVisualizer:
         Returns:
             dict: Dictionary of chart names and their file paths
         """
-        charts = {}
-        
         print("Generating charts...")
         
-        # Income vs Expenses
-        filename = self.plot_income_vs_expenses()
-        if filename:
-            charts['income_vs_expenses'] = filename
-            print(f"  [+] Income vs Expenses chart saved")
-        
-        # Expense Breakdown
-        filename = self.plot_category_breakdown('expense')
-        if filename:
-            charts['expense_breakdown'] = filename
-            print(f"  [+] Expense Breakdown chart saved")
-        
-        # Income Breakdown
-        filename = self.plot_category_breakdown('income')
-        if filename:
-            charts['income_breakdown'] = filename
-            print(f"  [+] Income Breakdown chart saved")
-        
-        # Spending Over Time
-        filename = self.plot_spending_over_time()
-        if filename:
-            charts['spending_over_time'] = filename
-            print(f"  [+] Spending Over Time chart saved")
-        
-        # Budget Progress
-        filename = self.plot_budget_progress()
-        if filename:
-            charts['budget_progress'] = filename
-            print(f"  [+] Budget Progress chart saved")
-        
-        # Cumulative Balance
-        filename = self.plot_cumulative_balance()
-        if filename:
-            charts['cumulative_balance'] = filename
-            print(f"  [+] Cumulative Balance chart saved")
+        charts = self.generate_charts(list(CHART_DEPENDENCIES))
         
         print(f"\nTotal charts generated: {len(charts)}")
         print(f"Charts saved to: {self.output_dir}")
         
         return charts
-
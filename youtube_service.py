@@ -4,10 +4,19 @@ Automatically fetches finance education videos from YouTube.
 """
 
 import os
+import re
 import json
+import math
+import time
+from bisect import bisect_left
+import threading
 import requests
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from flask import current_app, has_app_context
+from models import db, Video
 
 # Get the directory where this file is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -18,16 +27,44 @@ load_dotenv(ENV_PATH)
 
 # YouTube Data API configuration
 YOUTUBE_API_KEY = os.environ.get('YOUTUBE_API_KEY')
-YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
+YOUTUBE_API_URL = os.environ.get('YOUTUBE_API_URL', "https://www.googleapis.com/youtube/v3")
+YOUTUBE_TIMEOUT = (3.05, float(os.environ.get('YOUTUBE_TIMEOUT', 10)))  # (connect, read) seconds
+SEARCH_WORKERS = int(os.environ.get('YOUTUBE_SEARCH_WORKERS', 10))  # Searches in flight at once
+DETAILS_BATCH_SIZE = 50  # Maximum ids per videos.list call
+
+# Paging for filtered video queries
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
 
 # Debug: Print API key status
 print(f"YouTube API Key loaded: {'Yes' if YOUTUBE_API_KEY else 'No'}")
 if YOUTUBE_API_KEY:
     print(f"API Key (first 10 chars): {YOUTUBE_API_KEY[:10]}...")
 
-# Cache file to store fetched videos (reduces API calls)
+# Cache file holding a snapshot of the Video table catalog (reduces API calls
+# and database reads); republished after every refresh
 CACHE_FILE = "data/youtube_cache.json"
-CACHE_DURATION_HOURS = 24  # Refresh cache every 24 hours
+CACHE_DURATION_HOURS = 6  # Refresh cache every 6 hours, a few searches at a time
+REFRESH_LOCK_TIMEOUT_SECONDS = 120  # Older refresh locks were abandoned by a dead worker
+REFRESH_RETRY_SECONDS = 5 * 60  # Wait after a failed background refresh
+DETAILS_MAX_AGE_HOURS = 7 * 24  # Refresh a video's duration, rating and views after this
+FEATURED_COUNT = 6  # Top results of the latest search shown as featured
+FORCE_REFRESH_MIN_INTERVAL_SECONDS = int(os.environ.get('YOUTUBE_FORCE_REFRESH_INTERVAL', 15 * 60))
+
+# Quota accounting (units per call from the YouTube Data API quota table)
+QUOTA_FILE = "data/youtube_quota.json"
+QUOTA_DAILY_BUDGET = int(os.environ.get('YOUTUBE_QUOTA_BUDGET', 1000))  # Of the default 10,000
+QUOTA_HISTORY_DAYS = 30
+SEARCH_COST_UNITS = 100  # search.list, whatever maxResults is
+VIDEOS_COST_UNITS = 1  # videos.list, up to DETAILS_BATCH_SIZE ids
+DETAILS_RESERVE_UNITS = 2  # Kept back from each refresh for videos.list calls
+SEARCH_MAX_RESULTS = 10  # Results are free up to 50, so fewer searches fetch as much
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')  # Quota resets at midnight Pacific
+except Exception:
+    QUOTA_TIMEZONE = timezone.utc
 
 # Finance-related search queries
 FINANCE_SEARCHES = [
@@ -57,41 +94,456 @@ TRUSTED_CHANNELS = {
     "UCKMtY6cfrgXjAPBKHhf-TrA": "Marko WhiteBoard Finance"
 }
 
+def _compile_keywords(table):
+    """Drop keywords that contain another keyword of the same row (they can never add a match)."""
+    return tuple(
+        (label, tuple(k for k in keywords
+                      if not any(other != k and other in k for other in keywords)))
+        for label, keywords in table
+    )
 
-def get_cached_videos():
-    """Load videos from cache if valid."""
+
+# Keyword tables for classifying videos; the first matching row wins for
+# category and level, topics keep up to MAX_TOPICS matching rows in order
+CATEGORY_KEYWORDS = _compile_keywords((
+    ('budgeting', ('budget', 'budgeting', '50/30/20', 'spending')),
+    ('investing', ('invest', 'stock', 'etf', 'index fund', 'portfolio')),
+    ('savings', ('save', 'saving', 'emergency fund', 'frugal')),
+    ('debt', ('debt', 'credit', 'loan', 'pay off', 'payoff')),
+    ('retirement', ('retire', '401k', 'ira', 'pension')),
+    ('mindset', ('mindset', 'wealth', 'rich', 'millionaire', 'financial freedom'))
+))
+
+LEVEL_KEYWORDS = _compile_keywords((
+    ('Beginner', ('beginner', 'basic', 'simple', 'easy', 'start', '101', 'introduction')),
+    ('Advanced', ('advanced', 'expert', 'complex', 'strategy'))
+))
+
+TOPIC_KEYWORDS = _compile_keywords((
+    ('Budgeting', ('budget', 'budgeting', 'spending plan')),
+    ('Investing', ('invest', 'investing', 'investment')),
+    ('Saving', ('save', 'saving', 'savings')),
+    ('Debt', ('debt', 'loan', 'credit card')),
+    ('Retirement', ('retire', 'retirement', '401k', 'ira')),
+    ('Credit Score', ('credit score', 'fico', 'credit report')),
+    ('Emergency Fund', ('emergency fund', 'rainy day')),
+    ('Index Funds', ('index fund', 's&p 500', 'vanguard')),
+    ('Stocks', ('stock', 'shares', 'equity')),
+    ('Real Estate', ('real estate', 'property', 'rental')),
+    ('Side Hustle', ('side hustle', 'extra income', 'gig')),
+    ('Passive Income', ('passive income', 'dividend')),
+    ('Frugal Living', ('frugal', 'minimalist', 'save money')),
+    ('Financial Freedom', ('financial freedom', 'fire', 'independence'))
+))
+
+MAX_TOPICS = 3
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Return the shared keep-alive session for YouTube API calls.
+    
+    The connection pool is sized for SEARCH_WORKERS concurrent requests so
+    parallel searches reuse connections instead of opening new ones.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SEARCH_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def _map_concurrently(fn, items):
+    """Apply fn to every item on up to SEARCH_WORKERS threads, keeping order."""
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(SEARCH_WORKERS, len(items)),
+                            thread_name_prefix='youtube') as pool:
+        return list(pool.map(fn, items))
+
+
+# Parsed cache file and its ready-to-send response body, keyed on the file's
+# (path, mtime, size) so it is only re-read after a refresh by any worker
+_memory_cache = None
+
+
+def _cache_file_key():
+    """Return the cache file's identity for the memory tier, or None if missing."""
+    try:
+        stat = os.stat(CACHE_FILE)
+    except OSError:
+        return None
+    return (CACHE_FILE, stat.st_mtime_ns, stat.st_size)
+
+
+def _remember_cache(key, videos, cached_time):
+    """Store parsed videos and their response body in the memory tier."""
+    global _memory_cache
+    _memory_cache = {
+        'key': key,
+        'videos': videos,
+        'timestamp': cached_time,
+        'body': _make_response_body(videos),
+        'index': VideoIndex(videos)
+    }
+
+
+def _make_response_body(videos):
+    """Serialize the /api/resources/videos response."""
+    return json.dumps({'success': True, 'videos': videos, 'count': len(videos)})
+
+
+def videos_response_body(videos):
+    """
+    Return the JSON body for a video list.
+    
+    The body of the cached list is precomputed, so serving it costs a
+    dict lookup; other lists (defaults) are serialized on the fly.
+    """
+    entry = _memory_cache
+    if entry is not None and entry['videos'] is videos:
+        return entry['body']
+    return _make_response_body(videos)
+
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class VideoIndex:
+    """
+    Inverted indexes over a video list for filtering, search and paging.
+    
+    Built once per cache load. Filters intersect sets of positions in the
+    list, and search terms match word prefixes through a sorted vocabulary,
+    so queries stay fast as the library grows.
+    
+    Args:
+        videos (list): Videos with 'category', 'level' and 'topics' as set by
+            categorize_video, determine_level and extract_topics
+    """
+    
+    def __init__(self, videos):
+        self.videos = videos
+        self.categories = {}
+        self.levels = {}
+        self.topics = {}
+        self.words = {}
+        self.featured = set()
+        
+        for position, video in enumerate(videos):
+            self._add(self.categories, video.get('category'), position)
+            self._add(self.levels, video.get('level'), position)
+            for topic in video.get('topics') or []:
+                self._add(self.topics, topic, position)
+            if video.get('featured'):
+                self.featured.add(position)
+            text = ' '.join([video.get('title', ''), video.get('channel', ''),
+                             video.get('description', '')] + list(video.get('topics') or []))
+            for word in WORD_PATTERN.findall(text.lower()):
+                self.words.setdefault(word, set()).add(position)
+        
+        self.vocabulary = sorted(self.words)
+    
+    @staticmethod
+    def _add(index, value, position):
+        if value:
+            index.setdefault(value.lower(), set()).add(position)
+    
+    def _match_topic(self, topic):
+        """Videos in the category, or with a topic containing the text (as the page's topic chips)."""
+        topic = topic.lower()
+        matches = set(self.categories.get(topic, ()))
+        for name, positions in self.topics.items():
+            if topic in name:
+                matches |= positions
+        return matches
+    
+    def _match_word(self, prefix):
+        """Videos with a word starting with prefix."""
+        matches = set()
+        i = bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            matches |= self.words[self.vocabulary[i]]
+            i += 1
+        return matches
+    
+    def query(self, category=None, level=None, topic=None, q=None, featured=None,
+              limit=DEFAULT_PAGE_SIZE, offset=0):
+        """
+        Filter, search and page the videos.
+        
+        Args:
+            category (str): Category, e.g. 'budgeting'
+            level (str): Level, e.g. 'Beginner'
+            topic (str): Category or part of a topic name
+            q (str): Search text; every word must prefix-match a word of the
+                title, channel, description or topics
+            featured (bool): Only featured videos
+            limit (int): Page size (capped at MAX_PAGE_SIZE)
+            offset (int): Videos to skip
+        
+        Returns:
+            tuple: (page of videos in library order, total matching videos)
+        """
+        candidates = []
+        if category:
+            candidates.append(self.categories.get(category.lower(), set()))
+        if level:
+            candidates.append(self.levels.get(level.lower(), set()))
+        if topic:
+            candidates.append(self._match_topic(topic))
+        if featured:
+            candidates.append(self.featured)
+        for word in WORD_PATTERN.findall((q or '').lower()):
+            candidates.append(self._match_word(word))
+        
+        if candidates:
+            candidates.sort(key=len)
+            positions = sorted(set.intersection(*candidates))
+        else:
+            positions = range(len(self.videos))
+        
+        limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+        offset = max(0, offset or 0)
+        page = [self.videos[i] for i in positions[offset:offset + limit]]
+        return page, len(positions)
+
+
+def get_video_index(videos):
+    """Return the index built with the cached list, or index another list (defaults) now."""
+    entry = _memory_cache
+    if entry is not None and entry['videos'] is videos:
+        return entry['index']
+    return VideoIndex(videos)
+
+
+def read_cache():
+    """
+    Load the cache file whatever its age.
+    
+    Served from memory unless the file changed since it was last read.
+    
+    Returns:
+        tuple: (videos, cache timestamp), or (None, None) if there is no usable cache
+    """
+    key = _cache_file_key()
+    if key is None:
+        return None, None
+    entry = _memory_cache
+    if entry is not None and entry['key'] == key:
+        return entry['videos'], entry['timestamp']
+    
     try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r') as f:
-                cache = json.load(f)
-                
-            # Check if cache is still valid
-            cached_time = datetime.fromisoformat(cache.get('timestamp', '2000-01-01'))
-            if datetime.now() - cached_time < timedelta(hours=CACHE_DURATION_HOURS):
-                return cache.get('videos', [])
+        with open(CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+        cached_time = datetime.fromisoformat(cache.get('timestamp', '2000-01-01'))
+        videos = cache.get('videos', [])
+        _remember_cache(key, videos, cached_time)
+        return videos, cached_time
     except Exception as e:
         print(f"Cache read error: {e}")
     
+    return None, None
+
+
+def is_cache_fresh(cached_time):
+    """Return whether a cache written at cached_time is still valid."""
+    return cached_time is not None and datetime.now() - cached_time < timedelta(hours=CACHE_DURATION_HOURS)
+
+
+def get_cached_videos():
+    """Load videos from cache if valid."""
+    videos, cached_time = read_cache()
+    if videos and is_cache_fresh(cached_time):
+        return videos
     return None
 
 
-def save_to_cache(videos):
-    """Save videos to cache file."""
+def save_to_cache(videos, cached_time=None):
+    """Save videos to cache file, atomically so other workers never read a partial file."""
     try:
         os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        cached_time = cached_time or datetime.now()
         cache = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': cached_time.isoformat(),
             'videos': videos
         }
-        with open(CACHE_FILE, 'w') as f:
+        tmp_file = f"{CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
             json.dump(cache, f, indent=2)
+        os.replace(tmp_file, CACHE_FILE)
+        _remember_cache(_cache_file_key(), videos, cached_time)
     except Exception as e:
         print(f"Cache write error: {e}")
 
 
+def acquire_refresh_lock():
+    """
+    Take the cross-process refresh lock (a lock file next to the cache).
+    
+    A lock older than REFRESH_LOCK_TIMEOUT_SECONDS was left by a worker
+    that died mid-refresh and is taken over.
+    
+    Returns:
+        bool: True if this process now holds the lock
+    """
+    lock_file = f"{CACHE_FILE}.lock"
+    os.makedirs(os.path.dirname(lock_file), exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                age = time.time() - os.path.getmtime(lock_file)
+            except OSError:
+                continue  # Released in the meantime
+            if age < REFRESH_LOCK_TIMEOUT_SECONDS:
+                return False
+            print("Taking over abandoned YouTube refresh lock")
+            try:
+                os.remove(lock_file)
+            except OSError:
+                pass
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def release_refresh_lock():
+    """Release the cross-process refresh lock."""
+    try:
+        os.remove(f"{CACHE_FILE}.lock")
+    except OSError:
+        pass
+
+
+class QuotaAccountant:
+    """
+    Records YouTube Data API quota units spent per day in a local JSON file.
+    
+    Units are reserved before each call and refused once the day's budget
+    would be exceeded. Days follow the quota's reset time (midnight
+    Pacific). API calls are made by the worker holding the refresh lock, so
+    the file has one writer at a time; the thread lock covers the parallel
+    searches within it.
+    
+    Args:
+        path (str): JSON file for daily totals and the query rotation
+        daily_budget (int): Units this app may spend per day
+    """
+    
+    def __init__(self, path=QUOTA_FILE, daily_budget=QUOTA_DAILY_BUDGET):
+        self.path = path
+        self.daily_budget = daily_budget
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def today(now=None):
+        """Quota day as YYYY-MM-DD."""
+        return (now or datetime.now(QUOTA_TIMEZONE)).strftime('%Y-%m-%d')
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {'days': {}, 'cursor': 0}
+    
+    def _save(self, state):
+        # Days sort as strings; keep only recent history
+        days = state['days']
+        for day in sorted(days)[:-QUOTA_HISTORY_DAYS]:
+            del days[day]
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def spent(self, day=None):
+        """Units spent on a day (today by default)."""
+        return self._load()['days'].get(day or self.today(), {}).get('units', 0)
+    
+    def remaining(self):
+        """Units left in today's budget."""
+        return max(0, self.daily_budget - self.spent())
+    
+    def reserve(self, endpoint, units):
+        """
+        Record a call before making it.
+        
+        Args:
+            endpoint (str): API endpoint, e.g. 'search'
+            units (int): Quota cost of the call
+        
+        Returns:
+            bool: False if the call would exceed today's budget
+        """
+        with self._lock:
+            state = self._load()
+            usage = state['days'].setdefault(self.today(), {'units': 0})
+            if usage['units'] + units > self.daily_budget:
+                print(f"YouTube quota budget reached ({usage['units']}/{self.daily_budget} units), "
+                      f"skipping {endpoint} call")
+                return False
+            usage['units'] += units
+            usage[endpoint] = usage.get(endpoint, 0) + 1
+            self._save(state)
+            return True
+    
+    def next_queries(self, queries, count):
+        """Take count queries round-robin from the saved position and advance it."""
+        if not queries or count <= 0:
+            return []
+        with self._lock:
+            state = self._load()
+            start = state.get('cursor', 0) % len(queries)
+            picked = [queries[(start + i) % len(queries)] for i in range(min(count, len(queries)))]
+            state['cursor'] = (start + len(picked)) % len(queries)
+            self._save(state)
+            return picked
+
+
+quota = QuotaAccountant()
+
+
+def plan_searches(queries=None, now=None):
+    """
+    Choose the searches for this refresh within the day's remaining budget.
+    
+    The remaining budget is shared evenly between the refreshes still due
+    before the quota resets (one per CACHE_DURATION_HOURS), less
+    DETAILS_RESERVE_UNITS for details, so searches are staggered across
+    the day. Queries are taken round-robin, so each one runs in turn over
+    successive refreshes.
+    
+    Returns:
+        list: Queries to run now; empty once the budget is spent
+    """
+    queries = FINANCE_SEARCHES if queries is None else queries
+    now = now or datetime.now(QUOTA_TIMEZONE)
+    reset = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    refreshes_left = max(1, math.ceil((reset - now).total_seconds() / (CACHE_DURATION_HOURS * 3600)))
+    
+    per_refresh = quota.remaining() // refreshes_left - DETAILS_RESERVE_UNITS
+    count = min(len(queries), max(0, per_refresh // SEARCH_COST_UNITS))
+    return quota.next_queries(queries, count)
+
+
 def search_youtube_videos(query, max_results=5):
     """Search YouTube for videos matching query."""
-    if not YOUTUBE_API_KEY:
+    if not YOUTUBE_API_KEY or not quota.reserve('search', SEARCH_COST_UNITS):
         return []
     
     try:
@@ -106,7 +558,8 @@ def search_youtube_videos(query, max_results=5):
             'key': YOUTUBE_API_KEY
         }
         
-        response = requests.get(f"{YOUTUBE_API_URL}/search", params=params)
+        response = get_http_session().get(f"{YOUTUBE_API_URL}/search", params=params,
+                                          timeout=YOUTUBE_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         
@@ -129,11 +582,51 @@ def search_youtube_videos(query, max_results=5):
         return []
 
 
+def search_all_videos(queries, max_results=5):
+    """
+    Run several searches concurrently over the shared session.
+    
+    Args:
+        queries (list): Search queries
+        max_results (int): Results per query
+    
+    Returns:
+        list: Unique videos, in query order
+    """
+    results = _map_concurrently(lambda query: search_youtube_videos(query, max_results), queries)
+    
+    videos = []
+    seen_ids = set()
+    for query_videos in results:
+        for video in query_videos:
+            if video['youtubeId'] not in seen_ids:
+                seen_ids.add(video['youtubeId'])
+                videos.append(video)
+    return videos
+
+
 def get_video_details(video_ids):
-    """Get detailed information for specific videos."""
+    """
+    Get detailed information for specific videos.
+    
+    Ids are requested in batches of DETAILS_BATCH_SIZE (the API maximum),
+    with the batches fetched concurrently.
+    """
     if not YOUTUBE_API_KEY or not video_ids:
         return []
     
+    video_ids = list(video_ids)
+    batches = [video_ids[i:i + DETAILS_BATCH_SIZE]
+               for i in range(0, len(video_ids), DETAILS_BATCH_SIZE)]
+    return [video for batch in _map_concurrently(_get_video_details_batch, batches)
+            for video in batch]
+
+
+def _get_video_details_batch(video_ids):
+    """Fetch details for up to DETAILS_BATCH_SIZE videos in one call."""
+    if not quota.reserve('videos', VIDEOS_COST_UNITS):
+        return []
+    
     try:
         params = {
             'part': 'snippet,contentDetails,statistics',
@@ -141,7 +634,8 @@ def get_video_details(video_ids):
             'key': YOUTUBE_API_KEY
         }
         
-        response = requests.get(f"{YOUTUBE_API_URL}/videos", params=params)
+        response = get_http_session().get(f"{YOUTUBE_API_URL}/videos", params=params,
+                                          timeout=YOUTUBE_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         
@@ -210,121 +704,294 @@ def calculate_rating(views, likes):
         return 4.3
 
 
+def _first_match(text, table, default):
+    """Return the label of the first table row with a keyword in text."""
+    for label, keywords in table:
+        for keyword in keywords:
+            if keyword in text:
+                return label
+    return default
+
+
+def _all_matches(text, table, limit):
+    """Return the labels of up to limit table rows with a keyword in text."""
+    labels = []
+    for label, keywords in table:
+        for keyword in keywords:
+            if keyword in text:
+                labels.append(label)
+                break
+        if len(labels) == limit:
+            break
+    return labels
+
+
+def classify_video(title, description):
+    """
+    Categorize a video, determine its level and extract its topics at once.
+    
+    The text is built and lowercased once and checked against the keyword
+    tables prepared at import, stopping at the first hit per row.
+    
+    Returns:
+        tuple: (category, level, topics), as categorize_video,
+        determine_level and extract_topics
+    """
+    text = (title + ' ' + description).lower()
+    topics = _all_matches(text, TOPIC_KEYWORDS, MAX_TOPICS)
+    return (_first_match(text, CATEGORY_KEYWORDS, 'general'),
+            _first_match(text, LEVEL_KEYWORDS, 'All Levels'),
+            topics or ['Personal Finance'])
+
+
 def categorize_video(title, description):
     """Auto-categorize video based on content."""
-    text = (title + ' ' + description).lower()
-    
-    if any(word in text for word in ['budget', 'budgeting', '50/30/20', 'spending']):
-        return 'budgeting'
-    elif any(word in text for word in ['invest', 'stock', 'etf', 'index fund', 'portfolio']):
-        return 'investing'
-    elif any(word in text for word in ['save', 'saving', 'emergency fund', 'frugal']):
-        return 'savings'
-    elif any(word in text for word in ['debt', 'credit', 'loan', 'pay off', 'payoff']):
-        return 'debt'
-    elif any(word in text for word in ['retire', '401k', 'ira', 'pension']):
-        return 'retirement'
-    elif any(word in text for word in ['mindset', 'wealth', 'rich', 'millionaire', 'financial freedom']):
-        return 'mindset'
-    else:
-        return 'general'
+    return _first_match((title + ' ' + description).lower(), CATEGORY_KEYWORDS, 'general')
 
 
 def determine_level(title, description):
     """Determine difficulty level of content."""
-    text = (title + ' ' + description).lower()
-    
-    if any(word in text for word in ['beginner', 'basic', 'simple', 'easy', 'start', '101', 'introduction']):
-        return 'Beginner'
-    elif any(word in text for word in ['advanced', 'expert', 'complex', 'strategy']):
-        return 'Advanced'
-    else:
-        return 'All Levels'
+    return _first_match((title + ' ' + description).lower(), LEVEL_KEYWORDS, 'All Levels')
 
 
 def extract_topics(title, description):
     """Extract relevant topics from video."""
-    text = (title + ' ' + description).lower()
-    topics = []
-    
-    topic_keywords = {
-        'Budgeting': ['budget', 'budgeting', 'spending plan'],
-        'Investing': ['invest', 'investing', 'investment'],
-        'Saving': ['save', 'saving', 'savings'],
-        'Debt': ['debt', 'loan', 'credit card'],
-        'Retirement': ['retire', 'retirement', '401k', 'ira'],
-        'Credit Score': ['credit score', 'fico', 'credit report'],
-        'Emergency Fund': ['emergency fund', 'rainy day'],
-        'Index Funds': ['index fund', 's&p 500', 'vanguard'],
-        'Stocks': ['stock', 'shares', 'equity'],
-        'Real Estate': ['real estate', 'property', 'rental'],
-        'Side Hustle': ['side hustle', 'extra income', 'gig'],
-        'Passive Income': ['passive income', 'dividend'],
-        'Frugal Living': ['frugal', 'minimalist', 'save money'],
-        'Financial Freedom': ['financial freedom', 'fire', 'independence']
-    }
+    topics = _all_matches((title + ' ' + description).lower(), TOPIC_KEYWORDS, MAX_TOPICS)
+    return topics or ['Personal Finance']
+
+
+def refresh_videos():
+    """
+    Fetch fresh videos from YouTube into the catalog and republish the cache.
+    
+    Returns:
+        list: The whole catalog, or None if nothing could be fetched or
+        today's quota budget is spent
+    """
+    # A few searches per refresh, within today's quota budget
+    queries = plan_searches()
+    if not queries:
+        print(f"YouTube quota budget spent ({quota.spent()}/{quota.daily_budget} units), "
+              "serving cached videos")
+        return None
+    
+    print(f"Fetching fresh videos from YouTube ({len(queries)} searches)...")
     
-    for topic, keywords in topic_keywords.items():
-        if any(kw in text for kw in keywords):
-            topics.append(topic)
+    # Search for videos using different queries, all at once
+    found = search_all_videos(queries, max_results=SEARCH_MAX_RESULTS)
+    if not found:
+        return None
     
-    return topics[:3] if topics else ['Personal Finance']
+    upsert_videos(found)
+    videos = load_catalog()
+    save_to_cache(videos)
+    return videos
+
+
+def upsert_videos(found, now=None):
+    """
+    Merge search results into the Video table.
+    
+    New videos are inserted and known ones updated in place, keeping
+    everything fetched before. Details (duration, rating, views) are only
+    requested for videos that have none or whose details are older than
+    DETAILS_MAX_AGE_HOURS.
+    
+    Args:
+        found (list): Videos from search_all_videos, in search order
+        now (datetime): Refresh time as naive UTC, like the Video columns (defaults to now)
+    
+    Returns:
+        int: Number of videos whose details were fetched
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    ids = [v['youtubeId'] for v in found]
+    known = {video.youtube_id: video
+             for video in Video.query.filter(Video.youtube_id.in_(ids))}
+    
+    for rank, result in enumerate(found):
+        video = known.get(result['youtubeId'])
+        if video is None:
+            video = Video(youtube_id=result['youtubeId'], first_seen_at=now)
+            db.session.add(video)
+            known[video.youtube_id] = video
+        video.title = result['title']
+        video.channel = result['channel']
+        video.description = result['description']
+        video.thumbnail = result.get('thumbnail')
+        video.published_at = result.get('publishedAt')
+        video.last_seen_at = now
+        video.rank = rank
+        _classify(video)
+    
+    stale_before = now - timedelta(hours=DETAILS_MAX_AGE_HOURS)
+    stale_ids = [video.youtube_id for video in known.values()
+                 if video.fetched_at is None or video.fetched_at < stale_before]
+    details = get_video_details(stale_ids)
+    for detail in details:
+        video = known[detail['youtubeId']]
+        video.title = detail['title']
+        video.description = detail['description']
+        video.duration = detail['duration']
+        video.rating = detail['rating']
+        video.views = detail['views']
+        video.fetched_at = now
+        _classify(video)
+    
+    db.session.commit()
+    return len(details)
+
+
+def _classify(video):
+    """Set a Video's category, level and topics from its text."""
+    video.category, video.level, topics = classify_video(video.title, video.description or '')
+    video.set_topics(topics)
+
+
+def load_catalog():
+    """
+    Load every catalog video, latest search results first.
+    
+    Returns:
+        list: Videos as dicts; the top FEATURED_COUNT of the latest search are featured
+    """
+    rows = Video.query.order_by(Video.last_seen_at.desc(), Video.rank).all()
+    videos = [row.to_dict() for row in rows]
+    for i, video in enumerate(videos):
+        video['featured'] = i < FEATURED_COUNT
+    return videos
+
+
+def _publish_catalog_from_db():
+    """
+    Rebuild a missing cache file from the catalog without calling the API.
+    
+    Returns:
+        tuple: (videos, cache timestamp), or (None, None) if the catalog is empty
+    """
+    try:
+        last_seen = db.session.query(db.func.max(Video.last_seen_at)).scalar()
+        if last_seen is None:
+            return None, None
+        videos = load_catalog()
+    except Exception as e:
+        print(f"Video catalog read error: {e}")
+        return None, None
+    
+    # Date the cache by the last refresh so stale catalogs still get refreshed.
+    # last_seen_at is naive UTC; cache timestamps are naive local time
+    cached_time = last_seen.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    save_to_cache(videos, cached_time)
+    return videos, cached_time
+
+
+_refresh_thread = None
+_refresh_failed_at = 0
+_refresh_state_lock = threading.Lock()
+
+
+def _locked_refresh(only_if_stale=True):
+    """
+    Refresh the cache while holding the cross-process lock.
+    
+    Args:
+        only_if_stale (bool): Skip the fetch if another worker refreshed
+            the cache while we waited for the lock
+    
+    Returns:
+        list: Fresh videos, or None if another worker holds the lock or the fetch failed
+    """
+    global _refresh_failed_at
+    if not acquire_refresh_lock():
+        print("YouTube refresh already running in another worker")
+        return None
+    try:
+        if only_if_stale:
+            cached = get_cached_videos()
+            if cached:
+                return cached
+        videos = refresh_videos()
+    except Exception as e:
+        print(f"YouTube refresh error: {e}")
+        if has_app_context():
+            db.session.rollback()
+        videos = None
+    finally:
+        release_refresh_lock()
+    
+    if videos is None:
+        _refresh_failed_at = time.time()
+    return videos
+
+
+def refresh_in_background():
+    """
+    Start a background cache refresh unless one is running or recently failed.
+    
+    Returns:
+        bool: True if a refresh thread was started
+    """
+    global _refresh_thread
+    # The catalog lives in the database, so the thread needs the app context
+    app = current_app._get_current_object() if has_app_context() else None
+    
+    def run():
+        if app is None:
+            return _locked_refresh()
+        with app.app_context():
+            return _locked_refresh()
+    
+    with _refresh_state_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return False
+        if time.time() - _refresh_failed_at < REFRESH_RETRY_SECONDS:
+            return False
+        _refresh_thread = threading.Thread(target=run, name='youtube-refresh', daemon=True)
+        _refresh_thread.start()
+        return True
 
 
 def fetch_finance_videos(force_refresh=False):
     """
     Fetch finance education videos from YouTube.
-    Uses cache to minimize API calls.
+    
+    Videos accumulate in the Video table; the cache file holds the whole
+    catalog for fast reads. Uses cache to minimize API calls. An expired cache is served as-is
+    while one worker refreshes it in the background (stale-while-
+    revalidate), so only a cold start waits on the API. Forced refreshes
+    are ignored if the cache is younger than FORCE_REFRESH_MIN_INTERVAL_SECONDS.
     """
     print(f"=== fetch_finance_videos called (force_refresh={force_refresh}) ===")
     print(f"API Key present: {bool(YOUTUBE_API_KEY)}")
     
+    videos, cached_time = read_cache()
+    if videos is None:
+        videos, cached_time = _publish_catalog_from_db()
+    
+    # Rate-limit forced refreshes across all workers by the cache's age
+    if videos and force_refresh:
+        age = (datetime.now() - cached_time).total_seconds()
+        if age < FORCE_REFRESH_MIN_INTERVAL_SECONDS:
+            print(f"Ignoring forced refresh, cache is only {age:.0f}s old")
+            force_refresh = False
+    
     # Check cache first (unless force refresh)
-    if not force_refresh:
-        cached = get_cached_videos()
-        if cached:
+    if videos and not force_refresh:
+        if is_cache_fresh(cached_time):
             print("Using cached YouTube videos")
-            return cached
+        elif YOUTUBE_API_KEY:
+            print("Using stale YouTube videos while refreshing in the background")
+            refresh_in_background()
+        return videos
     
     # Check if API key is configured
     if not YOUTUBE_API_KEY:
         print("YouTube API key not configured. Using default videos.")
-        return get_default_videos()
-    
-    print("Fetching fresh videos from YouTube...")
-    all_videos = []
-    seen_ids = set()
-    
-    # Search for videos using different queries
-    for query in FINANCE_SEARCHES:
-        videos = search_youtube_videos(query, max_results=3)
-        
-        for video in videos:
-            if video['youtubeId'] not in seen_ids:
-                seen_ids.add(video['youtubeId'])
-                all_videos.append(video)
-    
-    # Get detailed information for all videos
-    if all_videos:
-        video_ids = [v['youtubeId'] for v in all_videos[:25]]  # Limit to 25 videos
-        detailed_videos = get_video_details(video_ids)
-        
-        # Merge and enhance video data
-        final_videos = []
-        for i, video in enumerate(detailed_videos):
-            video['id'] = i + 1
-            video['category'] = categorize_video(video['title'], video['description'])
-            video['level'] = determine_level(video['title'], video['description'])
-            video['topics'] = extract_topics(video['title'], video['description'])
-            video['featured'] = i < 6  # First 6 are featured
-            final_videos.append(video)
-        
-        # Save to cache
-        save_to_cache(final_videos)
-        
-        return final_videos
+        return videos or get_default_videos()
     
-    return get_default_videos()
+    # Cold start or forced refresh: fetch now
+    fresh = _locked_refresh(only_if_stale=not force_refresh)
+    return fresh or videos or get_default_videos()
 
 
 def get_default_videos():